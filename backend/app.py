@@ -1,70 +1,189 @@
 import os
 import json
+import copy
+import base64
+import hashlib
 import uuid
+import time
 import datetime
-from functools import wraps
-from flask import Flask, request, jsonify, send_from_directory
+import threading
+import importlib
+import multiprocessing
+from functools import wraps, lru_cache
+from flask import Flask, Blueprint, Response, current_app, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import jwt
-from werkzeug.utils import secure_filename
-from io import StringIO
-import PyPDF2
-import requests
+from werkzeug.utils import secure_filename, safe_join
+from io import BytesIO, StringIO
+import gzip
+import zipfile
+from collections import deque, Counter
 import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from storage import create_store, presentation_summary, deck_version, SORT_FIELDS, BatchError, VersionConflict
+from jsonstream import JSONArrayStream
+from cache import MemoryCache, DiskCache, TieredCache, SingleFlight, make_key
+from providers import ProviderClient, CircuitBreaker, ProviderUnavailable
+from jobs import JobQueue, public_job, FINISHED, SUCCEEDED
+from blobs import BlobStore, BLOB_PATH_RE, digest_from_url
+from images import generate_variants, variant_widths, variant_relpath, master_relpath_for_variant
+from image_search import (
+    UnsplashSearch, LocalSearch, normalize_query, UNSPLASH_URL, MAX_LIMIT as IMAGE_SEARCH_MAX_LIMIT,
+)
+from condense import estimate_tokens, truncate_to_tokens, chunk_text, assign_sections
+from documents import (
+    iter_pdf_pages, iter_text_pages, pdf_page_count, build_document, document_covers, document_page_texts,
+    iter_document_pages,
+)
+from metrics import Registry, TimedProxy
+from profiling import ProfileArtifacts, start_profiler, MODES as PROFILE_MODES
+
+ENV_FILE = os.path.join(os.path.dirname(__file__), '.env')
+if os.path.exists(ENV_FILE):
+    try:
+        # Only imported when there is a .env to load
+        from dotenv import load_dotenv
+        load_dotenv(ENV_FILE)
+    except ImportError:
+        # dotenv not installed — that's fine, env vars will be read from the environment
+        pass
 
 try:
-    # Try loading .env from the backend directory if python-dotenv is installed
-    from dotenv import load_dotenv
-    load_dotenv(os.path.join(os.path.dirname(__file__), '.env'))
-except Exception:
-    # dotenv not installed or .env missing — that's fine, env vars will be read from the environment
-    pass
-
-try:
-    import bcrypt
+    import brotli
 except ImportError:
-    bcrypt = None
+    brotli = None
 
-try:
-    from pptx import Presentation as PPTXPresentation
-    from pptx.util import Inches, Pt
-    from pptx.enum.text import PP_ALIGN
-    from pptx.dml.color import RGBColor
-except ImportError:
-    PPTXPresentation = None
+
+@lru_cache(maxsize=None)
+def optional_import(name):
+    """
+    Module `name`, or None if it isn't installed. Heavy dependencies (python-pptx,
+    PyPDF2, bcrypt, requests) are imported on first use by the routes that need
+    them instead of at startup, so workers that never export a deck don't pay for them.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret')
-DATA_FILE = os.path.join(os.path.dirname(__file__), 'data.json')
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), 'uploads')
+DATA_FILE = os.environ.get('DATA_FILE', os.path.join(os.path.dirname(__file__), 'data.json'))
+DATABASE_FILE = os.environ.get('DATABASE_FILE', os.path.join(os.path.dirname(__file__), 'data.db'))
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'sqlite')  # 'sqlite', 'journal' or 'json'
+JOURNAL_DIR = os.environ.get('JOURNAL_DIR', os.path.join(os.path.dirname(__file__), 'journal'))
+JOURNAL_COMPACT_OPS = int(os.environ.get('JOURNAL_COMPACT_OPS', 500))
+JOURNAL_COMPACT_SECONDS = float(os.environ.get('JOURNAL_COMPACT_SECONDS', 60))
+JOURNAL_FSYNC = os.environ.get('JOURNAL_FSYNC', '1') == '1'
+UPLOAD_DIR = os.environ.get('UPLOAD_DIR', os.path.join(os.path.dirname(__file__), 'uploads'))
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(os.path.dirname(__file__), 'cache'))
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join(os.path.dirname(__file__), 'exports'))
+EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_MB', 500)) * 1024 * 1024
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', 4))
+BULK_EXPORT_MAX = int(os.environ.get('BULK_EXPORT_MAX', 500))
+MAX_JOB_WAIT = 30
+BLOB_INDEX_FILE = os.environ.get('BLOB_INDEX_FILE', os.path.join(os.path.dirname(__file__), 'blobs.db'))
+BLOB_GC_GRACE_SECONDS = int(os.environ.get('BLOB_GC_GRACE_SECONDS', 24 * 3600))
+BLOB_GC_INTERVAL = int(os.environ.get('BLOB_GC_INTERVAL', 3600))
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+EXPORT_IMAGE_DPI = int(os.environ.get('EXPORT_IMAGE_DPI', 150))
+DOC_EXTRACT_WORKERS = int(os.environ.get('DOC_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+DOC_PAGES_PER_TASK = int(os.environ.get('DOC_PAGES_PER_TASK', 16))
+DOC_MAX_PAGES = int(os.environ.get('DOC_MAX_PAGES', 1000))
+DOC_MAX_CHARS = int(os.environ.get('DOC_MAX_CHARS', 2_000_000))
+DOC_CACHE_MAX_BYTES = int(os.environ.get('DOC_CACHE_MAX_MB', 200)) * 1024 * 1024
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # if set, /metrics requires it as a Bearer token
+ADMIN_USERS = {u.strip() for u in os.environ.get('ADMIN_USERS', '').split(',') if u.strip()}
+PROFILE_REQUESTS = os.environ.get('PROFILE_REQUESTS', '')  # 'cprofile' or 'sample' profiles matching requests
+PROFILE_PATHS = tuple(p.strip() for p in os.environ.get('PROFILE_PATHS', '/').split(',') if p.strip())
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(__file__), 'profiles'))
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 50))
+PROFILE_MAX_BYTES = int(os.environ.get('PROFILE_MAX_MB', 100)) * 1024 * 1024
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5)) / 1000
 
 ALLOWED_TEXT_EXTS = {'txt', 'pdf', 'doc', 'docx'}
 ALLOWED_IMAGE_EXTS = {'png', 'jpg', 'jpeg', 'gif'}
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload
+
+# Routes live on a blueprint; create_app() (bottom of this file) builds the
+# Flask app, the directories and the services below, so importing this module
+# touches no files and starts no threads.
+api = Blueprint('api', __name__)
+
+# Metrics served at /metrics in the Prometheus text format
+metrics = Registry()
+http_request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency by route, method and status',
+    ('route', 'method', 'status'))
+datastore_seconds = metrics.histogram(
+    'datastore_operation_seconds', 'Time spent in datastore calls', ('backend', 'op'))
+llm_call_seconds = metrics.histogram(
+    'llm_call_duration_seconds', 'LLM provider call latency by outcome', ('provider', 'mode', 'outcome'))
+llm_fallbacks = metrics.counter(
+    'llm_fallbacks_total', 'Times generation moved on to the next provider or the placeholder text', ('to',))
+pdf_extract_seconds = metrics.histogram(
+    'pdf_extract_duration_seconds', 'Time to extract the text of an uploaded PDF')
+pdf_pages_extracted = metrics.counter('pdf_pages_extracted_total', 'PDF pages extracted')
+export_render_seconds = metrics.histogram(
+    'pptx_render_duration_seconds', 'Time to render a deck to PPTX')
+
+startup_seconds = metrics.gauge(
+    'app_startup_seconds', 'Time create_app() took to build the app and its services')
+
+# Datastore, image blob store, background job queue and worker pools; set by
+# create_app() from the final settings.
+store = None
+blob_store = None
+blob_gc_stop = None  # set to stop the blob GC thread of the current app
+job_queue = None
+export_executor = None
+image_executor = None
+BULK_EXPORT_WINDOW = None  # decks rendered ahead in a bulk export, 2 x EXPORT_WORKERS
+IMAGE_VARIANT_WIDTHS = None  # resized copies made of each uploaded image, from EXPORT_IMAGE_DPI
 
-app = Flask(__name__)
-CORS(app)
-app.config['UPLOAD_FOLDER'] = UPLOAD_DIR
-app.config['SECRET_KEY'] = SECRET_KEY
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
-
-# Simple helpers to read/write a JSON datastore (file-backed)
 
 def read_data():
-    try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except Exception:
-        return {'users': {}, 'presentations': {}}
+    """Whole-dataset snapshot in the legacy {'users', 'presentations'} shape."""
+    return store.export_data()
 
 
 def write_data(d):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(d, f, indent=2)
+    """Replace the whole dataset. Routes should use the row-level store methods instead."""
+    def slides(data):
+        return [s for p in data.get('presentations', {}).values() for s in p.get('slides', [])]
+    old = store.export_data()
+    store.import_data(d)
+    blob_store.sync_slides(slides(old), slides(d))
+
+
+def now_iso():
+    return datetime.datetime.utcnow().isoformat()
+
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(key):
+    """Opaque pagination cursor for a (sort_value, id) key."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(k, str) for k in key):
+        raise ValueError('Invalid cursor')
+    return tuple(key)
 
 
 def hash_password(password):
     """Hash password with bcrypt or fallback to plaintext with warning"""
+    bcrypt = optional_import('bcrypt')
     if bcrypt:
         return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     else:
@@ -74,6 +193,7 @@ def hash_password(password):
 
 def verify_password(password, hashed):
     """Verify password with bcrypt or fallback to plaintext comparison"""
+    bcrypt = optional_import('bcrypt')
     if bcrypt:
         return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
     else:
@@ -91,7 +211,7 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
             request.user = data['username']
         except Exception as e:
             return jsonify({'message': 'Token is invalid!', 'error': str(e)}), 401
@@ -99,9 +219,186 @@ def token_required(f):
     return decorated
 
 
+# ============== METRICS ==============
+
+def datastore_size():
+    """Bytes on disk used by the configured datastore backend."""
+    if DATA_BACKEND == 'journal':
+        paths = [os.path.join(JOURNAL_DIR, 'snapshot.json'), os.path.join(JOURNAL_DIR, 'journal.log')]
+    elif DATA_BACKEND == 'json':
+        paths = [DATA_FILE]
+    else:
+        paths = [DATABASE_FILE, DATABASE_FILE + '-wal']
+    return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+
+metrics.gauge('datastore_size_bytes', 'Size of the datastore files on disk', function=datastore_size)
+
+
+@api.before_app_request
+def start_request_timer():
+    request.started_at = time.perf_counter()
+
+
+# Registered before compress_response, so it runs after it and the timing includes compression.
+# Streamed responses are timed up to the first byte.
+@api.after_app_request
+def record_request_metrics(resp):
+    started = getattr(request, 'started_at', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_seconds.observe(time.perf_counter() - started,
+                                     route=route, method=request.method, status=resp.status_code)
+    return resp
+
+
+@api.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus text exposition of this process's metrics."""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'message': 'Forbidden'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# ============== PROFILING ==============
+
+profile_artifacts = None  # set by create_app() when profiling is enabled
+
+
+def token_username():
+    """Username from a valid Bearer token on the current request, or None."""
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) != 2 or parts[0].lower() != 'bearer':
+        return None
+    try:
+        return jwt.decode(parts[1], current_app.config['SECRET_KEY'], algorithms=['HS256'])['username']
+    except Exception:
+        return None
+
+
+def admin_required(f):
+    @wraps(f)
+    @token_required
+    def decorated(*args, **kwargs):
+        if request.user not in ADMIN_USERS:
+            return jsonify({'message': 'Forbidden'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+
+def start_request_profile():
+    """Profile this request if PROFILE_REQUESTS covers its path, or an admin asked with X-Profile: <mode>."""
+    requested = request.headers.get('X-Profile')
+    if requested in PROFILE_MODES and token_username() in ADMIN_USERS:
+        mode = requested
+    elif PROFILE_REQUESTS and request.path.startswith(PROFILE_PATHS):
+        mode = PROFILE_REQUESTS
+    else:
+        return
+    try:
+        request.profiler = start_profiler(mode, PROFILE_SAMPLE_INTERVAL)
+    except ValueError as e:
+        # e.g. another request is already under cProfile on Python 3.12+
+        print(f'Profiling skipped for {request.path}: {e}')
+
+
+def finish_request_profile(resp):
+    profiler = getattr(request, 'profiler', None)
+    if profiler:
+        request.profiler = None
+        profiler.stop()
+        route = request.url_rule.rule if request.url_rule else request.path
+        try:
+            resp.headers['X-Profile-Artifact'] = profile_artifacts.save(profiler, f'{request.method}-{route}')
+        except Exception as e:
+            print(f'Saving profile failed: {e}')
+    return resp
+
+
+def abandon_request_profile(exc):
+    profiler = getattr(request, 'profiler', None)
+    if profiler:
+        request.profiler = None
+        profiler.stop()
+
+
+
+@api.route('/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    if not profile_artifacts:
+        return jsonify({'profiles': []}), 200
+    return jsonify({'profiles': profile_artifacts.list()}), 200
+
+
+@api.route('/admin/profiles/<name>', methods=['GET'])
+@admin_required
+def download_profile(name):
+    path = profile_artifacts.path(name) if profile_artifacts else None
+    if not path:
+        return jsonify({'message': 'Profile not found'}), 404
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+
+# ============== CONDITIONAL REQUESTS & COMPRESSION ==============
+
+def presentation_etag(pres):
+    """Opaque ETag value for a deck; changes whenever its version counter does."""
+    return f'v{deck_version(pres)}'
+
+
+def with_presentation_etag(resp, pres):
+    resp.set_etag(presentation_etag(pres))
+    # Let browsers keep the deck but revalidate it (If-None-Match) on every use
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+
+def version_conflict(current):
+    resp = jsonify({'message': 'Presentation was changed by another request', 'version': current})
+    resp.set_etag(f'v{current}')
+    return resp, 412
+
+
+def if_match_version():
+    """
+    Deck version named by the request's If-Match, for the store to check inside
+    its write (so two requests holding the same ETag can't both succeed). None
+    without an If-Match or with `*`; 0, which never matches, if it names none of ours.
+    """
+    if not request.if_match or request.if_match.star_tag:
+        return None
+    for tag in request.if_match.as_set(include_weak=True):
+        if tag[:1] == 'v' and tag[1:].isdigit():
+            return int(tag[1:])
+    return 0
+
+
+@api.after_app_request
+def compress_response(resp):
+    """Brotli (when installed) or gzip for JSON bodies of at least COMPRESS_MIN_BYTES,
+    as negotiated by Accept-Encoding."""
+    if (resp.direct_passthrough or resp.is_streamed or resp.mimetype != 'application/json'
+            or resp.status_code < 200 or resp.status_code in (204, 304) or 'Content-Encoding' in resp.headers):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    coding = 'br' if brotli and accepted['br'] else 'gzip' if accepted['gzip'] else None
+    body = resp.get_data()
+    if not coding or len(body) < COMPRESS_MIN_BYTES:
+        return resp
+    resp.set_data(brotli.compress(body, quality=5) if coding == 'br' else gzip.compress(body, compresslevel=6))
+    resp.headers['Content-Encoding'] = coding
+    # Same deck, different bytes: only a weak validator still holds
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return resp
+
+
 # ============== AUTHENTICATION ==============
 
-@app.route('/signup', methods=['POST'])
+@api.route('/signup', methods=['POST'])
 def signup():
     try:
         payload = request.json or {}
@@ -113,23 +410,21 @@ def signup():
         if not password or len(password) < 6:
             return jsonify({'message': 'Password must be at least 6 characters'}), 400
         
-        data = read_data()
-        users = data['users']
-        
-        if username in users:
+        if store.get_user(username):
             return jsonify({'message': 'User already exists'}), 400
         
-        users[username] = {
+        created = store.create_user(username, {
             'password': hash_password(password),
-            'created_at': datetime.datetime.utcnow().isoformat()
-        }
-        write_data(data)
+            'created_at': now_iso()
+        })
+        if not created:
+            return jsonify({'message': 'User already exists'}), 400
         return jsonify({'message': 'User created successfully'}), 201
     except Exception as e:
         return jsonify({'message': 'Signup failed', 'error': str(e)}), 500
 
 
-@app.route('/login', methods=['POST'])
+@api.route('/login', methods=['POST'])
 def login():
     try:
         payload = request.json or {}
@@ -139,15 +434,14 @@ def login():
         if not username or not password:
             return jsonify({'message': 'Username and password required'}), 400
         
-        data = read_data()
-        users = data['users']
+        user = store.get_user(username)
         
-        if username not in users or not verify_password(password, users[username]['password']):
+        if not user or not verify_password(password, user['password']):
             return jsonify({'message': 'Invalid credentials'}), 401
         
         token = jwt.encode(
             {'username': username, 'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=12)},
-            app.config['SECRET_KEY'],
+            current_app.config['SECRET_KEY'],
             algorithm='HS256'
         )
         return jsonify({'token': token, 'username': username}), 200
@@ -157,20 +451,47 @@ def login():
 
 # ============== PRESENTATIONS ==============
 
-@app.route('/presentations', methods=['GET'])
+@api.route('/presentations', methods=['GET'])
 @token_required
 def list_presentations():
+    """List the caller's presentations as summaries, newest first.
+    Query params: limit, cursor (from next_cursor), sort (updated_at|created_at|title),
+    order (desc|asc), full=1 to include every slide."""
     try:
         username = request.user
-        data = read_data()
-        pres = data.get('presentations', {})
-        user_pres = [v for v in pres.values() if v['owner'] == username]
-        return jsonify({'presentations': user_pres}), 200
+        sort = request.args.get('sort', 'updated_at')
+        if sort not in SORT_FIELDS:
+            return jsonify({'message': f'sort must be one of: {", ".join(SORT_FIELDS)}'}), 400
+        descending = request.args.get('order', 'desc').lower() != 'asc'
+        full = request.args.get('full', '').lower() in ('1', 'true', 'yes')
+        limit = request.args.get('limit')
+        if limit:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                return jsonify({'message': 'limit must be a positive integer'}), 400
+            limit = min(limit, MAX_PAGE_SIZE)
+        else:
+            limit = None
+        cursor = request.args.get('cursor')
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+
+        user_pres, next_key = store.page_presentations(
+            username, limit=limit, after=after, sort=sort, descending=descending, full=full)
+        return jsonify({
+            'presentations': user_pres,
+            'next_cursor': encode_cursor(next_key) if next_key else None
+        }), 200
     except Exception as e:
         return jsonify({'message': 'Failed to list presentations', 'error': str(e)}), 500
 
 
-@app.route('/presentations', methods=['POST'])
+@api.route('/presentations', methods=['POST'])
 @token_required
 def create_presentation():
     try:
@@ -182,7 +503,6 @@ def create_presentation():
             return jsonify({'message': 'Title is required'}), 400
         
         pres_id = str(uuid.uuid4())
-        data = read_data()
         slide_count = max(1, min(int(payload.get('slide_count', 5)), 50))  # 1-50 slides
         
         slides = []
@@ -203,43 +523,47 @@ def create_presentation():
                 }
             })
         
-        data['presentations'][pres_id] = {
+        pres = {
             'id': pres_id,
             'owner': username,
             'title': title,
             'slides': slides,
-            'created_at': datetime.datetime.utcnow().isoformat(),
-            'updated_at': datetime.datetime.utcnow().isoformat()
+            'created_at': now_iso(),
+            'updated_at': now_iso(),
+            'version': 1
         }
-        write_data(data)
-        return jsonify({'presentation': data['presentations'][pres_id]}), 201
+        store.create_presentation(pres)
+        return jsonify({'presentation': pres}), 201
     except Exception as e:
         return jsonify({'message': 'Failed to create presentation', 'error': str(e)}), 500
 
 
-@app.route('/presentations/<pres_id>', methods=['GET'])
+@api.route('/presentations/<pres_id>', methods=['GET'])
 @token_required
 def get_presentation(pres_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        # Check ownership and the client's cached version before loading any slides
+        pres = store.get_presentation(pres_id, with_slides=False)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
         if pres['owner'] != request.user:
             return jsonify({'message': 'Forbidden'}), 403
         
-        return jsonify({'presentation': pres}), 200
+        if request.if_none_match.contains_weak(presentation_etag(pres)):
+            return with_presentation_etag(Response(status=304), pres)
+        
+        pres = store.get_presentation(pres_id)
+        return with_presentation_etag(jsonify({'presentation': pres}), pres), 200
     except Exception as e:
         return jsonify({'message': 'Failed to get presentation', 'error': str(e)}), 500
 
 
-@app.route('/presentations/<pres_id>', methods=['PUT'])
+@api.route('/presentations/<pres_id>', methods=['PUT'])
 @token_required
 def update_presentation(pres_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id, with_slides=False)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
@@ -247,95 +571,103 @@ def update_presentation(pres_id):
             return jsonify({'message': 'Forbidden'}), 403
         
         payload = request.json or {}
+        fields = {}
         
         if 'title' in payload:
             title = payload['title'].strip()
             if not title:
                 return jsonify({'message': 'Title cannot be empty'}), 400
-            pres['title'] = title
+            fields['title'] = title
         
-        pres['updated_at'] = datetime.datetime.utcnow().isoformat()
-        write_data(data)
-        return jsonify({'presentation': pres}), 200
+        fields['updated_at'] = now_iso()
+        pres = store.update_presentation(pres_id, fields, expected_version=if_match_version())
+        return with_presentation_etag(jsonify({'presentation': pres}), pres), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'Failed to update presentation', 'error': str(e)}), 500
 
 
-@app.route('/presentations/<pres_id>', methods=['DELETE'])
+@api.route('/presentations/<pres_id>', methods=['DELETE'])
 @token_required
 def delete_presentation(pres_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
         if pres['owner'] != request.user:
             return jsonify({'message': 'Forbidden'}), 403
         
-        del data['presentations'][pres_id]
-        write_data(data)
+        store.delete_presentation(pres_id, expected_version=if_match_version())
+        blob_store.sync_slides(old_slides=pres['slides'])
         return jsonify({'message': 'Presentation deleted'}), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'Failed to delete presentation', 'error': str(e)}), 500
 
 
 # ============== SLIDES ==============
 
-@app.route('/presentations/<pres_id>/slides', methods=['POST'])
+def new_slide(payload):
+    """Slide record for a create request. The id is always server-assigned: slide ids
+    are unique across decks in SQLite, so a client-chosen id could collide with another user's slide."""
+    return {
+        'id': str(uuid.uuid4()),
+        'title': payload.get('title', 'New Slide').strip(),
+        'content': payload.get('content', ''),
+        'image': payload.get('image'),
+        'style': payload.get('style', {
+            'titleFontSize': 32,
+            'contentFontSize': 18,
+            'fontColor': '#000000',
+            'backgroundColor': '#ffffff',
+            'backgroundImage': None,
+            'backgroundOpacity': 100,
+            'backgroundBlur': 0
+        })
+    }
+
+
+@api.route('/presentations/<pres_id>/slides', methods=['POST'])
 @token_required
 def create_slide(pres_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id, with_slides=False)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
         if pres['owner'] != request.user:
             return jsonify({'message': 'Forbidden'}), 403
         
-        payload = request.json or {}
-        slide = {
-            'id': str(uuid.uuid4()),
-            'title': payload.get('title', 'New Slide').strip(),
-            'content': payload.get('content', ''),
-            'image': payload.get('image'),
-            'style': payload.get('style', {
-                'titleFontSize': 32,
-                'contentFontSize': 18,
-                'fontColor': '#000000',
-                'backgroundColor': '#ffffff',
-                'backgroundImage': None,
-                'backgroundOpacity': 100,
-                'backgroundBlur': 0
-            })
-        }
-        
-        pres['slides'].append(slide)
-        pres['updated_at'] = datetime.datetime.utcnow().isoformat()
-        write_data(data)
+        slide = new_slide(request.json or {})
+        store.create_slide(pres_id, slide, now_iso(), expected_version=if_match_version())
+        blob_store.sync_slides(new_slides=[slide])
         return jsonify({'slide': slide}), 201
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'Failed to create slide', 'error': str(e)}), 500
 
 
-@app.route('/presentations/<pres_id>/slides/<slide_id>', methods=['PUT'])
+@api.route('/presentations/<pres_id>/slides/<slide_id>', methods=['PUT'])
 @token_required
 def update_slide(pres_id, slide_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id, with_slides=False)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
         if pres['owner'] != request.user:
             return jsonify({'message': 'Forbidden'}), 403
         
-        slide = next((s for s in pres['slides'] if s['id'] == slide_id), None)
+        slide = store.get_slide(pres_id, slide_id)
         if not slide:
             return jsonify({'message': 'Slide not found'}), 404
         
         payload = request.json or {}
+        old_slide = copy.deepcopy(slide)
         
         # Update allowed fields
         if 'title' in payload:
@@ -347,39 +679,42 @@ def update_slide(pres_id, slide_id):
         if 'style' in payload:
             slide['style'].update(payload['style'])
         
-        pres['updated_at'] = datetime.datetime.utcnow().isoformat()
-        write_data(data)
+        store.update_slide(pres_id, slide, now_iso(), expected_version=if_match_version())
+        blob_store.sync_slides([old_slide], [slide])
         return jsonify({'slide': slide}), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'Failed to update slide', 'error': str(e)}), 500
 
 
-@app.route('/presentations/<pres_id>/slides/<slide_id>', methods=['DELETE'])
+@api.route('/presentations/<pres_id>/slides/<slide_id>', methods=['DELETE'])
 @token_required
 def delete_slide(pres_id, slide_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id, with_slides=False)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
         if pres['owner'] != request.user:
             return jsonify({'message': 'Forbidden'}), 403
         
-        pres['slides'] = [s for s in pres['slides'] if s['id'] != slide_id]
-        pres['updated_at'] = datetime.datetime.utcnow().isoformat()
-        write_data(data)
+        old_slide = store.get_slide(pres_id, slide_id)
+        store.delete_slide(pres_id, slide_id, now_iso(), expected_version=if_match_version())
+        if old_slide:
+            blob_store.sync_slides(old_slides=[old_slide])
         return jsonify({'message': 'Slide deleted'}), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'Failed to delete slide', 'error': str(e)}), 500
 
 
-@app.route('/presentations/<pres_id>/slides/reorder', methods=['POST'])
+@api.route('/presentations/<pres_id>/slides/reorder', methods=['POST'])
 @token_required
 def reorder_slides(pres_id):
     try:
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id, with_slides=False)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
@@ -390,34 +725,255 @@ def reorder_slides(pres_id):
         slide_order = payload.get('slide_ids', [])
         
         # Reorder slides based on provided IDs
-        slide_map = {s['id']: s for s in pres['slides']}
-        new_slides = []
-        
-        for sid in slide_order:
-            if sid in slide_map:
-                new_slides.append(slide_map[sid])
-        
-        # Add any slides that weren't in the order list (shouldn't happen)
-        for s in pres['slides']:
-            if s not in new_slides:
-                new_slides.append(s)
-        
-        pres['slides'] = new_slides
-        pres['updated_at'] = datetime.datetime.utcnow().isoformat()
-        write_data(data)
-        return jsonify({'presentation': pres}), 200
+        pres = store.reorder_slides(pres_id, slide_order, now_iso(), expected_version=if_match_version())
+        return with_presentation_etag(jsonify({'presentation': pres}), pres), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'Failed to reorder slides', 'error': str(e)}), 500
 
 
+@api.route('/presentations/<pres_id>/slides/<slide_id>/move', methods=['POST'])
+@token_required
+def move_slide(pres_id, slide_id):
+    try:
+        pres = store.get_presentation(pres_id, with_slides=False)
+
+        if not pres:
+            return jsonify({'message': 'Presentation not found'}), 404
+        if pres['owner'] != request.user:
+            return jsonify({'message': 'Forbidden'}), 403
+
+        after = (request.json or {}).get('after')
+        if after == slide_id:
+            return jsonify({'message': 'Cannot move a slide after itself'}), 400
+
+        # Only the moved slide's rank changes; the rest of the deck is untouched
+        if not store.move_slide(pres_id, slide_id, after, now_iso(), expected_version=if_match_version()):
+            return jsonify({'message': 'Slide not found'}), 404
+        pres = store.get_presentation(pres_id, with_slides=False)
+        resp = jsonify({'slide_id': slide_id, 'after': after, 'version': deck_version(pres)})
+        return with_presentation_etag(resp, pres), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
+    except Exception as e:
+        return jsonify({'message': 'Failed to move slide', 'error': str(e)}), 500
+
+
+MAX_BATCH_OPS = 500
+SLIDE_FIELDS = ('title', 'content', 'image')
+
+
+def normalize_batch_ops(raw_ops):
+    """Validate a batch request's ops and turn them into storage batch ops.
+    Returns (ops, created) where created maps the ids the client gave new slides
+    to the ids the server assigned. Raises BatchError naming the first malformed op."""
+    if not isinstance(raw_ops, list) or not raw_ops:
+        raise BatchError(0, 'ops must be a non-empty list')
+    if len(raw_ops) > MAX_BATCH_OPS:
+        raise BatchError(MAX_BATCH_OPS, f'At most {MAX_BATCH_OPS} ops per batch')
+    ops = []
+    created = {}
+    for index, raw in enumerate(raw_ops):
+        if not isinstance(raw, dict):
+            raise BatchError(index, 'op must be an object')
+        kind = raw.get('op')
+        placement = {'after': created.get(raw['after'], raw['after'])} if 'after' in raw else {}
+        slide_id = created.get(raw.get('slide_id'), raw.get('slide_id'))
+        if kind == 'set_title':
+            title = str(raw.get('title') or '').strip()
+            if not title:
+                raise BatchError(index, 'Title cannot be empty')
+            ops.append({'op': 'set_title', 'title': title})
+        elif kind == 'create_slide':
+            payload = raw.get('slide') or {}
+            slide = new_slide(payload)
+            if payload.get('id') is not None:
+                ref = str(payload['id'])
+                if ref in created:
+                    raise BatchError(index, f'Slide {ref} is already created in this batch')
+                created[ref] = slide['id']
+            ops.append({'op': 'create_slide', 'slide': slide, **placement})
+        elif kind in ('update_slide', 'patch_style', 'move_slide', 'delete_slide'):
+            if not slide_id:
+                raise BatchError(index, 'slide_id is required')
+            if kind == 'update_slide':
+                fields = {k: raw[k] for k in SLIDE_FIELDS if k in raw}
+                if 'title' in fields:
+                    fields['title'] = fields['title'].strip()
+                op = {'op': 'update_slide', 'slide_id': slide_id, 'fields': fields}
+                if isinstance(raw.get('style'), dict):
+                    op['style'] = raw['style']
+                ops.append(op)
+            elif kind == 'patch_style':
+                if not isinstance(raw.get('style'), dict):
+                    raise BatchError(index, 'style must be an object')
+                ops.append({'op': 'patch_style', 'slide_id': slide_id, 'style': raw['style']})
+            elif kind == 'move_slide':
+                if 'after' not in raw:
+                    raise BatchError(index, 'after is required (a slide id, or null for first)')
+                ops.append({'op': 'move_slide', 'slide_id': slide_id, **placement})
+            else:
+                ops.append({'op': 'delete_slide', 'slide_id': slide_id})
+        else:
+            raise BatchError(index, f'Unknown op: {kind}')
+    return ops, created
+
+
+@api.route('/presentations/<pres_id>/batch', methods=['POST'])
+@token_required
+def batch_update(pres_id):
+    """
+    Apply an ordered list of edits in one request and one write. All or nothing:
+    if any op fails, nothing is saved and the response names the failing op.
+    Body: {ops: [
+      {op: 'set_title', title},
+      {op: 'create_slide', slide: {id?, title, content, image, style}, after?},
+      {op: 'update_slide', slide_id, title?, content?, image?, style?},
+      {op: 'patch_style', slide_id, style},
+      {op: 'move_slide', slide_id, after},
+      {op: 'delete_slide', slide_id}]}
+    'after' is the id of the slide to follow, or null for the first position; a
+    created slide without 'after' is appended. New slides always get a server id; a
+    client 'id' only names the slide for later ops in the same batch, and the response's
+    'created' maps each such name to the assigned id.
+    """
+    try:
+        pres = store.get_presentation(pres_id, with_slides=False)
+        
+        if not pres:
+            return jsonify({'message': 'Presentation not found'}), 404
+        if pres['owner'] != request.user:
+            return jsonify({'message': 'Forbidden'}), 403
+        
+        payload = request.json or {}
+        try:
+            ops, created = normalize_batch_ops(payload.get('ops'))
+            result = store.apply_batch(pres_id, ops, now_iso(), expected_version=if_match_version())
+        except BatchError as e:
+            return jsonify({'message': str(e), 'op_index': e.index}), 400
+        except VersionConflict as e:
+            return version_conflict(e.current)
+        if result is None:
+            return jsonify({'message': 'Presentation not found'}), 404
+        
+        before, pres = result
+        blob_store.sync_slides(before['slides'], pres['slides'])
+        resp = jsonify({'presentation': pres, 'applied': len(payload['ops']), 'created': created})
+        return with_presentation_etag(resp, pres), 200
+    except Exception as e:
+        return jsonify({'message': 'Failed to apply batch', 'error': str(e)}), 500
+
+
 # ============== LLM HELPERS ==============
 
-def call_llm_for_structured_content(prompt, context=''):
+# /generate fans per-slide prompts out over this pool; each provider also caps
+# its own in-flight requests so a large deck can't trip provider rate limits.
+LLM_MAX_WORKERS = int(os.environ.get('LLM_MAX_WORKERS', 8))
+PROVIDER_CONCURRENCY = {
+    'anthropic': int(os.environ.get('ANTHROPIC_CONCURRENCY', 4)),
+    'gemini': int(os.environ.get('GOOGLE_CONCURRENCY', 4)),
+}
+LLM_RETRIES = int(os.environ.get('LLM_RETRIES', 2))
+LLM_BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', 0.5))
+LLM_BACKOFF_MAX = float(os.environ.get('LLM_BACKOFF_MAX', 8))
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 30))
+BREAKER_FAILURES = int(os.environ.get('BREAKER_FAILURES', 5))
+BREAKER_RESET_SECONDS = float(os.environ.get('BREAKER_RESET_SECONDS', 30))
+# Endpoints are overridable so benchmarks can point them at a local stub server
+ANTHROPIC_API_URL = os.environ.get('ANTHROPIC_API_URL', 'https://api.anthropic.com/v1/messages')
+GOOGLE_API_BASE = os.environ.get('GOOGLE_API_BASE', 'https://generativelanguage.googleapis.com/v1beta2')
+llm_providers = None  # set by create_app()
+llm_executor = None  # set by create_app()
+
+
+def make_llm_providers():
+    """
+    Pooled keep-alive sessions with jittered retry on 429/5xx and a circuit
+    breaker per provider; an open breaker skips straight to the fallback.
+    """
+    return {
+        name: ProviderClient(
+            name,
+            max_concurrency=n,
+            retries=LLM_RETRIES,
+            backoff_base=LLM_BACKOFF_BASE,
+            backoff_max=LLM_BACKOFF_MAX,
+            timeout=LLM_TIMEOUT,
+            breaker=CircuitBreaker(failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS),
+        )
+        for name, n in PROVIDER_CONCURRENCY.items()
+    }
+
+
+# 'per_slide' sends one prompt per slide; 'deck' asks for the whole deck in one
+# streamed response. Overridable per request via the 'strategy' field.
+GENERATION_STRATEGY = os.environ.get('GENERATION_STRATEGY', 'per_slide')
+DECK_MAX_TOKENS = int(os.environ.get('DECK_MAX_TOKENS', 4096))
+
+# Input longer than SLIDE_INPUT_TOKENS is summarised chunk by chunk first, so
+# each slide prompt carries at most SLIDE_INPUT_TOKENS of source material (its
+# own section plus a deck outline) instead of the whole text.
+CONDENSE_CHUNK_TOKENS = int(os.environ.get('CONDENSE_CHUNK_TOKENS', 2000))
+SLIDE_INPUT_TOKENS = int(os.environ.get('SLIDE_INPUT_TOKENS', 1200))
+
+# Cache of structured LLM results keyed on the normalized prompt plus the
+# provider chain (models and generation parameters) that would serve it.
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', '1') == '1'
+LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 24 * 3600))
+llm_cache = None  # set by create_app()
+
+
+def make_llm_cache():
+    return TieredCache(
+        MemoryCache(max_items=int(os.environ.get('LLM_CACHE_MEMORY_ITEMS', 256)), ttl=LLM_CACHE_TTL),
+        DiskCache(os.path.join(CACHE_DIR, 'llm.db'),
+                  max_items=int(os.environ.get('LLM_CACHE_DISK_ITEMS', 5000)), ttl=LLM_CACHE_TTL),
+        enabled=LLM_CACHE_ENABLED,
+    )
+
+
+def llm_provider_signature():
+    """Providers, models and generation parameters that would answer a prompt right now."""
+    providers = []
+    if os.environ.get('ANTHROPIC_API_KEY'):
+        providers.append(['anthropic', os.environ.get('ANTHROPIC_MODEL', 'claude-3-sonnet-20240229'),
+                          int(os.environ.get('ANTHROPIC_MAX_TOKENS', 1024))])
+    if os.environ.get('GOOGLE_API_KEY') or os.environ.get('GOOGLE_KEY'):
+        providers.append(['gemini', os.environ.get('GOOGLE_MODEL', 'models/text-bison-001'),
+                          float(os.environ.get('GOOGLE_TEMPERATURE', 0.2)),
+                          int(os.environ.get('GOOGLE_MAX_TOKENS', 1024))])
+    return providers
+
+
+def llm_cache_key(prompt):
+    normalized = ' '.join(prompt.split())
+    return make_key('structured', normalized, llm_provider_signature())
+
+
+def call_llm_for_structured_content(prompt, context='', fresh=False):
     """
     Call Anthropic (primary) or Gemini (fallback) with a structured prompt for deep analysis.
     Returns: dict with 'title' and 'bullets' (list of strings) or None if all fail.
-    Falls back gracefully if no API keys are set.
+    Successful results are cached; fresh=True skips the lookup and refreshes the entry.
     """
+    key = llm_cache_key(prompt)
+    if fresh:
+        llm_cache.bypass()
+    else:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = call_llm_providers(prompt, context)
+    if result is not None:
+        llm_cache.set(key, result)
+    return result
+
+
+def call_llm_providers(prompt, context=''):
+    """Uncached provider chain behind call_llm_for_structured_content.
+    Falls back gracefully if no API keys are set."""
     full_prompt = f"""
     {prompt}
 
@@ -437,9 +993,11 @@ def call_llm_for_structured_content(prompt, context=''):
     # Try Anthropic first (using v1/messages endpoint for Claude 3.x)
     ANTHROPIC_KEY = os.environ.get('ANTHROPIC_API_KEY')
     if ANTHROPIC_KEY:
+        started = time.perf_counter()
+        outcome = 'error'
         try:
             anthropic_model = os.environ.get('ANTHROPIC_MODEL', 'claude-3-sonnet-20240229')
-            anthropic_url = 'https://api.anthropic.com/v1/messages'
+            anthropic_url = ANTHROPIC_API_URL
             anthropic_payload = {
                 'model': anthropic_model,
                 'max_tokens': int(os.environ.get('ANTHROPIC_MAX_TOKENS', 1024)),
@@ -447,16 +1005,17 @@ def call_llm_for_structured_content(prompt, context=''):
                     {'role': 'user', 'content': full_prompt}
                 ]
             }
-            resp = requests.post(
-                anthropic_url,
-                headers={
-                    'x-api-key': ANTHROPIC_KEY,
-                    'anthropic-version': '2023-06-01',
-                    'Content-Type': 'application/json'
-                },
-                json=anthropic_payload,
-                timeout=30,
-            )
+            client = llm_providers['anthropic']
+            with client.slots:
+                resp = client.post(
+                    anthropic_url,
+                    headers={
+                        'x-api-key': ANTHROPIC_KEY,
+                        'anthropic-version': '2023-06-01',
+                        'Content-Type': 'application/json'
+                    },
+                    json=anthropic_payload,
+                )
             if resp.status_code == 200:
                 j = resp.json()
                 # Extract text from content blocks
@@ -473,31 +1032,48 @@ def call_llm_for_structured_content(prompt, context=''):
                         if json_str.endswith('```'):
                             json_str = json_str[:-3]
                         
+                        outcome = 'invalid'
                         result = json.loads(json_str.strip())
                         if 'title' in result and 'bullets' in result:
                             print(f'[Anthropic] Generated slide: {result["title"][:50]}...')
+                            outcome = 'ok'
                             return result
                     except json.JSONDecodeError as je:
                         print(f'Anthropic response not JSON: {text[:100]}... Error: {je}')
+                else:
+                    outcome = 'empty'
             else:
+                outcome = f'http_{resp.status_code}'
                 print(f'Anthropic returned {resp.status_code}: {resp.text[:200]}')
+        except ProviderUnavailable as e:
+            outcome = 'unavailable'
+            print(f'Skipping Anthropic: {e}')
         except Exception as e:
             print(f'Anthropic call failed: {e}')
             traceback.print_exc()
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started,
+                                     provider='anthropic', mode='structured', outcome=outcome)
 
     # Try Gemini/PaLM fallback
     GOOGLE_KEY = os.environ.get('GOOGLE_API_KEY') or os.environ.get('GOOGLE_KEY')
     if GOOGLE_KEY:
+        if ANTHROPIC_KEY:
+            llm_fallbacks.inc(to='gemini')
+        started = time.perf_counter()
+        outcome = 'error'
         try:
             GOOGLE_MODEL = os.environ.get('GOOGLE_MODEL', 'models/text-bison-001')
-            gemini_url = f'https://generativelanguage.googleapis.com/v1beta2/{GOOGLE_MODEL}:generateText'
+            gemini_url = f'{GOOGLE_API_BASE}/{GOOGLE_MODEL}:generateText'
             params = {'key': GOOGLE_KEY}
             gemini_payload = {
                 'prompt': {'text': full_prompt},
                 'temperature': float(os.environ.get('GOOGLE_TEMPERATURE', 0.2)),
                 'maxOutputTokens': int(os.environ.get('GOOGLE_MAX_TOKENS', 1024)),
             }
-            resp = requests.post(gemini_url, params=params, json=gemini_payload, timeout=30)
+            client = llm_providers['gemini']
+            with client.slots:
+                resp = client.post(gemini_url, params=params, json=gemini_payload)
             if resp.status_code in (200, 201):
                 j = resp.json()
                 text = ''
@@ -514,51 +1090,424 @@ def call_llm_for_structured_content(prompt, context=''):
                         if json_str.endswith('```'):
                             json_str = json_str[:-3]
 
+                        outcome = 'invalid'
                         result = json.loads(json_str.strip())
                         if 'title' in result and 'bullets' in result:
                             print(f'[Gemini] Generated slide: {result["title"][:50]}...')
+                            outcome = 'ok'
                             return result
                     except json.JSONDecodeError as je:
                         print(f'Gemini response not JSON: {text[:100]}... Error: {je}')
+                else:
+                    outcome = 'empty'
             else:
+                outcome = f'http_{resp.status_code}'
                 print(f'Gemini returned {resp.status_code}: {resp.text[:200]}')
+        except ProviderUnavailable as e:
+            outcome = 'unavailable'
+            print(f'Skipping Gemini: {e}')
         except Exception as e:
             print(f'Gemini call failed: {e}')
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started,
+                                     provider='gemini', mode='structured', outcome=outcome)
 
     # Fallback: return None (caller handles fallback)
+    if ANTHROPIC_KEY or GOOGLE_KEY:
+        llm_fallbacks.inc(to='placeholder')
     return None
 
 
-# ============== FILE UPLOAD & PARSING ==============
+def stream_llm_text(prompt, max_tokens):
+    """Yield raw response text chunks for a prompt.
+    Anthropic is streamed over SSE; Gemini (no streaming endpoint) yields its whole
+    reply as one chunk. Falls through to Gemini only if Anthropic produced nothing."""
+    ANTHROPIC_KEY = os.environ.get('ANTHROPIC_API_KEY')
+    if ANTHROPIC_KEY:
+        produced = False
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            anthropic_model = os.environ.get('ANTHROPIC_MODEL', 'claude-3-sonnet-20240229')
+            client = llm_providers['anthropic']
+            with client.slots:
+                resp = client.post(
+                    ANTHROPIC_API_URL,
+                    headers={
+                        'x-api-key': ANTHROPIC_KEY,
+                        'anthropic-version': '2023-06-01',
+                        'Content-Type': 'application/json'
+                    },
+                    json={
+                        'model': anthropic_model,
+                        'max_tokens': max_tokens,
+                        'stream': True,
+                        'messages': [{'role': 'user', 'content': prompt}]
+                    },
+                    stream=True,
+                )
+                with resp:
+                    if resp.status_code != 200:
+                        outcome = f'http_{resp.status_code}'
+                        print(f'Anthropic stream returned {resp.status_code}: {resp.text[:200]}')
+                    else:
+                        for line in resp.iter_lines(decode_unicode=True):
+                            if not line or not line.startswith('data:'):
+                                continue
+                            event = json.loads(line[5:].strip())
+                            if event.get('type') == 'content_block_delta':
+                                text = event.get('delta', {}).get('text', '')
+                                if text:
+                                    produced = True
+                                    yield text
+                            elif event.get('type') == 'message_stop':
+                                break
+                        outcome = 'ok' if produced else 'empty'
+        except ProviderUnavailable as e:
+            outcome = 'unavailable'
+            print(f'Anthropic stream failed: {e}')
+        except Exception as e:
+            print(f'Anthropic stream failed: {e}')
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started,
+                                     provider='anthropic', mode='stream', outcome=outcome)
+        if produced:
+            return
+
+    GOOGLE_KEY = os.environ.get('GOOGLE_API_KEY') or os.environ.get('GOOGLE_KEY')
+    if GOOGLE_KEY:
+        if ANTHROPIC_KEY:
+            llm_fallbacks.inc(to='gemini')
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            GOOGLE_MODEL = os.environ.get('GOOGLE_MODEL', 'models/text-bison-001')
+            gemini_url = f'{GOOGLE_API_BASE}/{GOOGLE_MODEL}:generateText'
+            client = llm_providers['gemini']
+            with client.slots:
+                resp = client.post(gemini_url, params={'key': GOOGLE_KEY}, json={
+                    'prompt': {'text': prompt},
+                    'temperature': float(os.environ.get('GOOGLE_TEMPERATURE', 0.2)),
+                    'maxOutputTokens': max_tokens,
+                })
+            if resp.status_code in (200, 201):
+                j = resp.json()
+                if 'candidates' in j and j['candidates']:
+                    text = j['candidates'][0].get('content', '')
+                else:
+                    text = j.get('output') or j.get('content') or ''
+                outcome = 'ok' if text else 'empty'
+                if text:
+                    yield text
+            else:
+                outcome = f'http_{resp.status_code}'
+                print(f'Gemini returned {resp.status_code}: {resp.text[:200]}')
+        except ProviderUnavailable as e:
+            outcome = 'unavailable'
+            print(f'Gemini call failed: {e}')
+        except Exception as e:
+            print(f'Gemini call failed: {e}')
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started,
+                                     provider='gemini', mode='stream', outcome=outcome)
+
+
+def slide_prompt(title, details, i, slide_count):
+    return f"""Presentation: "{title}"
+                Input content: {details}
+
+                Create slide {i+1} of {slide_count} that deeply analyzes and structures this information.
+                Provide actionable insights and reasoning for this section."""
+
+
+def deck_prompt(title, details, slide_count):
+    return f"""Presentation: "{title}"
+    Input content: {details}
+
+    Create a {slide_count}-slide presentation that deeply analyzes and structures this information,
+    one section per slide, with actionable insights and reasoning.
+
+    Respond with ONLY a JSON array of exactly {slide_count} objects, in slide order:
+    [
+      {{"title": "A concise, insightful title (max 10 words)", "bullets": ["point", "point", "point"]}}
+    ]
+    No markdown or extra text."""
+
 
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF file"""
+def summary_prompt(title, chunk, i, chunk_count):
+    return f"""Presentation: "{title}"
+    Source excerpt {i+1} of {chunk_count}: {chunk}
+
+    Condense this excerpt for the author of the presentation: use the title for the topic it
+    covers and the bullets for its key facts, figures and arguments. Keep names and numbers."""
+
+
+def condense_details(title, details, slide_count, fresh=False):
+    """
+    Map-reduce long input into per-slide prompt material.
+    Map: chunks of the input are summarised in parallel. Reduce: the summaries become
+    sections assigned to slides in document order, each paired with a short outline.
+    Returns {'slides': [input per slide], 'deck': input for a whole-deck prompt},
+    or None when the input is short enough to send as-is.
+    """
+    if estimate_tokens(details) <= SLIDE_INPUT_TOKENS:
+        return None
+    started = time.monotonic()
+    chunks = chunk_text(details, CONDENSE_CHUNK_TOKENS)
+    futures = [
+        llm_executor.submit(call_llm_for_structured_content,
+                            summary_prompt(title, chunk, i, len(chunks)), fresh=fresh)
+        for i, chunk in enumerate(chunks)
+    ]
+    sections = []
+    for chunk, future in zip(chunks, futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f'Chunk summary failed: {e}')
+            result = None
+        if is_slide_result(result):
+            sections.append((result['title'], '\n'.join(f'• {b}' for b in result['bullets'])))
+        else:
+            # No summary: keep the start of the excerpt itself
+            sections.append((truncate_to_tokens(chunk.split('\n', 1)[0], 20), chunk))
+
+    outline = truncate_to_tokens('\n'.join(f'{i+1}. {heading}' for i, (heading, _) in enumerate(sections)),
+                                 SLIDE_INPUT_TOKENS // 4)
+    section_budget = max(1, SLIDE_INPUT_TOKENS - estimate_tokens(outline))
+    slide_material = [
+        truncate_to_tokens('\n\n'.join(f'{sections[j][0]}\n{sections[j][1]}' for j in group), section_budget)
+        for group in assign_sections(len(sections), slide_count)
+    ]
+    print(f'[Condense] {estimate_tokens(details)} tokens -> {len(sections)} sections '
+          f'in {time.monotonic() - started:.2f}s')
+    return {
+        'slides': [f'Deck outline:\n{outline}\n\nMaterial for this slide:\n{m}' for m in slide_material],
+        'deck': f'Deck outline:\n{outline}\n\n' + '\n\n'.join(
+            f'Material for slide {k+1}:\n{m}' for k, m in enumerate(slide_material)),
+    }
+
+
+def is_slide_result(result):
+    return isinstance(result, dict) and isinstance(result.get('title'), str) and isinstance(result.get('bullets'), list)
+
+
+def build_generated_slide(title, i, llm_result):
+    """Turn an LLM {title, bullets} result (or None) into slide i of a generated deck."""
+    if llm_result:
+        slide_title = llm_result.get('title', f'{title} - Slide {i+1}')
+        bullets = llm_result.get('bullets', [])
+        slide_content = '\n'.join([f"• {b}" for b in bullets]) if bullets else 'Generated content'
+    else:
+        slide_title = f'{title} - Slide {i+1}'
+        slide_content = 'Content to be filled'
+
+    return {
+        'id': str(uuid.uuid4()),
+        'title': slide_title,
+        'content': slide_content,
+        'image': None,
+        'style': {
+            'titleFontSize': 32,
+            'contentFontSize': 18,
+            'fontColor': '#000000',
+            'backgroundColor': '#ffffff',
+            'backgroundImage': None,
+            'backgroundOpacity': 100,
+            'backgroundBlur': 0
+        }
+    }
+
+
+def iter_slide_results(title, inputs, slide_count, positions, fresh=False):
+    """Run one LLM call per slide position concurrently; yield (position, result) as each finishes.
+    inputs[i] is the source material for slide i."""
+    futures = {
+        llm_executor.submit(call_llm_for_structured_content,
+                            slide_prompt(title, inputs[i], i, slide_count), fresh=fresh): i
+        for i in positions
+    }
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f'Slide {futures[future] + 1} generation failed: {e}')
+            result = None
+        yield futures[future], result
+
+
+def iter_deck_results(title, details, inputs, slide_count, fresh=False):
+    """Ask for the whole deck in one streamed response, yielding (position, result) as
+    each slide object is parsed. Missing or malformed slides are regenerated per slide
+    from their own inputs."""
+    done = set()
+    parser = JSONArrayStream()
+    received = 0
     try:
-        text = []
-        with open(file_path, 'rb') as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages:
-                text.append(page.extract_text())
-        return '\n'.join(text)
+        for chunk in stream_llm_text(deck_prompt(title, details, slide_count), DECK_MAX_TOKENS):
+            for item in parser.feed(chunk):
+                if received < slide_count and is_slide_result(item):
+                    done.add(received)
+                    yield received, item
+                received += 1
+            if parser.done or received >= slide_count:
+                break
     except Exception as e:
-        print(f"PDF extraction error: {e}")
-        return None
+        print(f'Deck generation stream failed: {e}')
+
+    missing = [i for i in range(slide_count) if i not in done]
+    if missing:
+        print(f'[Deck] {len(missing)} of {slide_count} slides missing, falling back to per-slide calls')
+        yield from iter_slide_results(title, inputs, slide_count, missing, fresh=fresh)
+
+
+def iter_ai_results(title, details, slide_count, strategy='per_slide', fresh=False):
+    """Yield (position, llm_result or None) for every slide, in completion order.
+    Long details are condensed first (see condense_details)."""
+    condensed = condense_details(title, details, slide_count, fresh=fresh)
+    if condensed:
+        inputs, deck_input = condensed['slides'], condensed['deck']
+    else:
+        inputs, deck_input = [details] * slide_count, details
+    if strategy == 'deck':
+        return iter_deck_results(title, deck_input, inputs, slide_count, fresh=fresh)
+    return iter_slide_results(title, inputs, slide_count, range(slide_count), fresh=fresh)
+
+
+def generate_ai_slides(title, details, slide_count, strategy='per_slide', fresh=False, check_cancelled=None):
+    """Generate every slide with the LLM and return them in deck order.
+    Slides whose call fails get placeholder content, as before."""
+    results = [None] * slide_count
+    for i, result in iter_ai_results(title, details, slide_count, strategy, fresh):
+        results[i] = result
+        if check_cancelled:
+            check_cancelled()
+    return [build_generated_slide(title, i, r) for i, r in enumerate(results)]
+
+
+def build_text_slides(title, details, slide_count):
+    """Simple slide creation without LLM: one sentence of the input per slide."""
+    slides = []
+    sentences = [s.strip() for s in details.split('.') if s.strip()]
+    for i in range(slide_count):
+        s_idx = min(i, len(sentences) - 1) if sentences else 0
+        content = sentences[s_idx] if sentences else f'Slide {i+1} content'
+        
+        slides.append({
+            'id': str(uuid.uuid4()),
+            'title': f'{title} - Slide {i+1}',
+            'content': content,
+            'image': None,
+            'style': {
+                'titleFontSize': 32,
+                'contentFontSize': 18,
+                'fontColor': '#000000',
+                'backgroundColor': '#ffffff',
+                'backgroundImage': None,
+                'backgroundOpacity': 100,
+                'backgroundBlur': 0
+            }
+        })
+    return slides
+
+
+# ============== FILE UPLOAD & PARSING ==============
+
+pdf_executor = None
+pdf_executor_lock = threading.Lock()
+
+
+# Extracted documents keyed by content digest. Same bytes, same text: no TTL,
+# just LRU eviction once the disk tier passes its size cap.
+document_cache = None  # set by create_app()
+
 
+# Bump when extraction output changes so cached documents are re-extracted.
+DOC_EXTRACT_VERSION = 1
 
-def extract_text_from_document(file_path):
-    """Extract text from TXT or DOC/DOCX files"""
+
+def document_key(data, ext):
+    """document_id for uploaded bytes: the same file under another extension or extractor is another entry."""
+    return make_key('document', DOC_EXTRACT_VERSION, ext, hashlib.sha256(data).hexdigest())
+
+
+def make_document_cache():
+    return TieredCache(
+        MemoryCache(max_items=int(os.environ.get('DOC_CACHE_MEMORY_ITEMS', 16))),
+        DiskCache(os.path.join(CACHE_DIR, 'documents.db'),
+                  max_items=int(os.environ.get('DOC_CACHE_DISK_ITEMS', 2000)), max_bytes=DOC_CACHE_MAX_BYTES),
+    )
+
+
+def get_pdf_executor():
+    """
+    Process pool for PDF page ranges, started on first use. Workers are spawned
+    rather than forked: forking a process that already runs request, job and
+    pool threads can copy locks held by those threads into the child.
+    """
+    global pdf_executor
+    with pdf_executor_lock:
+        if pdf_executor is None and DOC_EXTRACT_WORKERS > 1:
+            pdf_executor = ProcessPoolExecutor(
+                max_workers=DOC_EXTRACT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return pdf_executor
+
+
+def extract_pdf_pages(data, max_pages, max_chars):
+    """Iterate (page_index, text) for an in-memory PDF within the given budget"""
+    started = time.perf_counter()
+    pages = iter_pdf_pages(
+        data,
+        executor=get_pdf_executor(),
+        pages_per_task=DOC_PAGES_PER_TASK,
+        max_pages=max_pages,
+        max_chars=max_chars,
+        window=DOC_EXTRACT_WORKERS * 2,
+    )
+    try:
+        for page in pages:
+            pdf_pages_extracted.inc()
+            yield page
+    finally:
+        pages.close()
+        pdf_extract_seconds.observe(time.perf_counter() - started)
+
+
+def extract_text_from_document(data):
+    """Extract text from TXT or DOC/DOCX uploads"""
     try:
         # Try reading as plaintext first
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
+        return data.decode('utf-8', errors='ignore')
     except Exception as e:
         print(f"Text extraction error: {e}")
         return None
 
 
-@app.route('/upload-document', methods=['POST'])
+def document_budget(values):
+    """(max_pages, max_chars) requested by the client, capped by the server limits"""
+    def bounded(name, cap):
+        try:
+            value = int(values.get(name) or cap)
+        except ValueError:
+            raise ValueError(f'{name} must be an integer')
+        if value < 1:
+            raise ValueError(f'{name} must be positive')
+        return min(value, cap)
+    return bounded('max_pages', DOC_MAX_PAGES), bounded('max_chars', DOC_MAX_CHARS)
+
+
+@api.route('/upload-document', methods=['POST'])
 @token_required
 def upload_document():
+    """
+    Extract text from an uploaded document. Optional fields (form or query):
+    max_pages, max_chars - stop early once either budget is reached
+    stream=1 - answer as Server-Sent Events while pages complete:
+      'document' {id, filename, page_count, cached}, 'page' {index, text},
+      'done' {document_id, pages, chars, truncated}, 'error' {message}
+    Results are cached by document_id (from the file's SHA-256, its type and the
+    extractor version), which /generate accepts in place of re-sending the text.
+    """
     try:
         if 'file' not in request.files:
             return jsonify({'message': 'No file provided'}), 400
@@ -574,32 +1523,81 @@ def upload_document():
         if ext not in ALLOWED_TEXT_EXTS:
             return jsonify({'message': f'Allowed formats: {", ".join(ALLOWED_TEXT_EXTS)}'}), 400
         
-        # Save file temporarily
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{filename}")
-        file.save(temp_path)
+        try:
+            max_pages, max_chars = document_budget(request.values)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
-        # Extract text
-        text = None
-        if ext == 'pdf':
-            text = extract_text_from_pdf(temp_path)
+        # Work on the upload in memory (bounded by MAX_CONTENT_LENGTH)
+        data = file.read()
+        doc_id = document_key(data, ext)
+        cached = document_cache.get(doc_id)
+        if cached and not document_covers(cached, max_pages, max_chars):
+            cached = None  # extracted under a smaller budget; redo it with this one
+        if cached:
+            page_count = cached['page_count']
+            pages = iter_document_pages(cached, max_pages, max_chars)
+        elif ext == 'pdf':
+            try:
+                page_count = pdf_page_count(data)
+            except Exception as e:
+                print(f"PDF extraction error: {e}")
+                return jsonify({'message': 'Could not extract text from document'}), 400
+            pages = extract_pdf_pages(data, max_pages, max_chars)
         else:
-            text = extract_text_from_document(temp_path)
+            page_count = 1
+            pages = iter_text_pages(extract_text_from_document(data), max_chars)
         
-        # Clean up temp file
-        try:
-            os.remove(temp_path)
-        except:
-            pass
+        if request.values.get('stream') == '1':
+            def events():
+                yield sse_event('document', {'id': doc_id, 'filename': filename, 'page_count': page_count,
+                                             'cached': bool(cached)})
+                texts = []
+                try:
+                    for index, text in pages:
+                        texts.append(text)
+                        yield sse_event('page', {'index': index, 'text': text})
+                    doc = build_document(doc_id, filename, texts, page_count, max_pages, max_chars)
+                    if not cached and doc['text'].strip():
+                        document_cache.set(doc_id, doc)
+                    yield sse_event('done', {
+                        'document_id': doc_id,
+                        'pages': doc['pages'],
+                        'chars': sum(len(t) for t in texts),
+                        'truncated': doc['truncated'],
+                    })
+                except Exception as e:
+                    yield sse_event('error', {'message': 'Extraction failed', 'error': str(e)})
+                finally:
+                    # Client went away or budget hit: drop queued page ranges
+                    pages.close()
+            
+            return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no',
+            })
         
-        if not text:
+        doc = build_document(doc_id, filename, [text for _, text in pages], page_count, max_pages, max_chars)
+        if not doc['text'].strip():
             return jsonify({'message': 'Could not extract text from document'}), 400
+        if not cached:
+            document_cache.set(doc_id, doc)
         
-        return jsonify({'text': text, 'filename': filename}), 200
+        return jsonify({
+            'text': doc['text'],
+            'filename': filename,
+            'document_id': doc_id,
+            'pages': doc['pages'],
+            'page_count': page_count,
+            'page_offsets': doc['page_offsets'],
+            'truncated': doc['truncated'],
+            'cached': bool(cached),
+        }), 200
     except Exception as e:
         return jsonify({'message': 'Upload failed', 'error': str(e)}), 500
 
 
-@app.route('/upload-image', methods=['POST'])
+@api.route('/upload-image', methods=['POST'])
 @token_required
 def upload_image():
     try:
@@ -617,164 +1615,452 @@ def upload_image():
         if ext not in ALLOWED_IMAGE_EXTS:
             return jsonify({'message': f'Allowed formats: {", ".join(ALLOWED_IMAGE_EXTS)}'}), 400
         
-        # Save with unique name
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(save_path)
+        # Store by content digest; identical bytes share one file
+        url, digest, deduplicated = blob_store.put(file.stream, 'jpg' if ext == 'jpeg' else ext)
         
-        url = f'/uploads/{unique_filename}'
-        return jsonify({'url': url}), 201
+        # Resized renditions are built in the background; until one exists its
+        # URL serves the master
+        relpath = url[len('/uploads/'):]
+        image_executor.submit(build_image_variants, relpath)
+        variants = {name: '/uploads/' + variant_relpath(relpath, name) for name in IMAGE_VARIANT_WIDTHS}
+        return jsonify({'url': url, 'digest': digest, 'deduplicated': deduplicated, 'variants': variants}), 201
     except Exception as e:
         return jsonify({'message': 'Upload failed', 'error': str(e)}), 500
 
 
-@app.route('/uploads/<path:filename>')
+def build_image_variants(relpath):
+    try:
+        generate_variants(UPLOAD_DIR, relpath, IMAGE_VARIANT_WIDTHS)
+    except Exception as e:
+        print(f'Could not build variants for {relpath}: {e}')
+
+
+def collect_blobs():
+    """
+    Drop images unreferenced for BLOB_GC_GRACE_SECONDS. The slide routes keep the
+    reference counts; the image fields read here only stop GC from deleting an
+    image a slide still uses if its count drifted to zero.
+    """
+    live = Counter(d for d in map(digest_from_url, store.upload_refs()) if d)
+    freed = blob_store.collect_garbage(live)
+    if freed:
+        print(f'Blob GC freed {freed} bytes')
+
+
+def run_blob_gc(stop):
+    """Background thread started by create_app(): collect at startup, then every
+    BLOB_GC_INTERVAL seconds until `stop` is set. Of several worker processes
+    sharing the index only the one holding its GC lock collects."""
+    while not stop.is_set():
+        try:
+            if blob_store.claim_gc():
+                collect_blobs()
+        except Exception as e:
+            print(f'Blob GC failed: {e}')
+        stop.wait(BLOB_GC_INTERVAL)
+
+
+@api.route('/uploads/<path:filename>')
 def uploaded_file(filename):
+    if any(part.startswith('.') for part in filename.split('/')):
+        return jsonify({'message': 'File not found'}), 404
     try:
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        master = master_relpath_for_variant(filename)
+        if master and not os.path.exists(safe_join(UPLOAD_DIR, filename) or ''):
+            # Variant not rendered (yet, or master too small): fall back to the master
+            resp = send_from_directory(UPLOAD_DIR, master)
+            resp.headers['Cache-Control'] = 'no-cache'
+            return resp
+        resp = send_from_directory(UPLOAD_DIR, filename)
+        if master or BLOB_PATH_RE.match(filename):
+            # Content-addressed: the bytes behind this URL never change
+            resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return resp
     except Exception as e:
         return jsonify({'message': 'File not found'}), 404
 
 
 # ============== EXPORT ==============
 
-@app.route('/presentations/<pres_id>/export', methods=['GET'])
+@api.route('/presentations/<pres_id>/export', methods=['GET'])
 @token_required
 def export_presentation(pres_id):
     try:
-        if not PPTXPresentation:
+        if not optional_import('pptx'):
             return jsonify({'message': 'python-pptx not installed'}), 500
         
-        data = read_data()
-        pres = data.get('presentations', {}).get(pres_id)
+        pres = store.get_presentation(pres_id)
         
         if not pres:
             return jsonify({'message': 'Presentation not found'}), 404
         if pres['owner'] != request.user:
             return jsonify({'message': 'Forbidden'}), 403
         
-        # Create PPTX
-        prs = PPTXPresentation()
-        prs.slide_width = Inches(10)
-        prs.slide_height = Inches(7.5)
-        
-        for slide_data in pres['slides']:
-            # Use blank slide layout
-            blank_layout = prs.slide_layouts[6]
-            slide = prs.slides.add_slide(blank_layout)
-            
-            style = slide_data.get('style', {})
-            bg_color = style.get('backgroundColor', '#ffffff')
-            
-            # Set background color
-            background = slide.background
-            fill = background.fill
-            fill.solid()
-            
-            # Parse hex color
-            if bg_color.startswith('#'):
-                r = int(bg_color[1:3], 16)
-                g = int(bg_color[3:5], 16)
-                b = int(bg_color[5:7], 16)
-            else:
-                r, g, b = 255, 255, 255
-            
-            fill.fore_color.rgb = RGBColor(r, g, b)
-            
-            # Add title
-            title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1.5))
-            title_frame = title_box.text_frame
-            title_frame.word_wrap = True
-            p = title_frame.paragraphs[0]
-            p.text = slide_data.get('title', '')
-            p.font.size = Pt(style.get('titleFontSize', 32))
-            p.font.bold = True
-            
-            font_color = style.get('fontColor', '#000000')
-            if font_color.startswith('#'):
-                r = int(font_color[1:3], 16)
-                g = int(font_color[3:5], 16)
-                b = int(font_color[5:7], 16)
-            else:
-                r, g, b = 0, 0, 0
-            p.font.color.rgb = RGBColor(r, g, b)
-            
-            # Add content
-            content_box = slide.shapes.add_textbox(Inches(0.5), Inches(2.2), Inches(9), Inches(4))
-            content_frame = content_box.text_frame
-            content_frame.word_wrap = True
-            p = content_frame.paragraphs[0]
-            p.text = slide_data.get('content', '')
-            p.font.size = Pt(style.get('contentFontSize', 18))
-            p.font.color.rgb = RGBColor(r, g, b)
-            
-            # Add image if present
-            if slide_data.get('image'):
-                try:
-                    img_path = slide_data['image']
-                    if img_path.startswith('/uploads/'):
-                        img_path = os.path.join(app.config['UPLOAD_FOLDER'], img_path.split('/')[-1])
-                    
-                    if os.path.exists(img_path):
-                        slide.shapes.add_picture(img_path, Inches(5.5), Inches(2.2), width=Inches(4))
-                except Exception as e:
-                    print(f"Could not add image: {e}")
-        
-        # Save to temp file
-        output_file = os.path.join(app.config['UPLOAD_FOLDER'], f"{pres_id}_export.pptx")
-        prs.save(output_file)
+        # Rendered files are keyed by content, so unchanged decks are served as-is
+        # and clients holding the current ETag get a 304.
+        digest = export_digest(pres)
+        if request.if_none_match.contains(digest):
+            return Response(status=304, headers={'ETag': f'"{digest}"'})
+        filename = cached_export(pres, digest)
         
         # Return file
-        return send_from_directory(
-            app.config['UPLOAD_FOLDER'],
-            os.path.basename(output_file),
+        resp = send_from_directory(
+            EXPORT_DIR,
+            filename,
             as_attachment=True,
-            download_name=f"{pres['title']}.pptx"
+            download_name=f"{pres['title']}.pptx",
+            etag=digest,
+            max_age=0
         )
+        resp.headers['Cache-Control'] = 'private, no-cache'
+        return resp
     except Exception as e:
         return jsonify({'message': 'Export failed', 'error': str(e)}), 500
-@app.route('/images/search', methods=['GET'])
+
+
+class ZipStreamSink:
+    """Write-only, unseekable target for zipfile; drain() hands back what was written so far."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def render_export_bytes(pres_id):
+    """PPTX bytes for one deck: read from the export cache if present, otherwise rendered in memory."""
+    pres = store.get_presentation(pres_id)
+    if not pres:
+        raise ValueError('Presentation not found')
+    path = os.path.join(EXPORT_DIR, f'{export_digest(pres)}.pptx')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return pres, f.read()
+    buf = BytesIO()
+    render_pptx(pres, buf)
+    return pres, buf.getvalue()
+
+
+def iter_bulk_export(pres_ids):
+    """Yield a ZIP archive of the given decks chunk by chunk.
+    At most BULK_EXPORT_WINDOW decks are rendered or held in memory at once,
+    and entries are written in request order."""
+    sink = ZipStreamSink()
+    used_names = set()
+    pending = deque()
+    ids = iter(pres_ids)
+    
+    def fill():
+        while len(pending) < BULK_EXPORT_WINDOW:
+            pres_id = next(ids, None)
+            if pres_id is None:
+                return
+            pending.append((pres_id, export_executor.submit(render_export_bytes, pres_id)))
+    
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as zf:
+        fill()
+        while pending:
+            pres_id, future = pending.popleft()
+            try:
+                pres, data = future.result()
+                base = secure_filename(pres['title']) or pres_id
+                name = f'{base}.pptx'
+                n = 1
+                while name in used_names:
+                    n += 1
+                    name = f'{base} ({n}).pptx'
+                used_names.add(name)
+                zf.writestr(name, data)
+            except Exception as e:
+                print(f'Bulk export of {pres_id} failed: {e}')
+                zf.writestr(f'{pres_id}.error.txt', f'Export failed: {e}\n')
+            fill()
+            yield sink.drain()
+    yield sink.drain()
+
+
+@api.route('/presentations/export', methods=['POST'])
 @token_required
-def images_search():
-    """Search images via Unsplash (if key provided) or return empty list."""
-    q = request.args.get('q', '').strip()
-    source = request.args.get('source', 'unsplash')
-    limit = int(request.args.get('limit', 12))
-
-    results = []
-    try:
-        if source == 'unsplash':
-            key = os.environ.get('UNSPLASH_ACCESS_KEY')
-            if not key:
-                return jsonify({'images': []}), 200
-            url = 'https://api.unsplash.com/search/photos'
-            resp = requests.get(
-                url,
-                params={'query': q or 'photo', 'per_page': limit},
-                headers={'Authorization': f'Client-ID {key}'},
-                timeout=10,
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            for hit in data.get('results', []):
-                results.append({
-                    'id': hit.get('id'),
-                    'thumb': hit.get('urls', {}).get('thumb'),
-                    'small': hit.get('urls', {}).get('small'),
-                    'full': hit.get('urls', {}).get('full'),
-                    'author': hit.get('user', {}).get('name')
-                })
+def bulk_export():
+    """Stream several decks back as one ZIP. Body: {"ids": [...]} or {"all": true}."""
+    try:
+        if not optional_import('pptx'):
+            return jsonify({'message': 'python-pptx not installed'}), 500
+        
+        payload = request.json or {}
+        if payload.get('all'):
+            summaries, _ = store.page_presentations(request.user, sort='created_at', descending=False)
+            pres_ids = [p['id'] for p in summaries]
         else:
-            # Google SERP requires API key or scraping; not implemented here.
-            results = []
+            pres_ids = list(dict.fromkeys(payload.get('ids') or []))
+            for pres_id in pres_ids:
+                pres = store.get_presentation(pres_id, with_slides=False)
+                if not pres:
+                    return jsonify({'message': 'Presentation not found', 'id': pres_id}), 404
+                if pres['owner'] != request.user:
+                    return jsonify({'message': 'Forbidden', 'id': pres_id}), 403
+        
+        if not pres_ids:
+            return jsonify({'message': 'No presentations to export'}), 400
+        if len(pres_ids) > BULK_EXPORT_MAX:
+            return jsonify({'message': f'At most {BULK_EXPORT_MAX} presentations per export'}), 400
+        
+        return Response(stream_with_context(iter_bulk_export(pres_ids)), mimetype='application/zip', headers={
+            'Content-Disposition': 'attachment; filename=presentations.zip',
+            'X-Accel-Buffering': 'no',
+        })
     except Exception as e:
-        print('Image search error:', e)
-        results = []
+        return jsonify({'message': 'Export failed', 'error': str(e)}), 500
+
+
+# Bump when render_pptx output changes so cached exports are not reused.
+EXPORT_RENDER_VERSION = 1
+image_digests = MemoryCache(max_items=2048)
+
+
+def resolve_image_path(url, variant=None):
+    """Local file for an image URL, preferring the named rendition when it has been built."""
+    if url.startswith('/uploads/'):
+        relpath = url[len('/uploads/'):]
+        if variant and BLOB_PATH_RE.match(relpath):
+            variant_path = safe_join(UPLOAD_DIR, variant_relpath(relpath, variant))
+            if variant_path and os.path.exists(variant_path):
+                return variant_path
+        return safe_join(UPLOAD_DIR, relpath) or ''
+    return url
+
+
+def file_digest(path):
+    """SHA-256 of a file, memoized on (path, size, mtime) so unchanged images aren't re-read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_size, st.st_mtime_ns)
+    digest = image_digests.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        image_digests.set(key, digest)
+    return digest
+
+
+def export_digest(pres):
+    """Hash of everything that affects the download: the title (it names the file), slides,
+    styles and image bytes."""
+    slides = []
+    for s in pres['slides']:
+        image = s.get('image')
+        slides.append([
+            s.get('title'), s.get('content'), s.get('style'), image,
+            file_digest(resolve_image_path(image, 'export')) if image else None,
+        ])
+    return make_key('pptx', EXPORT_RENDER_VERSION, pres.get('title'), slides)
+
+
+def cached_export(pres, digest=None):
+    """Return the EXPORT_DIR filename of the rendered deck, rendering only on a cache miss."""
+    digest = digest or export_digest(pres)
+    filename = f'{digest}.pptx'
+    path = os.path.join(EXPORT_DIR, filename)
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used for eviction
+        return filename
+    
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        render_pptx(pres, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict_exports(keep=filename)
+    return filename
+
+
+def evict_exports(keep=None):
+    """Delete least recently used exports until EXPORT_DIR fits in EXPORT_CACHE_MAX_BYTES."""
+    entries = []
+    for name in os.listdir(EXPORT_DIR):
+        if not name.endswith('.pptx'):
+            continue
+        try:
+            st = os.stat(os.path.join(EXPORT_DIR, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= EXPORT_CACHE_MAX_BYTES:
+            break
+        if name == keep:
+            continue
+        try:
+            os.remove(os.path.join(EXPORT_DIR, name))
+            total -= size
+        except OSError:
+            pass
+
+
+def render_pptx(pres, output):
+    """Render a presentation to PPTX. `output` is a path or a writable binary file."""
+    if not optional_import('pptx'):
+        raise RuntimeError('python-pptx not installed')
+    with export_render_seconds.time():
+        write_pptx(pres, output)
+
+
+def write_pptx(pres, output):
+    from pptx import Presentation as PPTXPresentation
+    from pptx.util import Inches, Pt
+    from pptx.enum.text import PP_ALIGN
+    from pptx.dml.color import RGBColor
+
+    # Create PPTX
+    prs = PPTXPresentation()
+    prs.slide_width = Inches(10)
+    prs.slide_height = Inches(7.5)
+    
+    for slide_data in pres['slides']:
+        # Use blank slide layout
+        blank_layout = prs.slide_layouts[6]
+        slide = prs.slides.add_slide(blank_layout)
+        
+        style = slide_data.get('style', {})
+        bg_color = style.get('backgroundColor', '#ffffff')
+        
+        # Set background color
+        background = slide.background
+        fill = background.fill
+        fill.solid()
+        
+        # Parse hex color
+        if bg_color.startswith('#'):
+            r = int(bg_color[1:3], 16)
+            g = int(bg_color[3:5], 16)
+            b = int(bg_color[5:7], 16)
+        else:
+            r, g, b = 255, 255, 255
+        
+        fill.fore_color.rgb = RGBColor(r, g, b)
+        
+        # Add title
+        title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1.5))
+        title_frame = title_box.text_frame
+        title_frame.word_wrap = True
+        p = title_frame.paragraphs[0]
+        p.text = slide_data.get('title', '')
+        p.font.size = Pt(style.get('titleFontSize', 32))
+        p.font.bold = True
+        
+        font_color = style.get('fontColor', '#000000')
+        if font_color.startswith('#'):
+            r = int(font_color[1:3], 16)
+            g = int(font_color[3:5], 16)
+            b = int(font_color[5:7], 16)
+        else:
+            r, g, b = 0, 0, 0
+        p.font.color.rgb = RGBColor(r, g, b)
+        
+        # Add content
+        content_box = slide.shapes.add_textbox(Inches(0.5), Inches(2.2), Inches(9), Inches(4))
+        content_frame = content_box.text_frame
+        content_frame.word_wrap = True
+        p = content_frame.paragraphs[0]
+        p.text = slide_data.get('content', '')
+        p.font.size = Pt(style.get('contentFontSize', 18))
+        p.font.color.rgb = RGBColor(r, g, b)
+        
+        # Add image if present
+        if slide_data.get('image'):
+            try:
+                img_path = resolve_image_path(slide_data['image'], 'export')
+                
+                if os.path.exists(img_path):
+                    slide.shapes.add_picture(img_path, Inches(5.5), Inches(2.2), width=Inches(4))
+            except Exception as e:
+                print(f"Could not add image: {e}")
+    
+    prs.save(output)
+
+
+# Search results are cached per (source, query, limit) for IMAGE_SEARCH_TTL
+# seconds, and concurrent identical misses share one upstream request.
+IMAGE_SEARCH_TTL = int(os.environ.get('IMAGE_SEARCH_TTL', 600))
+IMAGE_SEARCH_CACHE_ITEMS = int(os.environ.get('IMAGE_SEARCH_CACHE_ITEMS', 1000))
+IMAGE_SEARCH_LOCAL_DELAY = float(os.environ.get('IMAGE_SEARCH_LOCAL_DELAY', 0))
+image_search_cache = None  # set by create_app()
+image_search_flight = SingleFlight()
+local_image_search = None  # set by create_app()
+unsplash_search = None  # built on first use, rebuilt if the access key changes
+
+
+def get_image_search_provider(source):
+    """Provider for a search source, or None if it isn't available."""
+    if source == 'local':
+        return local_image_search
+    global unsplash_search
+    if source == 'unsplash':
+        key = os.environ.get('UNSPLASH_ACCESS_KEY')
+        if not key:
+            return None
+        if unsplash_search is None or unsplash_search.access_key != key:
+            unsplash_search = UnsplashSearch(key, url=os.environ.get('UNSPLASH_API_URL', UNSPLASH_URL))
+        return unsplash_search
+    # Google SERP requires API key or scraping; not implemented here.
+    return None
 
-    return jsonify({'images': results}), 200
 
+@api.route('/images/search', methods=['GET'])
+@token_required
+def images_search():
+    """Search images via Unsplash (if key provided), the offline 'local' source, or return empty list.
+    The X-Cache header says whether the answer was a cache HIT, a MISS or SHARED with a concurrent request."""
+    q = normalize_query(request.args.get('q', ''))
+    source = request.args.get('source', 'unsplash')
+    try:
+        limit = max(1, min(int(request.args.get('limit', 12)), IMAGE_SEARCH_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+
+    provider = get_image_search_provider(source)
+    if provider is None:
+        return jsonify({'images': []}), 200
+
+    key = make_key('images', source, q, limit)
+    results = image_search_cache.get(key)
+    status = 'HIT'
+    if results is None:
+        def fetch():
+            found = provider.search(q, limit)
+            image_search_cache.set(key, found)
+            return found
+        try:
+            results, shared = image_search_flight.do(key, fetch)
+            status = 'SHARED' if shared else 'MISS'
+        except Exception as e:
+            print('Image search error:', e)
+            results, status = [], 'ERROR'
+
+    resp = jsonify({'images': results})
+    resp.headers['X-Cache'] = status
+    return resp, 200
 
-@app.route('/presentations/<pres_id>/slides/<slide_id>/ai-generate', methods=['POST'])
+
+@api.route('/presentations/<pres_id>/slides/<slide_id>/ai-generate', methods=['POST'])
 @token_required
 def ai_generate_slide(pres_id, slide_id):
     """Generate slide content from a prompt with deep analysis using Anthropic/Gemini.
@@ -782,20 +2068,23 @@ def ai_generate_slide(pres_id, slide_id):
     payload = request.json or {}
     prompt = payload.get('prompt', '').strip()
 
-    data = read_data()
-    pres = data.get('presentations', {}).get(pres_id)
+    pres = store.get_presentation(pres_id, with_slides=False)
     if not pres:
         return jsonify({'message': 'Presentation not found'}), 404
     if pres['owner'] != request.user:
         return jsonify({'message': 'Forbidden'}), 403
+    # Fail a stale If-Match before paying for an LLM call; the store re-checks it on write
+    expected = if_match_version()
+    if expected is not None and expected != deck_version(pres):
+        return version_conflict(deck_version(pres))
 
-    slide = next((s for s in pres['slides'] if s['id'] == slide_id), None)
+    slide = store.get_slide(pres_id, slide_id)
     if not slide:
         return jsonify({'message': 'Slide not found'}), 404
 
     try:
         if prompt:
-            llm_result = call_llm_for_structured_content(prompt)
+            llm_result = call_llm_for_structured_content(prompt, fresh=bool(payload.get('fresh')))
             if llm_result:
                 slide['title'] = llm_result.get('title', slide.get('title', 'Generated Slide'))
                 bullets = llm_result.get('bullets', [])
@@ -803,16 +2092,74 @@ def ai_generate_slide(pres_id, slide_id):
             else:
                 slide['content'] = prompt
 
-        pres['updated_at'] = datetime.datetime.utcnow().isoformat()
-        write_data(data)
+        store.update_slide(pres_id, slide, now_iso(), expected_version=expected)
         return jsonify({'slide': slide}), 200
+    except VersionConflict as e:
+        return version_conflict(e.current)
     except Exception as e:
         return jsonify({'message': 'AI generation failed', 'error': str(e)}), 500
 
 
 # ============== CONTENT GENERATION ==============
 
-@app.route('/generate', methods=['POST'])
+def parse_generate_payload(payload):
+    """Normalize a /generate request body. Raises ValueError on invalid input."""
+    title = payload.get('title', 'Generated Presentation').strip()
+    if not title:
+        raise ValueError('Title is required')
+    details = payload.get('text', '').strip()
+    if payload.get('document_id'):
+        # Text of a document extracted earlier by /upload-document, optionally a page range
+        doc = document_cache.get(str(payload['document_id']))
+        if doc is None:
+            raise ValueError('Unknown document_id; upload the document again')
+        page_range = payload.get('document_pages') or [0, None]
+        try:
+            start, end = int(page_range[0]), (None if page_range[1] is None else int(page_range[1]))
+        except (TypeError, ValueError, IndexError):
+            raise ValueError('document_pages must be [start, end]')
+        details = '\n\n'.join(part for part in [details, '\n'.join(document_page_texts(doc, start, end)).strip()] if part)
+    return {
+        'mode': payload.get('mode', 'ai'),
+        'slide_count': max(1, min(int(payload.get('slide_count', 5)), 15)),  # limit to 15 for perf
+        'title': title,
+        'details': details,
+        'strategy': payload.get('strategy', GENERATION_STRATEGY),
+        'fresh': bool(payload.get('fresh')),  # regenerate instead of serving cached LLM output
+    }
+
+
+def new_presentation(owner, title, slides):
+    return {
+        'id': str(uuid.uuid4()),
+        'owner': owner,
+        'title': title,
+        'slides': slides,
+        'created_at': now_iso(),
+        'updated_at': now_iso(),
+        'version': 1
+    }
+
+
+def run_generation(owner, opts, check_cancelled=None):
+    """Build the slides for a parsed /generate request and save the presentation."""
+    title = opts['title']
+    
+    if opts['mode'] == 'ai' and opts['details']:
+        # Use LLM to deeply analyze the input and create structured slides
+        slides = generate_ai_slides(title, opts['details'], opts['slide_count'],
+                                    opts['strategy'], opts['fresh'], check_cancelled)
+    else:
+        # Fallback: simple slide creation without LLM
+        slides = build_text_slides(title, opts['details'], opts['slide_count'])
+    
+    # Save as presentation
+    pres = new_presentation(owner, title, slides)
+    store.create_presentation(pres)
+    return pres
+
+
+@api.route('/generate', methods=['POST'])
 @token_required
 def generate():
     """
@@ -821,97 +2168,363 @@ def generate():
     - 'ai': User provides details, LLM analyzes deeply and creates structured slides
     - 'user': User manually writes slide content (no LLM)
     - 'upload': User uploads document (uses document text)
+    Strategy (ai mode): 'per_slide' (one call per slide) or 'deck' (one call for the whole deck)
     """
     try:
-        payload = request.json or {}
-        mode = payload.get('mode', 'ai')
-        slide_count = max(1, min(int(payload.get('slide_count', 5)), 15))  # limit to 15 for perf
-        title = payload.get('title', 'Generated Presentation').strip()
-        details = payload.get('text', '').strip()
-        
-        if not title:
-            return jsonify({'message': 'Title is required'}), 400
-        
-        slides = []
-        
-        if mode == 'ai' and details:
-            # Use LLM to deeply analyze the input and create structured slides
-            for i in range(slide_count):
-                slide_prompt = f"""Presentation: "{title}"
-                Input content: {details}
+        try:
+            opts = parse_generate_payload(request.json or {})
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        pres = run_generation(request.user, opts)
+        return jsonify({'presentation': pres}), 201
+    except Exception as e:
+        return jsonify({'message': 'Generation failed', 'error': str(e)}), 500
 
-                Create slide {i+1} of {slide_count} that deeply analyzes and structures this information.
-                Provide actionable insights and reasoning for this section."""
-                                
-                llm_result = call_llm_for_structured_content(slide_prompt)
-                if llm_result:
-                    slide_title = llm_result.get('title', f'{title} - Slide {i+1}')
-                    bullets = llm_result.get('bullets', [])
-                    slide_content = '\n'.join([f"• {b}" for b in bullets]) if bullets else 'Generated content'
-                else:
-                    slide_title = f'{title} - Slide {i+1}'
-                    slide_content = 'Content to be filled'
-                
-                slides.append({
-                    'id': str(uuid.uuid4()),
-                    'title': slide_title,
-                    'content': slide_content,
-                    'image': None,
-                    'style': {
-                        'titleFontSize': 32,
-                        'contentFontSize': 18,
-                        'fontColor': '#000000',
-                        'backgroundColor': '#ffffff',
-                        'backgroundImage': None,
-                        'backgroundOpacity': 100,
-                        'backgroundBlur': 0
-                    }
-                })
-        else:
-            # Fallback: simple slide creation without LLM
-            sentences = [s.strip() for s in details.split('.') if s.strip()]
-            for i in range(slide_count):
-                s_idx = min(i, len(sentences) - 1) if sentences else 0
-                content = sentences[s_idx] if sentences else f'Slide {i+1} content'
-                
-                slides.append({
-                    'id': str(uuid.uuid4()),
-                    'title': f'{title} - Slide {i+1}',
-                    'content': content,
-                    'image': None,
-                    'style': {
-                        'titleFontSize': 32,
-                        'contentFontSize': 18,
-                        'fontColor': '#000000',
-                        'backgroundColor': '#ffffff',
-                        'backgroundImage': None,
-                        'backgroundOpacity': 100,
-                        'backgroundBlur': 0
-                    }
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+@api.route('/generate/stream', methods=['POST'])
+@token_required
+def generate_stream():
+    """
+    Same request body as /generate, answered as Server-Sent Events.
+    The presentation is saved up front with placeholder slides, then each slide is
+    persisted and emitted as it finishes:
+    - 'presentation': {id, title, slide_count}
+    - 'slide': {id, position, title, content}  (completion order; use position)
+    - 'done': {presentation: summary, generated, failed, elapsed}
+    - 'error': {message}
+    """
+    try:
+        opts = parse_generate_payload(request.json or {})
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': 'Generation failed', 'error': str(e)}), 500
+
+    title, slide_count = opts['title'], opts['slide_count']
+    use_llm = opts['mode'] == 'ai' and opts['details']
+    if use_llm:
+        slides = [build_generated_slide(title, i, None) for i in range(slide_count)]
+    else:
+        slides = build_text_slides(title, opts['details'], slide_count)
+    pres = new_presentation(request.user, title, slides)
+
+    def events():
+        started = time.monotonic()
+        generated = 0
+        try:
+            store.create_presentation(pres)
+            yield sse_event('presentation', {'id': pres['id'], 'title': title, 'slide_count': slide_count})
+            if use_llm:
+                results = iter_ai_results(title, opts['details'], slide_count, opts['strategy'], opts['fresh'])
+            else:
+                results = ((i, None) for i in range(slide_count))
+            for i, result in results:
+                slide = slides[i]
+                if result:
+                    filled = build_generated_slide(title, i, result)
+                    slide['title'], slide['content'] = filled['title'], filled['content']
+                    store.update_slide(pres['id'], slide, now_iso())
+                    generated += 1
+                yield sse_event('slide', {
+                    'id': slide['id'],
+                    'position': i,
+                    'title': slide['title'],
+                    'content': slide['content'],
                 })
+            pres['updated_at'] = now_iso()
+            yield sse_event('done', {
+                'presentation': presentation_summary(pres),
+                'generated': generated,
+                'failed': slide_count - generated if use_llm else 0,
+                'elapsed': round(time.monotonic() - started, 3),
+            })
+        except Exception as e:
+            yield sse_event('error', {'message': 'Generation failed', 'error': str(e)})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+# ============== BACKGROUND JOBS ==============
+
+def run_generate_job(ctx, params):
+    pres = run_generation(params['owner'], params['options'], ctx.check_cancelled)
+    return {'presentation_id': pres['id'], 'presentation': presentation_summary(pres)}
+
+
+def run_export_job(ctx, params):
+    pres = store.get_presentation(params['pres_id'])
+    if not pres:
+        raise ValueError('Presentation not found')
+    ctx.check_cancelled()
+    filename = cached_export(pres)
+    return {'presentation_id': pres['id'], 'file': filename, 'download_name': f"{pres['title']}.pptx"}
+
+
+JOB_HANDLERS = {'generate': run_generate_job, 'export': run_export_job}
+
+
+def owned_job(job_id):
+    """Look up a job for the current user; returns (job, error_response)."""
+    job = job_queue.get(job_id)
+    if not job:
+        return None, (jsonify({'message': 'Job not found'}), 404)
+    if job['owner'] != request.user:
+        return None, (jsonify({'message': 'Forbidden'}), 403)
+    return job, None
+
+
+@api.route('/generate/jobs', methods=['POST'])
+@token_required
+def submit_generate_job():
+    """Queue a /generate request (same body) and return its job immediately."""
+    try:
+        opts = parse_generate_payload(request.json or {})
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    try:
+        job = job_queue.submit(request.user, 'generate', {'owner': request.user, 'options': opts})
+        return jsonify({'job': public_job(job)}), 202
+    except Exception as e:
+        return jsonify({'message': 'Failed to queue generation', 'error': str(e)}), 500
+
+
+@api.route('/presentations/<pres_id>/export/jobs', methods=['POST'])
+@token_required
+def submit_export_job(pres_id):
+    try:
+        if not optional_import('pptx'):
+            return jsonify({'message': 'python-pptx not installed'}), 500
         
-        # Save as presentation
-        pres_id = str(uuid.uuid4())
-        data = read_data()
-        data['presentations'][pres_id] = {
-            'id': pres_id,
-            'owner': request.user,
-            'title': title,
-            'slides': slides,
-            'created_at': datetime.datetime.utcnow().isoformat(),
-            'updated_at': datetime.datetime.utcnow().isoformat()
-        }
-        write_data(data)
+        pres = store.get_presentation(pres_id, with_slides=False)
+        if not pres:
+            return jsonify({'message': 'Presentation not found'}), 404
+        if pres['owner'] != request.user:
+            return jsonify({'message': 'Forbidden'}), 403
         
-        return jsonify({'presentation': data['presentations'][pres_id]}), 201
+        job = job_queue.submit(request.user, 'export', {'pres_id': pres_id})
+        return jsonify({'job': public_job(job)}), 202
     except Exception as e:
-        return jsonify({'message': 'Generation failed', 'error': str(e)}), 500
+        return jsonify({'message': 'Failed to queue export', 'error': str(e)}), 500
+
+
+@api.route('/jobs', methods=['GET'])
+@token_required
+def list_jobs():
+    jobs = store.list_jobs(owner=request.user, limit=50)
+    return jsonify({'jobs': [public_job(j) for j in jobs]}), 200
 
 
-@app.route('/health', methods=['GET'])
+@api.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """Job status. ?wait=N blocks up to N seconds (max 30) for the job to finish."""
+    job, error = owned_job(job_id)
+    if error:
+        return error
+    try:
+        wait = float(request.args.get('wait', 0) or 0)
+    except ValueError:
+        wait = None
+    if wait is None or not wait >= 0:  # also rejects nan
+        return jsonify({'message': 'wait must be a non-negative number of seconds'}), 400
+    wait = min(wait, MAX_JOB_WAIT)
+    if wait > 0 and job['status'] not in FINISHED:
+        job = job_queue.wait(job_id, wait)
+    return jsonify({'job': public_job(job)}), 200
+
+
+@api.route('/jobs/<job_id>', methods=['DELETE'])
+@token_required
+def cancel_job(job_id):
+    job, error = owned_job(job_id)
+    if error:
+        return error
+    job = job_queue.cancel(job_id)
+    return jsonify({'job': public_job(job)}), 200
+
+
+@api.route('/jobs/<job_id>/result', methods=['GET'])
+@token_required
+def get_job_result(job_id):
+    """The finished job's output: the generated presentation, or the PPTX download."""
+    job, error = owned_job(job_id)
+    if error:
+        return error
+    if job['status'] != SUCCEEDED:
+        return jsonify({'message': f"Job is {job['status']}", 'job': public_job(job)}), 409
+    
+    result = job['result']
+    if job['kind'] == 'export':
+        if not os.path.exists(os.path.join(EXPORT_DIR, result['file'])):
+            return jsonify({'message': 'Export file no longer available'}), 410
+        return send_from_directory(EXPORT_DIR, result['file'], as_attachment=True,
+                                   download_name=result['download_name'])
+    
+    pres = store.get_presentation(result['presentation_id'])
+    if not pres:
+        return jsonify({'message': 'Presentation not found'}), 404
+    return jsonify({'presentation': pres}), 200
+
+
+@api.route('/cache/stats', methods=['GET'])
+@token_required
+def cache_stats():
+    return jsonify({'llm': llm_cache.stats(), 'documents': document_cache.stats(),
+                    'image_search': dict(image_search_cache.stats(), coalesced=image_search_flight.shared),
+                    'uploads': blob_store.stats()}), 200
+
+
+@api.route('/providers/status', methods=['GET'])
+@token_required
+def providers_status():
+    """Circuit breaker state and request/retry/failure counts per LLM provider."""
+    return jsonify({'providers': {name: c.status() for name, c in llm_providers.items()}}), 200
+
+
+@api.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'ok'}), 200
 
 
+# ============== APP FACTORY ==============
+
+# Settings create_app(config) may override by name. Anything built from them
+# (datastore, pools, caches, provider clients) is built by create_app itself.
+SETTINGS = frozenset({
+    'SECRET_KEY', 'MAX_CONTENT_LENGTH',
+    'DATA_FILE', 'DATABASE_FILE', 'DATA_BACKEND',
+    'JOURNAL_DIR', 'JOURNAL_COMPACT_OPS', 'JOURNAL_COMPACT_SECONDS', 'JOURNAL_FSYNC',
+    'UPLOAD_DIR', 'CACHE_DIR', 'EXPORT_DIR', 'EXPORT_CACHE_MAX_BYTES',
+    'JOB_WORKERS', 'JOB_LEASE_SECONDS', 'EXPORT_WORKERS', 'BULK_EXPORT_MAX',
+    'BLOB_INDEX_FILE', 'BLOB_GC_GRACE_SECONDS', 'BLOB_GC_INTERVAL',
+    'IMAGE_WORKERS', 'COMPRESS_MIN_BYTES', 'EXPORT_IMAGE_DPI',
+    'DOC_EXTRACT_WORKERS', 'DOC_PAGES_PER_TASK', 'DOC_MAX_PAGES', 'DOC_MAX_CHARS', 'DOC_CACHE_MAX_BYTES',
+    'METRICS_TOKEN', 'ADMIN_USERS',
+    'PROFILE_REQUESTS', 'PROFILE_PATHS', 'PROFILE_DIR', 'PROFILE_MAX_FILES', 'PROFILE_MAX_BYTES',
+    'PROFILE_SAMPLE_INTERVAL',
+    'LLM_MAX_WORKERS', 'PROVIDER_CONCURRENCY', 'LLM_RETRIES', 'LLM_BACKOFF_BASE', 'LLM_BACKOFF_MAX',
+    'LLM_TIMEOUT', 'BREAKER_FAILURES', 'BREAKER_RESET_SECONDS', 'ANTHROPIC_API_URL', 'GOOGLE_API_BASE',
+    'GENERATION_STRATEGY', 'DECK_MAX_TOKENS',
+    'CONDENSE_CHUNK_TOKENS', 'SLIDE_INPUT_TOKENS',
+    'LLM_CACHE_ENABLED', 'LLM_CACHE_TTL',
+    'IMAGE_SEARCH_TTL', 'IMAGE_SEARCH_CACHE_ITEMS', 'IMAGE_SEARCH_LOCAL_DELAY',
+})
+
+# Values from the environment at import; every create_app() call starts from these.
+DEFAULT_SETTINGS = {name: copy.deepcopy(globals()[name]) for name in SETTINGS}
+
+
+def shutdown_services():
+    """Stop the pools and threads started by the last create_app() call, if any."""
+    global pdf_executor
+    if job_queue is not None:
+        job_queue.stop()
+    for executor in (llm_executor, export_executor, image_executor, pdf_executor):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    pdf_executor = None
+    if blob_gc_stop is not None:
+        blob_gc_stop.set()
+    if blob_store is not None:
+        blob_store.close()  # lets the next app's GC thread take the GC lock
+    if store is not None and hasattr(store, 'close'):
+        store.close()  # journal store: final compaction, releases the directory lock
+
+
+def create_app(config=None):
+    """
+    Build the Flask app and the services behind the routes. `config` overrides
+    settings listed in SETTINGS by name (e.g. {'DATA_BACKEND': 'json',
+    'UPLOAD_DIR': ...}); other keys go to app.config. Naming any other module
+    constant raises ValueError. Settings not named fall back to their defaults
+    from the environment. The routes use module globals, so each call shuts down
+    the services of the previous app before building its own; they are also
+    listed in app.extensions['slideforge'].
+    """
+    global store, blob_store, blob_gc_stop, job_queue, llm_cache, document_cache, profile_artifacts
+    global export_executor, image_executor, BULK_EXPORT_WINDOW, IMAGE_VARIANT_WIDTHS
+    global llm_providers, llm_executor, image_search_cache, local_image_search, unsplash_search
+    started = time.perf_counter()
+    config = dict(config or {})
+    fixed = sorted(k for k in config if k not in SETTINGS and k.isupper() and k in globals())
+    if fixed:
+        raise ValueError(f'Not overridable through create_app(): {", ".join(fixed)}')
+    shutdown_services()
+    settings = globals()
+    for key in SETTINGS:
+        settings[key] = config.pop(key) if key in config else copy.deepcopy(DEFAULT_SETTINGS[key])
+
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    app = Flask(__name__)
+    CORS(app)
+    app.config['SECRET_KEY'] = SECRET_KEY
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    app.config.update(config)
+
+    if DATA_BACKEND == 'journal' and int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+        raise ValueError('DATA_BACKEND=journal needs a single worker process; set WEB_CONCURRENCY=1')
+    # Datastore: SQLite by default (data.json is migrated into it on first run),
+    # an append-only journal with snapshots (DATA_BACKEND=journal), or the
+    # original whole-file JSON backend with DATA_BACKEND=json.
+    store = TimedProxy(create_store(
+        DATA_BACKEND, DATA_FILE, DATABASE_FILE,
+        journal_dir=JOURNAL_DIR,
+        compact_ops=JOURNAL_COMPACT_OPS,
+        compact_seconds=JOURNAL_COMPACT_SECONDS,
+        fsync=JOURNAL_FSYNC,
+    ), datastore_seconds, backend=DATA_BACKEND)
+    # Uploaded images are stored once per unique content and reference counted
+    blob_store = BlobStore(UPLOAD_DIR, BLOB_INDEX_FILE, gc_grace_seconds=BLOB_GC_GRACE_SECONDS)
+    blob_gc_stop = threading.Event()
+    threading.Thread(target=run_blob_gc, args=(blob_gc_stop,), name='blob-gc', daemon=True).start()
+    llm_cache = make_llm_cache()
+    document_cache = make_document_cache()
+    image_search_cache = TieredCache(MemoryCache(max_items=IMAGE_SEARCH_CACHE_ITEMS, ttl=IMAGE_SEARCH_TTL))
+    local_image_search = LocalSearch(delay=IMAGE_SEARCH_LOCAL_DELAY)
+    unsplash_search = None
+    IMAGE_VARIANT_WIDTHS = variant_widths(export_dpi=EXPORT_IMAGE_DPI)
+    llm_providers = make_llm_providers()
+    llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix='llm')
+    export_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='export')
+    image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image')
+    BULK_EXPORT_WINDOW = EXPORT_WORKERS * 2
+    # Generation and export can also run here instead of on the request thread
+    job_queue = JobQueue(store, max_workers=JOB_WORKERS, lease_seconds=JOB_LEASE_SECONDS)
+    for kind, handler in JOB_HANDLERS.items():
+        job_queue.register(kind, handler)
+    job_queue.start()
+
+    app.extensions['slideforge'] = {
+        'store': store, 'blob_store': blob_store, 'job_queue': job_queue,
+        'llm_executor': llm_executor, 'export_executor': export_executor, 'image_executor': image_executor,
+        'llm_providers': llm_providers, 'llm_cache': llm_cache, 'document_cache': document_cache,
+        'image_search_cache': image_search_cache,
+    }
+
+    # Hooks are only installed when profiling can happen, so it costs nothing otherwise.
+    # Registered before the blueprint, so the profile also covers compression and metrics.
+    profile_artifacts = None
+    if PROFILE_REQUESTS or ADMIN_USERS:
+        profile_artifacts = ProfileArtifacts(PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_MAX_BYTES)
+        # Streamed responses are profiled up to the point the view returns its generator
+        app.before_request(start_request_profile)
+        app.after_request(finish_request_profile)
+        app.teardown_request(abandon_request_profile)
+    app.register_blueprint(api)
+
+    elapsed = time.perf_counter() - started
+    startup_seconds.set(elapsed)
+    print(f'App created in {elapsed * 1000:.0f} ms ({DATA_BACKEND} datastore)')
+    return app
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host='0.0.0.0', port=5000, debug=True)
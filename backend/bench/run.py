@@ -0,0 +1,300 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import datetime
+import platform
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+# Benchmark and load-test driver for the backend.
+#
+# Seeds a throwaway datastore (users x decks x slides), starts a local stub for
+# the LLM and image APIs, serves app.py on a threaded local server and drives
+# every scenario in bench/scenarios.py with --concurrency client threads. Each
+# scenario reports throughput and p50/p95/p99 latency; the run is saved as JSON
+# under bench/results so runs can be compared across commits:
+#
+#     cd backend
+#     python -m bench.run --users 5 --decks 20 --slides 10 --concurrency 8
+#     python -m bench.run --compare bench/results/a.json bench/results/b.json
+#
+# Startup (importing app.py plus create_app()) is timed in fresh interpreters
+# and checked against --startup-budget-ms; the exit status is 1 when it is over
+# budget, and --startup-only runs just that check.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'bench', 'results')
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 500))
+# Imported on first use by the routes that need them; none should be loaded by startup alone
+LAZY_MODULES = ('pptx', 'PyPDF2', 'requests', 'bcrypt', 'PIL')
+STARTUP_PROBE = f"""
+import sys, json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'eager_imports': [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, statuses, errors, wall):
+    ordered = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'mean_ms': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50_ms': ms(percentile(ordered, 50)),
+        'p95_ms': ms(percentile(ordered, 95)),
+        'p99_ms': ms(percentile(ordered, 99)),
+        'max_ms': ms(ordered[-1]) if ordered else None,
+    }
+
+
+def run_scenario(scenario, ctx, count, concurrency):
+    local = threading.local()
+
+    def session():
+        http = getattr(local, 'http', None)
+        if http is None:
+            http = local.http = requests.Session()
+        return http
+
+    items = scenario.setup(requests.Session(), ctx, count) if scenario.setup else [None] * count
+    latencies = []
+    statuses = {}
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(item):
+        started = time.perf_counter()
+        try:
+            resp = scenario.fn(session(), ctx, item)
+            status = resp.status_code
+        except Exception as e:
+            print(f'  {scenario.name}: {e}')
+            status = 'exception'
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 'exception' or status >= 400:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, items))
+    return summarize(latencies, statuses, errors[0], time.perf_counter() - started)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def prepare_environment(workdir, args, stub_url):
+    """Point app.py's files at workdir and its providers at the stub. Must run before importing app."""
+    from bench.stub_server import stub_env
+    os.environ.update({
+        'DATA_BACKEND': args.backend,
+        'DATA_FILE': os.path.join(workdir, 'data.json'),
+        'DATABASE_FILE': os.path.join(workdir, 'data.db'),
+        'JOURNAL_DIR': os.path.join(workdir, 'journal'),
+        'CACHE_DIR': os.path.join(workdir, 'cache'),
+        'EXPORT_DIR': os.path.join(workdir, 'exports'),
+        'UPLOAD_DIR': os.path.join(workdir, 'uploads'),
+        'BLOB_INDEX_FILE': os.path.join(workdir, 'blobs.db'),
+        'LLM_CACHE_ENABLED': '1' if args.llm_cache else '0',
+        'LLM_BACKOFF_BASE': '0.05',
+        'LLM_BACKOFF_MAX': '0.5',
+    })
+    os.environ.update(stub_env(stub_url))
+    os.environ.pop('PROFILE_REQUESTS', None)
+    os.environ.pop('ADMIN_USERS', None)
+
+
+def measure_startup(runs, budget_ms):
+    """Median import and create_app() time over `runs` fresh interpreters, in the current environment."""
+    samples = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', STARTUP_PROBE], cwd=BACKEND_DIR, text=True)
+        samples.append(json.loads(out.strip().splitlines()[-1]))
+    median = lambda key: sorted(s[key] for s in samples)[len(samples) // 2]
+    import_ms, create_ms = median('import_ms'), median('create_ms')
+    total = import_ms + create_ms
+    startup = {
+        'import_ms': round(import_ms, 1),
+        'create_app_ms': round(create_ms, 1),
+        'total_ms': round(total, 1),
+        'budget_ms': budget_ms,
+        'within_budget': total <= budget_ms,
+        'eager_imports': sorted({m for s in samples for m in s['eager_imports']}),
+        'runs': runs,
+    }
+    print(f'startup: import {import_ms:.0f} ms + create_app {create_ms:.0f} ms = {total:.0f} ms '
+          f'(budget {budget_ms:.0f} ms) {"ok" if startup["within_budget"] else "OVER BUDGET"}')
+    if startup['eager_imports']:
+        print(f'  loaded at startup: {", ".join(startup["eager_imports"])}')
+    return startup
+
+
+def serve(flask_app):
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run(args):
+    from bench.stub_server import StubConfig, start_stub_server
+    from bench.scenarios import SCENARIOS, BenchContext
+    from bench.seed import seed_store, PASSWORD
+
+    workdir = tempfile.mkdtemp(prefix='slideforge-bench-')
+    stub_config = StubConfig(args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, seed=args.seed)
+    stub, stub_url = start_stub_server(stub_config)
+    prepare_environment(workdir, args, stub_url)
+    try:
+        # Measured first, against the still-empty datastore, before this process opens it
+        startup = measure_startup(args.startup_runs, args.startup_budget_ms)
+        if args.startup_only:
+            return {'meta': {'startup': startup}}
+        sys.path.insert(0, BACKEND_DIR)
+        import app as backend
+        flask_app = backend.create_app()
+
+        started = time.perf_counter()
+        accounts = seed_store(backend.store, backend.hash_password, args.users, args.decks, args.slides, args.seed)
+        seed_seconds = time.perf_counter() - started
+        print(f'seeded {args.users} users x {args.decks} decks x {args.slides} slides in {seed_seconds:.1f}s')
+
+        server, base_url = serve(flask_app)
+        http = requests.Session()
+        for account in accounts:
+            account['token'] = http.post(f'{base_url}/login', json={
+                'username': account['username'], 'password': PASSWORD}).json()['token']
+        ctx = BenchContext(base_url, accounts, args.seed)
+
+        selected = [s for s in SCENARIOS if not args.only or s.name in args.only]
+        endpoints = {}
+        for scenario in selected:
+            count = max(1, int(args.requests * scenario.scale))
+            stats = run_scenario(scenario, ctx, count, args.concurrency)
+            endpoints[scenario.name] = stats
+            print(f'{scenario.name:32} {stats["requests"]:5d} req {stats["errors"]:4d} err '
+                  f'{stats["throughput_rps"] or 0:8.1f} rps  p50 {stats["p50_ms"] or 0:8.1f}  '
+                  f'p95 {stats["p95_ms"] or 0:8.1f}  p99 {stats["p99_ms"] or 0:8.1f} ms')
+        server.shutdown()
+    finally:
+        stub.shutdown()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('compare', 'out')},
+            'startup': startup,
+            'seed_seconds': round(seed_seconds, 3),
+            'stub_calls': dict(stub_config.calls),
+        },
+        'endpoints': endpoints,
+    }
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f'{datetime.datetime.utcnow():%Y%m%dT%H%M%S}-{result["meta"]["commit"] or "nogit"}.json')
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
+    print(f'results: {path}')
+    return result
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f'{old["meta"].get("commit")} -> {new["meta"].get("commit")}')
+
+    def change(a, b):
+        if not a or b is None:
+            return '     n/a'
+        return f'{(b - a) / a * 100:+7.1f}%'
+
+    a, b = old['meta'].get('startup'), new['meta'].get('startup')
+    if a and b:
+        print(f'{"startup":32} {a["total_ms"]:8.1f} -> {b["total_ms"]:8.1f} ms {change(a["total_ms"], b["total_ms"])}')
+
+    for name in sorted(set(old['endpoints']) | set(new['endpoints'])):
+        a, b = old['endpoints'].get(name), new['endpoints'].get(name)
+        if not a or not b:
+            print(f'{name:32} only in {"new" if b else "old"} run')
+            continue
+        print(f'{name:32} p50 {a["p50_ms"]:8.1f} -> {b["p50_ms"]:8.1f} {change(a["p50_ms"], b["p50_ms"])}  '
+              f'p95 {a["p95_ms"]:8.1f} -> {b["p95_ms"]:8.1f} {change(a["p95_ms"], b["p95_ms"])}  '
+              f'rps {change(a["throughput_rps"], b["throughput_rps"])}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the backend against a local LLM/image stub')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--decks', type=int, default=20, help='decks per user')
+    parser.add_argument('--slides', type=int, default=10, help='slides per deck')
+    parser.add_argument('--requests', type=int, default=100, help='requests per scenario (scaled down for slow routes)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--backend', default='sqlite', choices=['sqlite', 'journal', 'json'])
+    parser.add_argument('--latency-ms', type=float, default=50, help='stub provider latency')
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of stub calls that fail')
+    parser.add_argument('--llm-cache', action='store_true', help='leave the LLM result cache on')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--only', nargs='*', help='scenario names to run')
+    parser.add_argument('--out', default=RESULTS_DIR)
+    parser.add_argument('--keep', action='store_true', help='keep the temporary datastore directory')
+    parser.add_argument('--startup-budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help='import + create_app() budget; exit status 1 when over it')
+    parser.add_argument('--startup-runs', type=int, default=5, help='fresh interpreters to time startup in')
+    parser.add_argument('--startup-only', action='store_true', help='only check the startup budget')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files and exit')
+    args = parser.parse_args(argv)
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    result = run(args)
+    return 0 if result['meta']['startup']['within_budget'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,413 @@
+import io
+import random
+import threading
+
+from bench.seed import WORDS, sentence
+
+
+# One scenario per route (or per interesting variant of a route).
+#
+# A scenario is fn(http, ctx, item) -> requests.Response; only that call is
+# timed. `setup(http, ctx, n)` runs first, untimed, and returns the n items
+# (one per timed request) for scenarios that need something to exist first:
+# a job to wait on, a slide to delete. `scale` shrinks the request count for
+# the expensive routes.
+
+
+class Scenario:
+    def __init__(self, name, fn, setup=None, scale=1.0):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+        self.scale = scale
+
+
+SCENARIOS = []
+
+
+def scenario(name, setup=None, scale=1.0):
+    def register(fn):
+        SCENARIOS.append(Scenario(name, fn, setup, scale))
+        return fn
+    return register
+
+
+class BenchContext:
+    def __init__(self, base_url, accounts, seed=1):
+        self.base_url = base_url
+        self.accounts = accounts
+        self.seed = seed
+        self._local = threading.local()
+        self._counter = 0
+        self._threads = 0
+        self._lock = threading.Lock()
+
+    @property
+    def rng(self):
+        rng = getattr(self._local, 'rng', None)
+        if rng is None:
+            with self._lock:
+                self._threads += 1
+                rng = self._local.rng = random.Random(self.seed * 1000 + self._threads)
+        return rng
+
+    def url(self, path):
+        return self.base_url + path
+
+    def unique(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def pick(self):
+        """(auth headers, account, deck) for a random seeded account and one of its decks."""
+        account = self.rng.choice(self.accounts)
+        return self.auth(account), account, self.rng.choice(account['decks'])
+
+    @staticmethod
+    def auth(account):
+        return {'Authorization': f'Bearer {account["token"]}'}
+
+
+def make_pdf(pages, words=200, tag=''):
+    """Minimal uncompressed PDF with one line of text per page."""
+    objs = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for i in range(pages):
+        text = f'Page {i} {tag} ' + ' '.join(WORDS[j % len(WORDS)] for j in range(words))
+        stream = f'BT /F1 8 Tf 20 700 Td ({text}) Tj ET'
+        objs.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objs.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                    f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>')
+        kids.append(f'{len(objs)} 0 R')
+    objs[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {pages} >>'
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f'{i} 0 obj\n{obj}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objs) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    out += b''.join(f'{o:010d} 00000 n \n'.encode('latin-1') for o in offsets)
+    out += f'trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF'.encode('latin-1')
+    return out
+
+
+def make_png(n, size=(1600, 1000)):
+    from PIL import Image
+    color = ((n * 37) % 256, (n * 91) % 256, (n * 13) % 256)
+    buf = io.BytesIO()
+    Image.new('RGB', size, color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def generate_body(ctx, mode='ai', **extra):
+    n = ctx.unique()
+    return dict({
+        'mode': mode,
+        'title': f'Bench deck {n}',
+        'text': ' '.join(sentence(ctx.rng, 12) for _ in range(20)) + f' (run {n})',
+        'slide_count': 5,
+    }, **extra)
+
+
+def submit_jobs(http, ctx, n, wait=False):
+    items = []
+    for _ in range(n):
+        headers, _, _ = ctx.pick()
+        job = http.post(ctx.url('/generate/jobs'), json=generate_body(ctx, 'user'), headers=headers).json()['job']
+        if wait:
+            http.get(ctx.url(f'/jobs/{job["id"]}?wait=30'), headers=headers)
+        items.append((headers, job['id']))
+    return items
+
+
+def consume(resp):
+    for _ in resp.iter_content(chunk_size=65536):
+        pass
+    return resp
+
+
+# ---- service ----
+
+@scenario('health')
+def health(http, ctx, item):
+    return http.get(ctx.url('/health'))
+
+
+@scenario('metrics')
+def metrics(http, ctx, item):
+    return http.get(ctx.url('/metrics'))
+
+
+@scenario('cache_stats')
+def cache_stats(http, ctx, item):
+    return http.get(ctx.url('/cache/stats'), headers=ctx.pick()[0])
+
+
+@scenario('providers_status')
+def providers_status(http, ctx, item):
+    return http.get(ctx.url('/providers/status'), headers=ctx.pick()[0])
+
+
+# ---- auth ----
+
+@scenario('signup', scale=0.2)
+def signup(http, ctx, item):
+    return http.post(ctx.url('/signup'), json={'username': f'new{ctx.unique():06d}', 'password': 'bench-password'})
+
+
+@scenario('login', scale=0.2)
+def login(http, ctx, item):
+    account = ctx.rng.choice(ctx.accounts)
+    return http.post(ctx.url('/login'), json={'username': account['username'], 'password': 'bench-password'})
+
+
+# ---- presentations ----
+
+@scenario('list_presentations')
+def list_presentations(http, ctx, item):
+    return http.get(ctx.url('/presentations?limit=20'), headers=ctx.pick()[0])
+
+
+@scenario('list_presentations_full')
+def list_presentations_full(http, ctx, item):
+    return http.get(ctx.url('/presentations?limit=20&full=1'), headers=ctx.pick()[0])
+
+
+@scenario('get_presentation')
+def get_presentation(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    return http.get(ctx.url(f'/presentations/{deck["id"]}'), headers=headers)
+
+
+def fetch_etags(http, ctx, n):
+    items = []
+    for _ in range(n):
+        headers, _, deck = ctx.pick()
+        etag = http.get(ctx.url(f'/presentations/{deck["id"]}'), headers=headers).headers.get('ETag')
+        items.append((dict(headers, **{'If-None-Match': etag or ''}), deck['id']))
+    return items
+
+
+@scenario('get_presentation_not_modified', setup=fetch_etags)
+def get_presentation_not_modified(http, ctx, item):
+    headers, pres_id = item
+    return http.get(ctx.url(f'/presentations/{pres_id}'), headers=headers)
+
+
+@scenario('create_presentation')
+def create_presentation(http, ctx, item):
+    return http.post(ctx.url('/presentations'), json={'title': sentence(ctx.rng, 3), 'slide_count': 5},
+                     headers=ctx.pick()[0])
+
+
+@scenario('update_presentation')
+def update_presentation(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    return http.put(ctx.url(f'/presentations/{deck["id"]}'), json={'title': sentence(ctx.rng, 3)}, headers=headers)
+
+
+def create_decks(http, ctx, n):
+    items = []
+    for _ in range(n):
+        headers = ctx.pick()[0]
+        pres = http.post(ctx.url('/presentations'), json={'title': 'To delete', 'slide_count': 3},
+                         headers=headers).json()['presentation']
+        items.append((headers, pres['id']))
+    return items
+
+
+@scenario('delete_presentation', setup=create_decks)
+def delete_presentation(http, ctx, item):
+    headers, pres_id = item
+    return http.delete(ctx.url(f'/presentations/{pres_id}'), headers=headers)
+
+
+# ---- slides ----
+
+@scenario('create_slide')
+def create_slide(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    return http.post(ctx.url(f'/presentations/{deck["id"]}/slides'),
+                     json={'title': sentence(ctx.rng, 4), 'content': sentence(ctx.rng)}, headers=headers)
+
+
+@scenario('update_slide')
+def update_slide(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    slide_id = ctx.rng.choice(deck['slide_ids'])
+    return http.put(ctx.url(f'/presentations/{deck["id"]}/slides/{slide_id}'),
+                    json={'title': sentence(ctx.rng, 4), 'content': sentence(ctx.rng)}, headers=headers)
+
+
+def create_slides(http, ctx, n):
+    items = []
+    for _ in range(n):
+        headers, _, deck = ctx.pick()
+        slide = http.post(ctx.url(f'/presentations/{deck["id"]}/slides'), json={'title': 'To delete'},
+                          headers=headers).json()['slide']
+        items.append((headers, deck['id'], slide['id']))
+    return items
+
+
+@scenario('delete_slide', setup=create_slides)
+def delete_slide(http, ctx, item):
+    headers, pres_id, slide_id = item
+    return http.delete(ctx.url(f'/presentations/{pres_id}/slides/{slide_id}'), headers=headers)
+
+
+@scenario('reorder_slides')
+def reorder_slides(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    order = list(deck['slide_ids'])
+    ctx.rng.shuffle(order)
+    return http.post(ctx.url(f'/presentations/{deck["id"]}/slides/reorder'), json={'slide_ids': order},
+                     headers=headers)
+
+
+@scenario('move_slide')
+def move_slide(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    slide_id, after = ctx.rng.sample(deck['slide_ids'], 2)
+    return http.post(ctx.url(f'/presentations/{deck["id"]}/slides/{slide_id}/move'), json={'after': after},
+                     headers=headers)
+
+
+@scenario('batch')
+def batch(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    ops = [{'op': 'update_slide', 'slide_id': ctx.rng.choice(deck['slide_ids']), 'content': sentence(ctx.rng)}
+           for _ in range(4)]
+    slide_id, after = ctx.rng.sample(deck['slide_ids'], 2)
+    ops.append({'op': 'move_slide', 'slide_id': slide_id, 'after': after})
+    return http.post(ctx.url(f'/presentations/{deck["id"]}/batch'), json={'ops': ops}, headers=headers)
+
+
+@scenario('ai_generate_slide', scale=0.5)
+def ai_generate_slide(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    slide_id = ctx.rng.choice(deck['slide_ids'])
+    return http.post(ctx.url(f'/presentations/{deck["id"]}/slides/{slide_id}/ai-generate'),
+                     json={'prompt': f'{sentence(ctx.rng, 12)} #{ctx.unique()}'}, headers=headers)
+
+
+# ---- generation ----
+
+@scenario('generate_text')
+def generate_text(http, ctx, item):
+    return http.post(ctx.url('/generate'), json=generate_body(ctx, 'user'), headers=ctx.pick()[0])
+
+
+@scenario('generate_ai', scale=0.25)
+def generate_ai(http, ctx, item):
+    return http.post(ctx.url('/generate'), json=generate_body(ctx), headers=ctx.pick()[0])
+
+
+@scenario('generate_ai_deck', scale=0.25)
+def generate_ai_deck(http, ctx, item):
+    return http.post(ctx.url('/generate'), json=generate_body(ctx, strategy='deck'), headers=ctx.pick()[0])
+
+
+@scenario('generate_stream', scale=0.25)
+def generate_stream(http, ctx, item):
+    return consume(http.post(ctx.url('/generate/stream'), json=generate_body(ctx), headers=ctx.pick()[0],
+                             stream=True))
+
+
+# ---- jobs ----
+
+@scenario('generate_job_submit', scale=0.5)
+def generate_job_submit(http, ctx, item):
+    return http.post(ctx.url('/generate/jobs'), json=generate_body(ctx, 'user'), headers=ctx.pick()[0])
+
+
+@scenario('list_jobs')
+def list_jobs(http, ctx, item):
+    return http.get(ctx.url('/jobs'), headers=ctx.pick()[0])
+
+
+@scenario('job_wait', setup=submit_jobs, scale=0.5)
+def job_wait(http, ctx, item):
+    headers, job_id = item
+    return http.get(ctx.url(f'/jobs/{job_id}?wait=30'), headers=headers)
+
+
+@scenario('job_result', setup=lambda http, ctx, n: submit_jobs(http, ctx, n, wait=True), scale=0.5)
+def job_result(http, ctx, item):
+    headers, job_id = item
+    return http.get(ctx.url(f'/jobs/{job_id}/result'), headers=headers)
+
+
+@scenario('job_cancel', setup=submit_jobs, scale=0.5)
+def job_cancel(http, ctx, item):
+    headers, job_id = item
+    return http.delete(ctx.url(f'/jobs/{job_id}'), headers=headers)
+
+
+# ---- export ----
+
+@scenario('export', scale=0.5)
+def export(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    return consume(http.get(ctx.url(f'/presentations/{deck["id"]}/export'), headers=headers, stream=True))
+
+
+@scenario('export_job_submit', scale=0.5)
+def export_job_submit(http, ctx, item):
+    headers, _, deck = ctx.pick()
+    return http.post(ctx.url(f'/presentations/{deck["id"]}/export/jobs'), headers=headers)
+
+
+@scenario('bulk_export', scale=0.1)
+def bulk_export(http, ctx, item):
+    headers, account, _ = ctx.pick()
+    ids = [d['id'] for d in ctx.rng.sample(account['decks'], min(3, len(account['decks'])))]
+    return consume(http.post(ctx.url('/presentations/export'), json={'ids': ids}, headers=headers, stream=True))
+
+
+# ---- uploads ----
+
+@scenario('upload_document_txt')
+def upload_document_txt(http, ctx, item):
+    text = '\n\n'.join(sentence(ctx.rng, 15) for _ in range(50)) + f'\n{ctx.unique()}'
+    return http.post(ctx.url('/upload-document'), files={'file': ('notes.txt', text.encode('utf-8'))},
+                     headers=ctx.pick()[0])
+
+
+@scenario('upload_document_pdf', scale=0.25)
+def upload_document_pdf(http, ctx, item):
+    pdf = make_pdf(20, tag=str(ctx.unique()))
+    return http.post(ctx.url('/upload-document'), files={'file': ('report.pdf', pdf)}, headers=ctx.pick()[0])
+
+
+@scenario('upload_image', scale=0.25)
+def upload_image(http, ctx, item):
+    png = make_png(ctx.unique())
+    return http.post(ctx.url('/upload-image'), files={'file': ('photo.png', png)}, headers=ctx.pick()[0])
+
+
+def upload_images(http, ctx, n):
+    url = http.post(ctx.url('/upload-image'), files={'file': ('photo.png', make_png(0))},
+                    headers=ctx.pick()[0]).json()['url']
+    return [url] * n
+
+
+@scenario('uploaded_file', setup=upload_images)
+def uploaded_file(http, ctx, item):
+    return consume(http.get(ctx.url(item), stream=True))
+
+
+@scenario('image_search')
+def image_search(http, ctx, item):
+    return http.get(ctx.url(f'/images/search?q={ctx.rng.choice(WORDS)}&limit=10'), headers=ctx.pick()[0])
+
+
+@scenario('image_search_local')
+def image_search_local(http, ctx, item):
+    return http.get(ctx.url(f'/images/search?q={ctx.rng.choice(WORDS)}&limit=10&source=local'),
+                    headers=ctx.pick()[0])
+
+
+def scenario_names():
+    return [s.name for s in SCENARIOS]
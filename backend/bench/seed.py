@@ -0,0 +1,67 @@
+import uuid
+import random
+import datetime
+
+
+# Synthetic datastore contents for benchmarks: users x decks x slides written
+# straight through the app's store (no HTTP), with a deterministic RNG so a
+# given seed always produces the same titles, text and slide order.
+
+WORDS = (
+    'revenue growth market strategy customer retention pipeline launch roadmap quarterly '
+    'forecast margin pricing churn onboarding platform latency adoption partner segment '
+    'hiring budget risk compliance analytics experiment funnel conversion region'
+).split()
+
+PASSWORD = 'bench-password'
+
+
+def sentence(rng, words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def make_slide(rng):
+    return {
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'title': sentence(rng, 4),
+        'content': '\n'.join(f'• {sentence(rng)}' for _ in range(4)),
+        'image': None,
+        'style': {
+            'titleFontSize': 32,
+            'contentFontSize': 18,
+            'fontColor': '#000000',
+            'backgroundColor': '#ffffff',
+            'backgroundImage': None,
+            'backgroundOpacity': 100,
+            'backgroundBlur': 0,
+        },
+    }
+
+
+def seed_store(store, hash_password, users=5, decks=20, slides=10, seed=1):
+    """
+    Create `users` accounts with `decks` presentations of `slides` slides each.
+    Returns [{'username', 'decks': [{'id', 'slide_ids'}]}]; every account's password is PASSWORD.
+    """
+    rng = random.Random(seed)
+    hashed = hash_password(PASSWORD)  # one bcrypt round for the whole run
+    now = datetime.datetime.utcnow().isoformat()
+    accounts = []
+    for u in range(users):
+        username = f'bench{u:04d}'
+        store.create_user(username, {'password': hashed, 'created_at': now})
+        owned = []
+        for _ in range(decks):
+            pres = {
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'owner': username,
+                'title': sentence(rng, 3),
+                'slides': [make_slide(rng) for _ in range(slides)],
+                'created_at': now,
+                'updated_at': now,
+                'version': 1,
+            }
+            store.create_presentation(pres)
+            owned.append({'id': pres['id'], 'slide_ids': [s['id'] for s in pres['slides']]})
+        accounts.append({'username': username, 'decks': owned})
+    return accounts
@@ -0,0 +1,175 @@
+import re
+import json
+import zlib
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+# Local stand-in for the Anthropic, Gemini and Unsplash APIs.
+#
+# Every request waits `latency` seconds plus up to `jitter` more, then fails
+# with `failure_rate` probability (529 / 503 / 500, all retryable) or answers
+# in the shape app.py expects: a {"title", "bullets"} object for slide and
+# summary prompts, a JSON array for whole-deck prompts (streamed as SSE when
+# asked), and placeholder photos for searches. Point the backend at it with
+# ANTHROPIC_API_URL, GOOGLE_API_BASE and UNSPLASH_API_URL.
+
+DECK_RE = re.compile(r'JSON array of exactly (\d+) objects')
+TITLE_RE = re.compile(r'Presentation: "([^"]*)"')
+
+
+class StubConfig:
+    def __init__(self, latency=0.05, jitter=0.02, failure_rate=0.0, stream_chunks=8, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.stream_chunks = stream_chunks
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = Counter()
+
+    def delay(self):
+        with self.lock:
+            return self.latency + self.random.uniform(0, self.jitter)
+
+    def fails(self):
+        with self.lock:
+            return self.random.random() < self.failure_rate
+
+
+def slide_json(prompt, index=0):
+    title = (TITLE_RE.search(prompt) or [None, 'Stub deck'])[1]
+    return {
+        'title': f'{title[:40]} — point {index + 1}',
+        'bullets': [f'Stub insight {index + 1}.{k + 1} about {title[:30]}' for k in range(3)],
+    }
+
+
+def reply_text(prompt):
+    deck = DECK_RE.search(prompt)
+    if deck:
+        return json.dumps([slide_json(prompt, i) for i in range(int(deck.group(1)))])
+    return json.dumps(slide_json(prompt))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None  # set by make_stub_server
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _begin(self, name):
+        with self.config.lock:
+            self.config.calls[name] += 1
+        time.sleep(self.config.delay())
+        return not self.config.fails()
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_json()
+        if path.endswith('/messages'):
+            if not self._begin('anthropic'):
+                return self._send_json(529, {'type': 'error', 'error': {'type': 'overloaded_error'}})
+            text = reply_text(body['messages'][0]['content'])
+            if body.get('stream'):
+                return self._stream_anthropic(text)
+            return self._send_json(200, {'content': [{'type': 'text', 'text': text}]})
+        if path.endswith(':generateText'):
+            if not self._begin('gemini'):
+                return self._send_json(503, {'error': {'status': 'UNAVAILABLE'}})
+            return self._send_json(200, {'candidates': [{'content': reply_text(body['prompt']['text'])}]})
+        self._send_json(404, {'error': 'not found'})
+
+    def _stream_anthropic(self, text):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        size = max(1, len(text) // max(1, self.config.stream_chunks) + 1)
+        for start in range(0, len(text), size):
+            event = {'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': text[start:start + size]}}
+            self.wfile.write(f'event: content_block_delta\ndata: {json.dumps(event)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b'event: message_stop\ndata: {"type": "message_stop"}\n\n')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith('/search/photos'):
+            if not self._begin('unsplash'):
+                return self._send_json(500, {'errors': ['stub failure']})
+            params = parse_qs(url.query)
+            query = params.get('query', ['photo'])[0]
+            limit = int(params.get('per_page', ['10'])[0])
+            return self._send_json(200, {'results': [
+                {
+                    'id': f'stub-{zlib.crc32(f"{query}:{i}".encode()):08x}',
+                    'urls': {k: f'http://stub.invalid/{k}/{i}.jpg' for k in ('thumb', 'small', 'full')},
+                    'user': {'name': 'Stub photographer'},
+                }
+                for i in range(limit)
+            ]})
+        self._send_json(404, {'error': 'not found'})
+
+
+def make_stub_server(config, host='127.0.0.1', port=0):
+    """ThreadingHTTPServer bound to (host, port); port 0 picks a free one."""
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_stub_server(config, host='127.0.0.1', port=0):
+    """Serve on a background thread; returns (server, base_url)."""
+    server = make_stub_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name='llm-stub', daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def stub_env(base_url):
+    """Environment for app.py that sends every provider call to the stub."""
+    return {
+        'ANTHROPIC_API_KEY': 'stub',
+        'ANTHROPIC_API_URL': f'{base_url}/v1/messages',
+        'GOOGLE_API_KEY': 'stub',
+        'GOOGLE_API_BASE': f'{base_url}/v1beta2',
+        'UNSPLASH_ACCESS_KEY': 'stub',
+        'UNSPLASH_API_URL': f'{base_url}/search/photos',
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Anthropic/Gemini/Unsplash server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    config = StubConfig(args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, seed=args.seed)
+    server = make_stub_server(config, args.host, args.port)
+    base = f'http://{args.host}:{server.server_address[1]}'
+    print('Stub listening; export these for app.py:')
+    for key, value in stub_env(base).items():
+        print(f'  export {key}={value}')
+    server.serve_forever()
@@ -0,0 +1,215 @@
+import os
+import re
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+# Content-addressed storage for uploaded images.
+#
+# Files live at <root>/<d[0:2]>/<d[2:4]>/<digest>.<ext> and are served from
+# /uploads/<that path>, so a URL always names the same bytes and can be cached
+# forever. Uploading bytes that already exist returns the existing URL. A
+# SQLite index counts references from slides (image and style.backgroundImage);
+# blobs that stay unreferenced past a grace period are garbage collected.
+# put() and the GC delete run in write transactions on that index, so a blob
+# re-uploaded while GC runs is either kept or stored again, never lost.
+#
+# Uploads are written to a staging directory next to the root (not inside it,
+# so half-written files are never served) and renamed into place once hashed.
+
+URL_PREFIX = '/uploads/'
+BLOB_PATH_RE = re.compile(r'^([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})\.([a-z0-9]+)$')
+
+
+def blob_relpath(digest, ext):
+    return f'{digest[:2]}/{digest[2:4]}/{digest}.{ext}'
+
+
+def digest_from_url(url):
+    """Digest for a content-addressed /uploads/ URL, or None for anything else."""
+    if not isinstance(url, str) or not url.startswith(URL_PREFIX):
+        return None
+    m = BLOB_PATH_RE.match(url[len(URL_PREFIX):])
+    return m.group(3) if m else None
+
+
+def slide_blob_refs(slide):
+    """Digests of the uploads a slide points at (image and background image)."""
+    refs = []
+    for url in (slide.get('image'), (slide.get('style') or {}).get('backgroundImage')):
+        digest = digest_from_url(url)
+        if digest:
+            refs.append(digest)
+    return refs
+
+
+class BlobStore:
+    def __init__(self, root, index_path, gc_grace_seconds=24 * 3600, staging_dir=None):
+        self.root = root
+        self.index_path = index_path
+        self.gc_grace_seconds = gc_grace_seconds
+        # A sibling of root, so moving files in and out stays a rename on one filesystem
+        self.staging_dir = staging_dir or os.path.normpath(root) + '.incoming'
+        self._local = threading.local()
+        self._gc_lock = None
+        os.makedirs(root, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._conn().execute(
+            'CREATE TABLE IF NOT EXISTS blobs ('
+            'digest TEXT PRIMARY KEY, ext TEXT NOT NULL, size INTEGER NOT NULL, '
+            'refcount INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, released_at REAL)')
+
+    @contextmanager
+    def _tx(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def put(self, stream, ext):
+        """Store an uploaded file stream. Returns (url, digest, deduplicated)."""
+        h = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.staging_dir, uuid.uuid4().hex)
+        try:
+            with open(tmp_path, 'wb') as out:
+                for block in iter(lambda: stream.read(1024 * 1024), b''):
+                    h.update(block)
+                    out.write(block)
+                    size += len(block)
+            digest = h.hexdigest()
+
+            with self._tx() as conn:
+                row = conn.execute('SELECT ext FROM blobs WHERE digest = ?', (digest,)).fetchone()
+                if row and os.path.exists(os.path.join(self.root, blob_relpath(digest, row[0]))):
+                    # Restart the grace period so GC can't take it before the client attaches it
+                    conn.execute(
+                        'UPDATE blobs SET released_at = ? WHERE digest = ? AND refcount <= 0',
+                        (time.time(), digest))
+                    return URL_PREFIX + blob_relpath(digest, row[0]), digest, True
+
+                relpath = blob_relpath(digest, ext)
+                os.makedirs(os.path.dirname(os.path.join(self.root, relpath)), exist_ok=True)
+                os.replace(tmp_path, os.path.join(self.root, relpath))
+                conn.execute(
+                    'INSERT OR REPLACE INTO blobs (digest, ext, size, refcount, created_at, released_at) '
+                    'VALUES (?, ?, ?, COALESCE((SELECT refcount FROM blobs WHERE digest = ?), 0), ?, ?)',
+                    (digest, ext, size, digest, time.time(), time.time()))
+                return URL_PREFIX + relpath, digest, False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def adjust(self, deltas):
+        """Apply {digest: +n/-n} reference count changes."""
+        deltas = {d: n for d, n in deltas.items() if n}
+        if not deltas:
+            return
+        now = time.time()
+        with self._tx() as conn:
+            for digest, n in deltas.items():
+                conn.execute(
+                    'UPDATE blobs SET refcount = MAX(0, refcount + ?), '
+                    'released_at = CASE WHEN refcount + ? <= 0 THEN ? ELSE NULL END WHERE digest = ?',
+                    (n, n, now, digest))
+
+    def sync_slides(self, old_slides=(), new_slides=()):
+        """Adjust counts for slides replaced by new_slides (either side may be empty)."""
+        deltas = Counter()
+        for s in new_slides:
+            deltas.update(slide_blob_refs(s))
+        for s in old_slides:
+            deltas.subtract(slide_blob_refs(s))
+        self.adjust(deltas)
+
+    def claim_gc(self):
+        """
+        True if this process collects garbage for the index. The first process to
+        take the flock on <index>.gc.lock keeps it until it exits or close() is
+        called; the others skip collection, and one of them takes over after that.
+        """
+        if fcntl is None or self._gc_lock is not None:
+            return True
+        lock_file = open(self.index_path + '.gc.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self._gc_lock = lock_file
+        return True
+
+    def close(self):
+        if self._gc_lock is not None:
+            self._gc_lock.close()  # releases the flock
+            self._gc_lock = None
+
+    def collect_garbage(self, live=None):
+        """
+        Delete blobs unreferenced for longer than the grace period. Returns bytes freed.
+        `live` ({digest: references}, e.g. from the datastore's upload_refs()) guards
+        against counts that drifted to zero: such blobs get their count back instead.
+        """
+        live = live or {}
+        cutoff = time.time() - self.gc_grace_seconds
+        rows = self._conn().execute(
+            'SELECT digest, ext, size FROM blobs WHERE refcount <= 0 AND released_at < ?', (cutoff,)).fetchall()
+        freed = 0
+        for digest, ext, size in rows:
+            if live.get(digest):
+                self._conn().execute(
+                    'UPDATE blobs SET refcount = MAX(refcount, ?), released_at = NULL WHERE digest = ?',
+                    (live[digest], digest))
+                continue
+            trash = []
+            try:
+                with self._tx() as conn:
+                    # Recheck: an upload or a slide may have claimed it since the SELECT
+                    cur = conn.execute(
+                        'DELETE FROM blobs WHERE digest = ? AND refcount <= 0 AND released_at < ?',
+                        (digest, cutoff))
+                    if not cur.rowcount:
+                        continue
+                    # Move the master and its renditions (<digest>.<variant>.<ext>) aside
+                    # while the index is locked; they are unlinked once the delete commits
+                    shard = os.path.dirname(os.path.join(self.root, blob_relpath(digest, ext)))
+                    for name in (os.listdir(shard) if os.path.isdir(shard) else ()):
+                        if name.startswith(digest + '.'):
+                            moved = os.path.join(self.staging_dir, uuid.uuid4().hex)
+                            os.replace(os.path.join(shard, name), moved)
+                            trash.append((os.path.join(shard, name), moved))
+            except Exception:
+                for path, moved in trash:
+                    os.replace(moved, path)
+                raise
+            for _, moved in trash:
+                os.remove(moved)
+            freed += size
+        return freed
+
+    def stats(self):
+        row = self._conn().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount <= 0), 0) FROM blobs').fetchone()
+        return {'blobs': row[0], 'bytes': row[1], 'unreferenced': row[2]}
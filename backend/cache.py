@@ -0,0 +1,244 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# Small caching building blocks shared by the backend.
+#
+# MemoryCache is a thread-safe LRU with per-entry TTL. DiskCache keeps JSON
+# values in a SQLite file with TTL and an entry cap (and optionally a byte cap)
+# enforced by evicting the least recently used rows. TieredCache puts a MemoryCache in front of a
+# DiskCache and counts hits/misses per tier. SingleFlight lets concurrent
+# callers asking for the same missing key share one computation.
+
+
+def make_key(*parts):
+    """Stable digest for a tuple of JSON-serialisable key parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class MemoryCache:
+    def __init__(self, max_items=256, ttl=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    def __init__(self, path, max_items=5000, ttl=None, max_bytes=None):
+        self.path = path
+        self.max_items = max_items
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn().execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, accessed_at REAL NOT NULL)')
+        self._conn().execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)')
+        columns = [row[1] for row in self._conn().execute('PRAGMA table_info(cache)')]
+        if 'size' not in columns:
+            self._conn().execute('ALTER TABLE cache ADD COLUMN size INTEGER NOT NULL DEFAULT 0')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at < now:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return None
+        conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        raw = json.dumps(value)
+        conn = self._conn()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)',
+            (key, raw, now + ttl if ttl else None, now, len(raw)))
+        self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?', (now,))
+        excess = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_items
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)',
+                (excess,))
+        if self.max_bytes:
+            excess = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0] - self.max_bytes
+            if excess > 0:
+                victims = []
+                for key, size in conn.execute('SELECT key, size FROM cache ORDER BY accessed_at'):
+                    if excess <= 0:
+                        break
+                    victims.append((key,))
+                    excess -= size
+                conn.executemany('DELETE FROM cache WHERE key = ?', victims)
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self._conn().execute('DELETE FROM cache')
+
+    def __len__(self):
+        return self._conn().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class TieredCache:
+    """Memory LRU in front of an optional disk tier, with hit/miss counters."""
+
+    def __init__(self, memory, disk=None, enabled=True):
+        self.memory = memory
+        self.disk = disk
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counts = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bypassed': 0, 'stores': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.memory.get(key)
+        if value is not None:
+            self._count('memory_hits')
+            return copy.deepcopy(value)
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except Exception as e:
+                print(f'Disk cache read failed: {e}')
+                value = None
+            if value is not None:
+                self._count('disk_hits')
+                self.memory.set(key, value)
+                return copy.deepcopy(value)
+        self._count('misses')
+        return None
+
+    def bypass(self):
+        """Record a lookup the caller deliberately skipped (e.g. 'regenerate fresh')."""
+        self._count('bypassed')
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        self.memory.set(key, copy.deepcopy(value))
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                print(f'Disk cache write failed: {e}')
+        self._count('stores')
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['memory_hits'] + counts['disk_hits'] + counts['misses']
+        counts['hit_rate'] = round((counts['memory_hits'] + counts['disk_hits']) / lookups, 4) if lookups else 0.0
+        counts['memory_items'] = len(self.memory)
+        counts['disk_items'] = len(self.disk) if self.disk is not None else 0
+        counts['enabled'] = self.enabled
+        return counts
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution of fn."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.value = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Return (value, shared). Followers get the leader's value or re-raise its error."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+            return call.value, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
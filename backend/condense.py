@@ -0,0 +1,70 @@
+import re
+
+
+# Helpers for condensing long generation input before it reaches slide prompts.
+#
+# Long input is split into chunks on paragraph boundaries; app.py summarises the
+# chunks in parallel (map) and these helpers spread the summaries over the
+# slides in document order (reduce), so each slide prompt carries only its own
+# section plus a short outline of the deck instead of the whole document.
+
+CHARS_PER_TOKEN = 4  # rough average for English prose; good enough for budgeting
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to about max_tokens, on a word boundary where possible."""
+    limit = max(1, max_tokens) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(' ', 0, limit)
+    return text[:cut if cut > limit // 2 else limit].rstrip() + ' …'
+
+
+def _pieces(text, limit):
+    """Paragraphs of text, with any paragraph longer than limit split on lines or words."""
+    for para in re.split(r'\n\s*\n', text):
+        para = para.strip()
+        while len(para) > limit:
+            cut = para.rfind('\n', 0, limit)
+            if cut <= 0:
+                cut = para.rfind(' ', 0, limit)
+            if cut <= 0:
+                cut = limit
+            yield para[:cut].strip()
+            para = para[cut:].strip()
+        if para:
+            yield para
+
+
+def chunk_text(text, max_tokens):
+    """Split text into chunks of at most max_tokens, packing whole paragraphs where they fit."""
+    limit = max(1, max_tokens) * CHARS_PER_TOKEN
+    chunks = []
+    current = ''
+    for piece in _pieces(text, limit):
+        if current and len(current) + 2 + len(piece) > limit:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f'{current}\n\n{piece}' if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def assign_sections(section_count, slide_count):
+    """
+    Indices of the sections each slide covers, keeping document order.
+    With more sections than slides each slide gets a contiguous run; with fewer,
+    neighbouring slides share a section.
+    """
+    if section_count == 0:
+        return [[] for _ in range(slide_count)]
+    if section_count >= slide_count:
+        return [list(range(k * section_count // slide_count, (k + 1) * section_count // slide_count))
+                for k in range(slide_count)]
+    return [[k * section_count // slide_count] for k in range(slide_count)]
@@ -0,0 +1,150 @@
+import io
+import os
+import tempfile
+from collections import deque
+
+
+# Text extraction for uploaded documents.
+#
+# Small PDFs are parsed straight from the uploaded bytes. Large files are
+# split into page ranges extracted in parallel on a process pool, since PyPDF2
+# is pure Python and threads would serialise on the GIL; the bytes are written
+# to one temp file that every worker opens, rather than pickled into each task.
+# Pages are yielded in order as soon as their range is done, and page/character
+# budgets stop the work early instead of parsing pages nobody will read.
+#
+# Extracted documents are cached as a record keyed by the file's SHA-256:
+#     {id, filename, page_count, pages, text, page_offsets, truncated, max_pages, max_chars}
+# where text is the pages joined with newlines and page_offsets[i] is where page i
+# starts in it, so single pages can be sliced out later without re-parsing.
+
+
+class CutText(str):
+    """Page text shortened to fit the character budget."""
+
+
+def _reader(source):
+    """PDF reader for in-memory bytes or a file path."""
+    import PyPDF2  # imported by the first upload (or worker process) that parses a PDF
+    return PyPDF2.PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+
+
+def pdf_page_count(data):
+    return len(_reader(data).pages)
+
+
+def extract_page_range(source, start, end):
+    """Text of pages [start, end) of a PDF (bytes or path). Runs in a worker process, so it reopens the document."""
+    reader = _reader(source)
+    texts = []
+    for i in range(start, end):
+        try:
+            texts.append(reader.pages[i].extract_text() or '')
+        except Exception as e:
+            print(f'PDF page {i} extraction error: {e}')
+            texts.append('')
+    return texts
+
+
+def iter_pdf_pages(data, executor=None, pages_per_task=16, max_pages=None, max_chars=None, window=4):
+    """
+    Yield (page_index, text) in page order.
+    Documents longer than pages_per_task are fanned out over executor with at most
+    `window` ranges in flight. Stops after max_pages pages or max_chars characters
+    (the last page is cut to fit); pending ranges are cancelled when the caller stops.
+    """
+    total = pdf_page_count(data)
+    if max_pages is not None:
+        total = min(total, max_pages)
+    ranges = deque((start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task))
+
+    path = None
+    if executor is None or len(ranges) <= 1:
+        batches = (extract_page_range(data, start, end) for start, end in ranges)
+        pending = None
+    else:
+        pending = deque()
+        fd, path = tempfile.mkstemp(prefix='upload-', suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+        def fill():
+            while ranges and len(pending) < window:
+                start, end = ranges.popleft()
+                pending.append(executor.submit(extract_page_range, path, start, end))
+
+        def collect():
+            while pending:
+                future = pending.popleft()
+                fill()
+                yield future.result()
+
+        fill()
+        batches = collect()
+
+    try:
+        yield from _within_chars((text for texts in batches for text in texts), max_chars)
+    finally:
+        for future in pending or ():
+            future.cancel()
+        if path:
+            os.remove(path)  # workers still reading it keep their open handle
+
+
+def _within_chars(texts, max_chars):
+    """Enumerate page texts until max_chars is used up, cutting the last page to fit (as CutText)."""
+    chars = 0
+    for index, text in enumerate(texts):
+        if max_chars is not None and chars + len(text) > max_chars:
+            yield index, CutText(text[:max_chars - chars])
+            return
+        chars += len(text)
+        yield index, text
+        if max_chars is not None and chars == max_chars:
+            return
+
+
+def build_document(doc_id, filename, texts, page_count, max_pages, max_chars):
+    """Cache record for the page texts extracted under the given budget."""
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text) + 1
+    return {
+        'id': doc_id,
+        'filename': filename,
+        'page_count': page_count,
+        'pages': len(texts),
+        'text': '\n'.join(texts),
+        'page_offsets': offsets,
+        'truncated': len(texts) < page_count or any(isinstance(t, CutText) for t in texts),
+        'max_pages': max_pages,
+        'max_chars': max_chars,
+    }
+
+
+def document_page_texts(doc, start=0, end=None):
+    """Texts of pages [start, end) of a cached document record."""
+    offsets = doc['page_offsets']
+    bounds = offsets + [len(doc['text']) + 1]
+    end = len(offsets) if end is None else min(end, len(offsets))
+    return [doc['text'][bounds[i]:bounds[i + 1] - 1] for i in range(max(0, start), end)]
+
+
+def document_covers(doc, max_pages, max_chars):
+    """True if the record holds everything an extraction with this budget would return."""
+    return not doc['truncated'] or (max_pages <= doc['max_pages'] and max_chars <= doc['max_chars'])
+
+
+def iter_text_pages(text, max_chars):
+    """A plain-text upload as a single page, cut to the budget like iter_pdf_pages."""
+    return _within_chars([text] if text else [], max_chars)
+
+
+def iter_document_pages(doc, max_pages, max_chars):
+    """(page_index, text) for a cached record, cut to the budget like iter_pdf_pages."""
+    texts = document_page_texts(doc, 0, max_pages)
+    if doc['truncated'] and texts and len(texts) == doc['page_count']:
+        texts[-1] = CutText(texts[-1])  # every page is there, so the record ends in a cut page
+    return _within_chars(texts, max_chars)
@@ -0,0 +1,67 @@
+import time
+import hashlib
+
+
+# Stock image search providers.
+#
+# Each provider is search(query, limit) -> list of {id, thumb, small, full, author}
+# and raises on upstream errors so callers don't cache failures. 'local' is an
+# offline stand-in that returns deterministic placeholder results (with an
+# optional artificial delay) for tests and development without an API key.
+
+UNSPLASH_URL = 'https://api.unsplash.com/search/photos'
+MAX_LIMIT = 30  # Unsplash's per_page ceiling
+
+
+def normalize_query(q):
+    return ' '.join(q.lower().split())
+
+
+class UnsplashSearch:
+    def __init__(self, access_key, url=UNSPLASH_URL, timeout=10):
+        self.access_key = access_key
+        self.url = url
+        self.timeout = timeout
+        import requests  # only once Unsplash is actually used
+        self.session = requests.Session()
+
+    def search(self, query, limit):
+        resp = self.session.get(
+            self.url,
+            params={'query': query or 'photo', 'per_page': limit},
+            headers={'Authorization': f'Client-ID {self.access_key}'},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return [
+            {
+                'id': hit.get('id'),
+                'thumb': hit.get('urls', {}).get('thumb'),
+                'small': hit.get('urls', {}).get('small'),
+                'full': hit.get('urls', {}).get('full'),
+                'author': (hit.get('user') or {}).get('name'),
+            }
+            for hit in resp.json().get('results', [])
+        ]
+
+
+class LocalSearch:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def search(self, query, limit):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        results = []
+        for i in range(limit):
+            seed = hashlib.sha1(f'{query}:{i}'.encode('utf-8')).hexdigest()[:12]
+            results.append({
+                'id': f'local-{seed}',
+                'thumb': f'https://picsum.photos/seed/{seed}/200/133',
+                'small': f'https://picsum.photos/seed/{seed}/400/267',
+                'full': f'https://picsum.photos/seed/{seed}/1600/1067',
+                'author': 'Local placeholder',
+            })
+        return results
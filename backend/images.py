@@ -0,0 +1,74 @@
+import os
+import re
+import uuid
+
+
+# Resized renditions of uploaded images.
+#
+# Next to each content-addressed master (see blobs.py) we keep downscaled
+# variants named <digest>.<variant>.<ext>. They are derived from immutable
+# bytes, so their URLs are immutable too. A variant is only written when the
+# master is wider than the variant's target; otherwise the master is used.
+
+EXPORT_BOX_INCHES = 4  # width of the picture box render_pptx places on a slide
+
+
+def variant_widths(export_dpi=150):
+    return {
+        'thumb': 256,
+        'editor': 1200,
+        'export': int(EXPORT_BOX_INCHES * export_dpi),
+    }
+
+
+VARIANT_PATH_RE = re.compile(r'^([0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64})\.([a-z]+)\.([a-z0-9]+)$')
+SKIP_EXTS = {'gif'}  # resizing would drop animation frames
+
+
+def variant_relpath(master_relpath, variant):
+    base, ext = master_relpath.rsplit('.', 1)
+    return f'{base}.{variant}.{ext}'
+
+
+def master_relpath_for_variant(relpath):
+    """uploads-relative master path for a variant path, or None if relpath isn't a variant."""
+    m = VARIANT_PATH_RE.match(relpath)
+    return f'{m.group(1)}.{m.group(3)}' if m else None
+
+
+def generate_variants(root, master_relpath, widths):
+    """Write every missing variant of a master that is wider than its target width.
+    Returns the names of variants that exist afterwards."""
+    ext = master_relpath.rsplit('.', 1)[-1]
+    if ext in SKIP_EXTS:
+        return []
+    try:
+        from PIL import Image, ImageOps  # imported by the first upload that gets resized
+    except ImportError:
+        return []
+    master_path = os.path.join(root, master_relpath)
+    ready = []
+    with Image.open(master_path) as img:
+        fmt = img.format or 'PNG'
+        img = ImageOps.exif_transpose(img)
+        for name, width in sorted(widths.items(), key=lambda kv: -kv[1]):
+            out_path = os.path.join(root, variant_relpath(master_relpath, name))
+            if os.path.exists(out_path):
+                ready.append(name)
+                continue
+            if img.width <= width:
+                continue
+            height = max(1, round(img.height * width / img.width))
+            resized = img.resize((width, height), Image.LANCZOS)
+            tmp_path = f'{out_path}.{uuid.uuid4().hex}.tmp'
+            try:
+                if ext in ('jpg', 'jpeg'):
+                    resized.convert('RGB').save(tmp_path, 'JPEG', quality=85, optimize=True, progressive=True)
+                else:
+                    resized.save(tmp_path, fmt, optimize=True)
+                os.replace(tmp_path, out_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            ready.append(name)
+    return ready
@@ -0,0 +1,221 @@
+import os
+import time
+import uuid
+import socket
+import datetime
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Background job queue for slow work (LLM generation, PPTX export).
+#
+# Jobs run on their own worker pool so they never tie up request threads, and
+# every state change is written through the datastore so status survives
+# restarts. Handlers are plain functions registered by kind:
+#     handler(job_context, params) -> result dict
+# and may call job_context.check_cancelled() between steps to stop early.
+#
+# Several worker processes can share one datastore. A job only runs after a
+# worker claims it with a conditional status change in the store
+# (store.update_job: queued -> running, plus the worker id and a lease), so
+# each job runs once however many processes see it queued. Running workers
+# renew their leases; a running job whose lease ran out lost its worker and is
+# failed by the next sweep. Cancel requests and waits go through the store too,
+# so they work whichever process got the HTTP request.
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+WAIT_POLL_SECONDS = 0.25
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now():
+    return datetime.datetime.utcnow().isoformat()
+
+
+class JobContext:
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self.job_id = job_id
+
+    def cancelled(self):
+        """True once a cancel was requested from any worker process."""
+        job = self._queue.store.get_job(self.job_id)
+        return job is None or bool(job.get('cancel_requested'))
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled()
+
+
+class JobQueue:
+    def __init__(self, store, max_workers=2, lease_seconds=60):
+        self.store = store
+        self.handlers = {}
+        self.lease_seconds = lease_seconds
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._futures = {}
+        self._done_events = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._maintainer = None
+
+    def register(self, kind, handler):
+        self.handlers[kind] = handler
+
+    def start(self):
+        """Recover jobs left by earlier runs, then keep leases fresh and pick up orphaned jobs."""
+        self.recover()
+        if self._maintainer is None:
+            self._maintainer = threading.Thread(target=self._maintain, name='job-leases', daemon=True)
+            self._maintainer.start()
+
+    def stop(self):
+        """Stop lease renewal and drop jobs not yet started; they stay queued in the store for the next worker."""
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _maintain(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                self._renew_leases()
+                self.recover()
+            except Exception as e:
+                print(f'Job maintenance failed: {e}')
+
+    def _renew_leases(self):
+        with self._lock:
+            running = list(self._futures)
+        for job_id in running:
+            self.store.update_job(job_id, {'lease_expires': time.time() + self.lease_seconds},
+                                  statuses=(RUNNING,), worker=self.worker_id)
+
+    def recover(self):
+        """
+        Offer every queued job to this worker's pool (the claim in _run makes sure
+        only one process runs it) and fail running jobs whose worker stopped
+        renewing its lease, e.g. because the server restarted mid-run.
+        """
+        for job in self.store.list_jobs(statuses=(QUEUED, RUNNING)):
+            if job['status'] == QUEUED:
+                if job['kind'] in self.handlers:
+                    self._dispatch(job)
+                continue
+            self.store.update_job(job['id'], {
+                'status': FAILED, 'error': 'Interrupted by server restart', 'finished_at': _now(),
+            }, statuses=(RUNNING,), expired_before=time.time())
+
+    def submit(self, owner, kind, params):
+        if kind not in self.handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        job = {
+            'id': str(uuid.uuid4()),
+            'owner': owner,
+            'kind': kind,
+            'status': QUEUED,
+            'params': params,
+            'result': None,
+            'error': None,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'worker': None,
+            'lease_expires': None,
+            'cancel_requested': False,
+        }
+        self.store.save_job(job)
+        self._dispatch(job)
+        return job
+
+    def _dispatch(self, job):
+        with self._lock:
+            if job['id'] in self._futures or self._stopped.is_set():
+                return
+            self._done_events[job['id']] = threading.Event()
+            self._futures[job['id']] = self._executor.submit(self._run, job['id'])
+
+    def _finish(self, job_id, **fields):
+        """Final transition; a no-op if the job is no longer ours (cancelled or failed by a sweep)."""
+        fields['finished_at'] = _now()
+        return self.store.update_job(job_id, fields, statuses=(RUNNING,), worker=self.worker_id)
+
+    def _run(self, job_id):
+        try:
+            job = self.store.update_job(job_id, {
+                'status': RUNNING,
+                'started_at': _now(),
+                'worker': self.worker_id,
+                'lease_expires': time.time() + self.lease_seconds,
+            }, statuses=(QUEUED,))
+            if job is None:
+                return  # claimed by another worker, or cancelled while queued
+            try:
+                result = self.handlers[job['kind']](JobContext(self, job_id), job['params'])
+                self._finish(job_id, status=SUCCEEDED, result=result)
+            except JobCancelled:
+                self._finish(job_id, status=CANCELLED)
+            except Exception as e:
+                traceback.print_exc()
+                self._finish(job_id, status=FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                event = self._done_events.pop(job_id, None)
+            if event:
+                event.set()
+
+    def get(self, job_id):
+        return self.store.get_job(job_id)
+
+    def wait(self, job_id, timeout):
+        """
+        Block until the job finishes or timeout seconds pass; returns the current
+        job. Polls the store, so jobs running in another worker process are seen
+        too; one running here wakes the wait as soon as it is done.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get_job(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in FINISHED or remaining <= 0:
+                return job
+            with self._lock:
+                event = self._done_events.get(job_id)
+            if event:
+                event.wait(min(remaining, WAIT_POLL_SECONDS))
+            else:
+                time.sleep(min(remaining, WAIT_POLL_SECONDS))
+
+    def cancel(self, job_id):
+        """Cancel a queued job outright, or ask a running one (in any worker) to stop at its next check."""
+        job = self.store.update_job(job_id, {
+            'status': CANCELLED, 'cancel_requested': True, 'finished_at': _now(),
+        }, statuses=(QUEUED,))
+        if job is not None:
+            with self._lock:
+                future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                # Never started here: _run won't execute, so finish the bookkeeping
+                with self._lock:
+                    self._futures.pop(job_id, None)
+                    event = self._done_events.pop(job_id, None)
+                if event:
+                    event.set()
+            return job
+        self.store.update_job(job_id, {'cancel_requested': True}, statuses=(RUNNING,))
+        return self.store.get_job(job_id)
+
+
+def public_job(job):
+    """Job as returned by the API (request parameters and worker bookkeeping stay server-side)."""
+    return {k: v for k, v in job.items() if k not in ('params', 'worker', 'lease_expires')}
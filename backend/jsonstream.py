@@ -0,0 +1,76 @@
+import json
+
+
+class JSONArrayStream:
+    """Incrementally pull the elements of the first JSON array out of streamed text.
+
+    Feed text chunks as they arrive; each call returns the elements that became
+    complete in that chunk. Anything before the array (prose, a ```json fence,
+    or an enclosing {"slides": ...} object) is skipped. Elements that fail to
+    parse are returned as None so callers can keep positions aligned.
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._started = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self):
+        return self._done
+
+    def feed(self, chunk):
+        items = []
+        for ch in chunk:
+            if self._done:
+                break
+            if self._in_string:
+                if self._started and self._depth > 0:
+                    self._buf.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._started and self._depth > 0:
+                    self._buf.append(ch)
+                continue
+
+            if not self._started:
+                if ch == '[':
+                    self._started = True
+                continue
+
+            if self._depth == 0:
+                # Between elements of the top-level array
+                if ch == ']':
+                    self._done = True
+                elif ch in '{[':
+                    self._depth = 1
+                    self._buf = [ch]
+                continue
+
+            self._buf.append(ch)
+            if ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append(self._decode(''.join(self._buf)))
+                    self._buf = []
+        return items
+
+    @staticmethod
+    def _decode(text):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
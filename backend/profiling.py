@@ -0,0 +1,135 @@
+import os
+import re
+import sys
+import uuid
+import cProfile
+import datetime
+import threading
+from collections import Counter
+
+
+# Per-request profiling for slow-call investigations.
+#
+# Two modes: 'cprofile' is deterministic and saves a .pstats file (open with
+# pstats, snakeviz, ...); 'sample' walks the request thread's stack every few
+# milliseconds from a helper thread and saves collapsed stacks
+# ("frame;frame;frame count" lines) ready for flamegraph.pl or speedscope.
+# Sampling has far lower overhead on call-heavy code. Artifacts go to one
+# directory that is trimmed to a file count and size cap, oldest first.
+
+MODES = ('cprofile', 'sample')
+ARTIFACT_RE = re.compile(r'^[\w.-]+\.(pstats|collapsed)$')
+
+
+class SamplingProfiler:
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class DeterministicProfiler:
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def dump(self, path):
+        self._profile.dump_stats(path)
+
+
+def start_profiler(mode, sample_interval=0.005):
+    """Start profiling the calling thread; call stop() from the same thread."""
+    if mode == 'sample':
+        profiler = SamplingProfiler(threading.get_ident(), sample_interval)
+    elif mode == 'cprofile':
+        profiler = DeterministicProfiler()
+    else:
+        raise ValueError(f'Unknown profile mode: {mode}')
+    profiler.mode = mode
+    profiler.start()
+    return profiler
+
+
+class ProfileArtifacts:
+    def __init__(self, directory, max_files=50, max_bytes=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, profiler, label):
+        """Write a stopped profiler's output and return the artifact name."""
+        stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        slug = re.sub(r'[^\w-]+', '-', label).strip('-')[:60] or 'request'
+        ext = 'collapsed' if profiler.mode == 'sample' else 'pstats'
+        name = f'{stamp}-{slug}-{uuid.uuid4().hex[:8]}.{ext}'
+        tmp_path = os.path.join(self.directory, f'.{name}.tmp')
+        profiler.dump(tmp_path)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        self._evict(keep=name)
+        return name
+
+    def list(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not ARTIFACT_RE.match(name):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append({'name': name, 'size': st.st_size, 'mtime': st.st_mtime})
+        return sorted(entries, key=lambda e: e['mtime'], reverse=True)
+
+    def path(self, name):
+        """Absolute path of an artifact, or None for unknown or malformed names."""
+        if not ARTIFACT_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def _evict(self, keep=None):
+        with self._lock:
+            entries = self.list()
+            total = sum(e['size'] for e in entries)
+            for index, entry in reversed(list(enumerate(entries))):
+                if index < self.max_files and total <= self.max_bytes:
+                    break
+                if entry['name'] == keep:
+                    continue
+                try:
+                    os.remove(os.path.join(self.directory, entry['name']))
+                    total -= entry['size']
+                except OSError:
+                    pass
@@ -0,0 +1,185 @@
+import time
+import random
+import threading
+
+
+# HTTP client layer for LLM providers.
+#
+# Each provider gets one ProviderClient: a keep-alive requests.Session, a
+# concurrency semaphore, jittered exponential retry on retryable statuses and
+# a circuit breaker. While the breaker is open, post() raises
+# ProviderUnavailable immediately so callers can move on to the next provider
+# instead of waiting out another timeout.
+#
+# requests is imported when a client first sends something, not at import, so
+# processes that never call a provider don't pay for it.
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+
+
+class ProviderUnavailable(Exception):
+    """Raised when a provider's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self):
+        """True if a request may go out now. In half-open state only one probe is let through."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 3)
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'retry_in': retry_in,
+                'times_opened': self.times_opened,
+            }
+
+
+class ProviderClient:
+    def __init__(self, name, max_concurrency=4, retries=2, backoff_base=0.5, backoff_max=8.0,
+                 timeout=30, breaker=None):
+        self.name = name
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        # Callers hold a slot for the whole exchange (including streamed bodies)
+        self.slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self.max_concurrency = max(1, max_concurrency)
+        self._session = None
+        self._lock = threading.Lock()
+        self._counts = {'requests': 0, 'retries': 0, 'failures': 0, 'short_circuited': 0}
+
+    @property
+    def session(self):
+        """Pooled keep-alive session, created on first use."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _backoff(self, attempt, resp=None):
+        retry_after = resp.headers.get('Retry-After') if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        # Full jitter: uniform in [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, url, **kwargs):
+        """POST with retries. Raises ProviderUnavailable if the breaker is open,
+        or the last error once retries are exhausted."""
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise ProviderUnavailable(f'{self.name} circuit is open')
+        kwargs.setdefault('timeout', self.timeout)
+        import requests
+
+        attempt = 0
+        while True:
+            self._count('requests')
+            try:
+                resp = self.session.post(url, **kwargs)
+            except Exception as e:
+                # Anything raised counts as a failure, so a half-open probe never stays in flight
+                retryable = isinstance(e, (requests.ConnectionError, requests.Timeout))
+                if not retryable or attempt >= self.retries:
+                    self._count('failures')
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                self._count('retries')
+                continue
+
+            if resp.status_code in RETRYABLE_STATUSES:
+                if attempt < self.retries:
+                    delay = self._backoff(attempt, resp)
+                    resp.close()
+                    time.sleep(delay)
+                    attempt += 1
+                    self._count('retries')
+                    continue
+                self._count('failures')
+                self.breaker.record_failure()
+            elif resp.status_code >= 500:
+                self._count('failures')
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return resp
+
+    def status(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {'name': self.name, 'breaker': self.breaker.snapshot(), **counts}
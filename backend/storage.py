@@ -0,0 +1,1521 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): JSONStore then only serialises writers within one process
+    fcntl = None
+
+
+# Pluggable datastore used by app.py.
+#
+# Every backend exposes the same small interface so routes can do row-level
+# reads and writes instead of loading and re-serializing the whole dataset.
+# `export_data` / `import_data` keep the legacy {'users', 'presentations'}
+# document shape around for migrations and the read_data/write_data helpers.
+
+class Store:
+    """Base datastore interface. Presentations are plain dicts with a 'slides' list
+    and a 'version' counter that every write to the deck or its slides increments.
+
+    Every presentation and slide write takes an optional `expected_version`: it
+    is compared with the deck's version inside the same lock or transaction as
+    the write, which raises VersionConflict instead of writing if they differ."""
+
+    # ---- users ----
+    def get_user(self, username):
+        raise NotImplementedError
+
+    def create_user(self, username, record):
+        """Insert a user; returns False if the username already exists."""
+        raise NotImplementedError
+
+    # ---- presentations ----
+    def list_presentations(self, owner):
+        raise NotImplementedError
+
+    def page_presentations(self, owner, limit=None, after=None, sort='updated_at',
+                           descending=True, full=False):
+        """One page of an owner's presentations as summaries (or full decks when `full`).
+
+        `after` is the (sort_value, id) key of the last item on the previous page.
+        Returns (items, next_key); next_key is None on the last page.
+        """
+        decks = self.list_presentations(owner)
+        rows = decks if full else [presentation_summary(p) for p in decks]
+        return paginate(rows, limit, after, sort, descending)
+
+    def get_presentation(self, pres_id, with_slides=True):
+        raise NotImplementedError
+
+    def create_presentation(self, pres):
+        raise NotImplementedError
+
+    def update_presentation(self, pres_id, fields, expected_version=None):
+        """Patch top-level presentation fields (title, updated_at, ...)."""
+        raise NotImplementedError
+
+    def delete_presentation(self, pres_id, expected_version=None):
+        raise NotImplementedError
+
+    # ---- slides ----
+    def get_slide(self, pres_id, slide_id):
+        raise NotImplementedError
+
+    def create_slide(self, pres_id, slide, updated_at, expected_version=None):
+        """Append a slide. slide['id'] must be new to the store: the routes assign a uuid."""
+        raise NotImplementedError
+
+    def update_slide(self, pres_id, slide, updated_at, expected_version=None):
+        raise NotImplementedError
+
+    def delete_slide(self, pres_id, slide_id, updated_at, expected_version=None):
+        raise NotImplementedError
+
+    def reorder_slides(self, pres_id, slide_ids, updated_at, expected_version=None):
+        """Put slides in the given order; unknown ids are ignored, missing ones go last."""
+        raise NotImplementedError
+
+    def move_slide(self, pres_id, slide_id, after_id, updated_at, expected_version=None):
+        """Move one slide to just after after_id (None = first), leaving the others in place.
+        Returns False if the presentation or either slide doesn't exist."""
+        raise NotImplementedError
+
+    def apply_batch(self, pres_id, ops, updated_at, expected_version=None):
+        """Apply a list of batch ops (see apply_batch_ops) atomically.
+        Returns (before, after) decks, None if the presentation doesn't exist, and
+        raises BatchError without writing anything if any op fails, or VersionConflict
+        if expected_version is given and the deck has moved on."""
+        raise NotImplementedError
+
+    # ---- background jobs ----
+    def save_job(self, job):
+        """Insert or replace a job record (see jobs.py)."""
+        raise NotImplementedError
+
+    def get_job(self, job_id):
+        raise NotImplementedError
+
+    def list_jobs(self, owner=None, statuses=None, limit=None):
+        """Jobs, newest first, optionally filtered by owner and status."""
+        raise NotImplementedError
+
+    def update_job(self, job_id, fields, statuses=None, worker=None, expired_before=None):
+        """
+        Patch a job atomically (also across processes sharing the store), but only
+        if its status is in `statuses`, it belongs to `worker` and its lease ran
+        out before `expired_before` (each when given). Returns the updated job, or
+        None if it doesn't exist or a condition failed.
+        """
+        raise NotImplementedError
+
+    # ---- image references ----
+    def upload_refs(self):
+        """URLs under /uploads/ that slides point at (image or style.backgroundImage),
+        one entry per reference. Reads only those two fields, for the blob GC."""
+        raise NotImplementedError
+
+    # ---- whole-dataset access (migrations, legacy helpers) ----
+    def export_data(self):
+        raise NotImplementedError
+
+    def import_data(self, data):
+        raise NotImplementedError
+
+
+SORT_FIELDS = ('updated_at', 'created_at', 'title')
+PREVIEW_CHARS = 160
+UPLOADS_PREFIX = '/uploads/'
+
+
+def presentation_summary(pres, slides=None):
+    """Gallery projection of a deck: counts and a first-slide preview instead of every slide."""
+    slides = pres.get('slides', []) if slides is None else slides
+    first = slides[0] if slides else None
+    return summary_from_parts(pres, len(slides), first)
+
+
+def summary_from_parts(pres, slide_count, first_slide):
+    preview = None
+    if first_slide:
+        style = first_slide.get('style') or {}
+        preview = {
+            'title': first_slide.get('title'),
+            'content': (first_slide.get('content') or '')[:PREVIEW_CHARS],
+            'image': first_slide.get('image'),
+            'backgroundColor': style.get('backgroundColor'),
+        }
+    return {
+        'id': pres['id'],
+        'title': pres.get('title'),
+        'slide_count': slide_count,
+        'created_at': pres.get('created_at'),
+        'updated_at': pres.get('updated_at'),
+        'preview': preview,
+    }
+
+
+def slide_upload_refs(slides):
+    for slide in slides:
+        for url in (slide.get('image'), (slide.get('style') or {}).get('backgroundImage')):
+            if isinstance(url, str) and url.startswith(UPLOADS_PREFIX):
+                yield url
+
+
+def sort_key(item, sort):
+    return (item.get(sort) or '', item['id'])
+
+
+def paginate(items, limit, after, sort, descending):
+    """Keyset pagination over in-memory rows, ordered by (sort, id)."""
+    items = sorted(items, key=lambda i: sort_key(i, sort), reverse=descending)
+    if after is not None:
+        after = tuple(after)
+        if descending:
+            items = [i for i in items if sort_key(i, sort) < after]
+        else:
+            items = [i for i in items if sort_key(i, sort) > after]
+    if limit is None or len(items) <= limit:
+        return items, None
+    page = items[:limit]
+    return page, sort_key(page[-1], sort)
+
+
+def filter_jobs(jobs, owner=None, statuses=None, limit=None):
+    jobs = [j for j in jobs
+            if (owner is None or j['owner'] == owner) and (statuses is None or j['status'] in statuses)]
+    jobs.sort(key=lambda j: j['created_at'], reverse=True)
+    return jobs[:limit] if limit else jobs
+
+
+def job_matches(job, statuses=None, worker=None, expired_before=None):
+    """The update_job conditions."""
+    if statuses is not None and job.get('status') not in statuses:
+        return False
+    if worker is not None and job.get('worker') != worker:
+        return False
+    if expired_before is not None and (job.get('lease_expires') or 0) >= expired_before:
+        return False
+    return True
+
+
+def _ordered_slides(slides, slide_ids):
+    slide_map = {s['id']: s for s in slides}
+    new_slides = []
+    seen = set()
+    for sid in slide_ids:
+        if sid in slide_map and sid not in seen:
+            new_slides.append(slide_map[sid])
+            seen.add(sid)
+    # Add any slides that weren't in the order list (shouldn't happen)
+    for s in slides:
+        if s['id'] not in seen:
+            new_slides.append(s)
+    return new_slides
+
+
+def deck_version(pres):
+    return pres.get('version', 1)  # decks saved before versioning count as version 1
+
+
+def bump_version(pres):
+    pres['version'] = deck_version(pres) + 1
+
+
+class VersionConflict(Exception):
+    """The deck's version no longer matches the one the client last saw."""
+
+    def __init__(self, current):
+        super().__init__(f'Presentation is at version {current}')
+        self.current = current
+
+
+def _check_version(pres, expected_version):
+    if expected_version is not None and deck_version(pres) != expected_version:
+        raise VersionConflict(deck_version(pres))
+
+
+class BatchError(ValueError):
+    """A batch op could not be applied; `index` is its position in the batch."""
+
+    def __init__(self, index, message):
+        super().__init__(f'Operation {index}: {message}')
+        self.index = index
+
+
+def apply_batch_ops(pres, ops, updated_at):
+    """
+    Apply normalized batch ops to a full deck in place, in order:
+      {'op': 'set_title', 'title'}
+      {'op': 'create_slide', 'slide', 'after'}   after: slide id, None = first, missing = last
+      {'op': 'update_slide', 'slide_id', 'fields', 'style'?}   fields replace title/content/image
+      {'op': 'patch_style', 'slide_id', 'style'}   merged into the slide's style
+      {'op': 'move_slide', 'slide_id', 'after'}
+      {'op': 'delete_slide', 'slide_id'}
+    Raises BatchError on the first op that can't be applied; callers apply to a copy.
+    """
+    slides = pres['slides']
+    positions = SlideIndex()
+
+    def find(slide_id, index):
+        pos = positions.find(pres, slide_id)
+        if pos is None:
+            raise BatchError(index, f'Slide {slide_id} not found')
+        return pos
+
+    for index, op in enumerate(ops):
+        kind = op.get('op')
+        if kind == 'set_title':
+            pres['title'] = op['title']
+        elif kind == 'create_slide':
+            if positions.find(pres, op['slide']['id']) is not None:
+                raise BatchError(index, f'Slide {op["slide"]["id"]} already exists')
+            if op.get('after') is not None:
+                find(op['after'], index)
+            slides.append(copy.deepcopy(op['slide']))
+            if 'after' in op:
+                move_slide_in_list(pres, op['slide']['id'], op['after'], positions)
+        elif kind in ('update_slide', 'patch_style'):
+            slide = slides[find(op['slide_id'], index)]
+            slide.update(op.get('fields') or {})
+            if op.get('style'):
+                slide['style'] = dict(slide.get('style') or {}, **op['style'])
+        elif kind == 'move_slide':
+            find(op['slide_id'], index)
+            if op.get('after') is not None:
+                find(op['after'], index)
+            if not move_slide_in_list(pres, op['slide_id'], op.get('after'), positions):
+                raise BatchError(index, 'Cannot move a slide after itself')
+        elif kind == 'delete_slide':
+            slides.pop(find(op['slide_id'], index))
+        else:
+            raise BatchError(index, f'Unknown op: {kind}')
+    pres['updated_at'] = updated_at
+    bump_version(pres)
+    return pres
+
+
+class SlideIndex:
+    """Slide id -> list position per presentation.
+
+    Lookups check the slide found at the cached position, so an index made
+    stale by an insert, delete or move is simply rebuilt on the next miss:
+    O(1) for the common case of repeated edits, O(n) once after a reshuffle.
+    """
+
+    def __init__(self):
+        self._positions = {}
+
+    def find(self, pres, slide_id):
+        slides = pres['slides']
+        positions = self._positions.get(pres['id'])
+        if positions is not None:
+            pos = positions.get(slide_id)
+            if pos is not None and pos < len(slides) and slides[pos]['id'] == slide_id:
+                return pos
+        positions = self._positions[pres['id']] = {s['id']: i for i, s in enumerate(slides)}
+        return positions.get(slide_id)
+
+    def refresh(self, pres, start, end):
+        """Re-record the positions of slides[start:end] after they shifted in place."""
+        positions = self._positions.get(pres['id'])
+        if positions is not None:
+            for pos in range(start, min(end, len(pres['slides']))):
+                positions[pres['slides'][pos]['id']] = pos
+
+    def drop(self, pres_id):
+        self._positions.pop(pres_id, None)
+
+
+def move_slide_in_list(pres, slide_id, after_id, index):
+    """Move a slide to just after after_id (None = first). False if either slide is missing."""
+    pos = index.find(pres, slide_id)
+    if pos is None or after_id == slide_id:
+        return False
+    if after_id is not None and index.find(pres, after_id) is None:
+        return False
+    target = 0 if after_id is None else index.find(pres, after_id)
+    if after_id is not None and target < pos:
+        target += 1
+    pres['slides'].insert(target, pres['slides'].pop(pos))
+    index.refresh(pres, min(pos, target), max(pos, target) + 1)
+    return True
+
+
+# Slide order in SQLite is a REAL rank. Moving or inserting a slide gives it a
+# rank between its new neighbours, so the other rows are left alone; only when
+# floating point runs out of room between two ranks is the deck renumbered.
+RANK_GAP = 1.0
+RANK_EPSILON = 1e-9
+
+
+def rank_between(lo, hi):
+    """A rank strictly between lo and hi (None for an open end), or None if there's no room left."""
+    if lo is None and hi is None:
+        return 0.0
+    if lo is None:
+        return hi - RANK_GAP
+    if hi is None:
+        return lo + RANK_GAP
+    if hi - lo < 2 * RANK_EPSILON:
+        return None
+    return (lo + hi) / 2
+
+
+def _increasing_run(pairs):
+    """Ids of a longest subsequence of (id, rank) pairs whose ranks strictly increase."""
+    tails, tail_pos, prev = [], [], [None] * len(pairs)
+    for i, (_, rank) in enumerate(pairs):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < rank:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(tails):
+            tails.append(rank)
+            tail_pos.append(i)
+        else:
+            tails[lo] = rank
+            tail_pos[lo] = i
+        prev[i] = tail_pos[lo - 1] if lo else None
+    keep = set()
+    i = tail_pos[-1] if tail_pos else None
+    while i is not None:
+        keep.add(pairs[i][0])
+        i = prev[i]
+    return keep
+
+
+def assign_ranks(order, ranks):
+    """
+    Ranks for slide ids in their new `order`, given current `ranks` (new slides have none).
+    The longest run of slides already in rank order keeps its ranks; every other slide
+    gets one between its neighbours. Returns {id: rank} for the slides that change.
+    """
+    keep = _increasing_run([(sid, ranks[sid]) for sid in order if sid in ranks])
+    changed = {}
+    prev = None
+    i = 0
+    while i < len(order):
+        if order[i] in keep:
+            prev = ranks[order[i]]
+            i += 1
+            continue
+        j = i
+        while j < len(order) and order[j] not in keep:
+            j += 1
+        hi = ranks[order[j]] if j < len(order) else None
+        run = order[i:j]
+        if prev is not None and hi is not None and (hi - prev) / (len(run) + 1) < RANK_EPSILON:
+            # Out of room between two neighbours: renumber the whole deck
+            return {sid: float(pos) * RANK_GAP for pos, sid in enumerate(order)}
+        for step, sid in enumerate(run, 1):
+            if prev is None and hi is None:
+                changed[sid] = float(step) * RANK_GAP
+            elif prev is None:
+                changed[sid] = hi - (len(run) + 1 - step) * RANK_GAP
+            elif hi is None:
+                changed[sid] = prev + step * RANK_GAP
+            else:
+                changed[sid] = prev + (hi - prev) * step / (len(run) + 1)
+        prev = changed[run[-1]]
+        i = j
+    return changed
+
+
+# ============== JSON FILE BACKEND ==============
+
+class JSONStore(Store):
+    """Original single-file backend: every write rewrites data.json.
+
+    Writes hold an exclusive flock on `<path>.lock` for the whole
+    read-modify-write, which also serialises other worker processes, and
+    replace the file atomically (fsynced temp file + rename), so a crash never
+    leaves it truncated. Reads take no lock: they are served from the last
+    parsed copy for as long as the file's inode, size and mtime are unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = f'{path}.lock'
+        self._lock = threading.RLock()
+        self._cache_lock = threading.Lock()
+        self._cache_key = None
+        self._cache = None
+
+    @staticmethod
+    def _file_key(st):
+        return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return self._file_key(os.fstat(f.fileno())), json.load(f)
+        except Exception:
+            return None, {'users': {}, 'presentations': {}}
+
+    def _snapshot(self):
+        """Current contents, shared between readers: copy anything handed out of the store."""
+        try:
+            key = self._file_key(os.stat(self.path))
+        except OSError:
+            key = None
+        with self._cache_lock:
+            if key is not None and key == self._cache_key:
+                return self._cache
+        key, data = self._load()
+        with self._cache_lock:
+            self._cache_key, self._cache = key, data
+        return data
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive across threads and, where flock exists, across processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            # Opened per acquisition: a descriptor inherited over fork would share the lock
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self):
+        """A private, freshly parsed copy for read-modify-write. Caller holds _locked()."""
+        return self._load()[1]
+
+    def _write(self, d):
+        """Atomically replace the file with d and keep d as the parsed copy. Caller holds _locked()."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(self.path)}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(d, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+                key = self._file_key(os.fstat(f.fileno()))
+            try:
+                os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+            except OSError:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        _fsync_directory(directory)
+        with self._cache_lock:
+            self._cache_key, self._cache = key, d
+
+    def get_user(self, username):
+        return copy.deepcopy(self._snapshot()['users'].get(username))
+
+    def create_user(self, username, record):
+        with self._locked():
+            data = self._read()
+            if username in data['users']:
+                return False
+            data['users'][username] = record
+            self._write(data)
+            return True
+
+    def list_presentations(self, owner):
+        pres = self._snapshot().get('presentations', {})
+        return [copy.deepcopy(v) for v in pres.values() if v['owner'] == owner]
+
+    def get_presentation(self, pres_id, with_slides=True):
+        return copy.deepcopy(self._snapshot().get('presentations', {}).get(pres_id))
+
+    def create_presentation(self, pres):
+        with self._locked():
+            data = self._read()
+            data['presentations'][pres['id']] = copy.deepcopy(pres)
+            self._write(data)
+
+    def update_presentation(self, pres_id, fields, expected_version=None):
+        with self._locked():
+            data = self._read()
+            pres = data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            _check_version(pres, expected_version)
+            pres.update(fields)
+            bump_version(pres)
+            self._write(data)
+            return copy.deepcopy(pres)
+
+    def delete_presentation(self, pres_id, expected_version=None):
+        with self._locked():
+            data = self._read()
+            pres = data['presentations'].get(pres_id)
+            if not pres:
+                return False
+            _check_version(pres, expected_version)
+            del data['presentations'][pres_id]
+            self._write(data)
+            return True
+
+    def get_slide(self, pres_id, slide_id):
+        pres = self._snapshot().get('presentations', {}).get(pres_id)
+        if not pres:
+            return None
+        return copy.deepcopy(next((s for s in pres['slides'] if s['id'] == slide_id), None))
+
+    def _mutate_slides(self, pres_id, updated_at, fn, expected_version=None):
+        with self._locked():
+            data = self._read()
+            pres = data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            _check_version(pres, expected_version)
+            pres['slides'] = fn(pres['slides'])
+            pres['updated_at'] = updated_at
+            bump_version(pres)
+            self._write(data)
+            return copy.deepcopy(pres)
+
+    def create_slide(self, pres_id, slide, updated_at, expected_version=None):
+        return self._mutate_slides(
+            pres_id, updated_at, lambda slides: slides + [copy.deepcopy(slide)], expected_version)
+
+    def update_slide(self, pres_id, slide, updated_at, expected_version=None):
+        slide = copy.deepcopy(slide)
+        return self._mutate_slides(
+            pres_id, updated_at,
+            lambda slides: [slide if s['id'] == slide['id'] else s for s in slides], expected_version)
+
+    def delete_slide(self, pres_id, slide_id, updated_at, expected_version=None):
+        return self._mutate_slides(
+            pres_id, updated_at,
+            lambda slides: [s for s in slides if s['id'] != slide_id], expected_version)
+
+    def reorder_slides(self, pres_id, slide_ids, updated_at, expected_version=None):
+        return self._mutate_slides(
+            pres_id, updated_at, lambda slides: _ordered_slides(slides, slide_ids), expected_version)
+
+    def move_slide(self, pres_id, slide_id, after_id, updated_at, expected_version=None):
+        with self._locked():
+            data = self._read()
+            pres = data['presentations'].get(pres_id)
+            if not pres:
+                return False
+            _check_version(pres, expected_version)
+            if not move_slide_in_list(pres, slide_id, after_id, SlideIndex()):
+                return False
+            pres['updated_at'] = updated_at
+            bump_version(pres)
+            self._write(data)
+            return True
+
+    def apply_batch(self, pres_id, ops, updated_at, expected_version=None):
+        with self._locked():
+            data = self._read()
+            pres = data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            _check_version(pres, expected_version)
+            before = copy.deepcopy(pres)
+            apply_batch_ops(pres, ops, updated_at)
+            self._write(data)
+            return before, copy.deepcopy(pres)
+
+    def save_job(self, job):
+        with self._locked():
+            data = self._read()
+            data.setdefault('jobs', {})[job['id']] = copy.deepcopy(job)
+            self._write(data)
+
+    def get_job(self, job_id):
+        return copy.deepcopy(self._snapshot().get('jobs', {}).get(job_id))
+
+    def update_job(self, job_id, fields, statuses=None, worker=None, expired_before=None):
+        with self._locked():
+            data = self._read()
+            job = data.get('jobs', {}).get(job_id)
+            if not job or not job_matches(job, statuses, worker, expired_before):
+                return None
+            job.update(copy.deepcopy(fields))
+            self._write(data)
+            return copy.deepcopy(job)
+
+    def list_jobs(self, owner=None, statuses=None, limit=None):
+        return copy.deepcopy(filter_jobs(self._snapshot().get('jobs', {}).values(), owner, statuses, limit))
+
+    def upload_refs(self):
+        return list(slide_upload_refs(
+            s for p in self._snapshot()['presentations'].values() for s in p.get('slides', [])))
+
+    def export_data(self):
+        return copy.deepcopy(self._snapshot())
+
+    def import_data(self, data):
+        with self._locked():
+            self._write(copy.deepcopy(data))
+
+
+def _fsync_directory(directory):
+    """Make a rename in directory durable. Not possible (or needed) on every platform."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# ============== SQLITE BACKEND ==============
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS presentations (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_presentations_owner ON presentations(owner);
+CREATE INDEX IF NOT EXISTS idx_presentations_owner_updated ON presentations(owner, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_presentations_owner_created ON presentations(owner, created_at, id);
+CREATE TABLE IF NOT EXISTS slides (
+    id TEXT PRIMARY KEY,
+    presentation_id TEXT NOT NULL REFERENCES presentations(id) ON DELETE CASCADE,
+    position REAL NOT NULL,
+    title TEXT,
+    content TEXT,
+    image TEXT,
+    style TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_slides_presentation ON slides(presentation_id, position);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_owner ON jobs(owner, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+"""
+
+
+class SQLiteStore(Store):
+    """Embedded SQLite backend with per-row updates and an index on owner."""
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+        columns = [r['name'] for r in self._conn().execute('PRAGMA table_info(presentations)')]
+        if 'version' not in columns:
+            self._conn().execute('ALTER TABLE presentations ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        if legacy_json:
+            self.migrate_from_json(legacy_json)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def _tx(self):
+        return _Transaction(self._conn())
+
+    # ---- migration ----
+    def migrate_from_json(self, json_path):
+        """One-shot import of a legacy data.json; skipped once it has run."""
+        conn = self._conn()
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_json'").fetchone()
+        if done or not os.path.exists(json_path):
+            return False
+        try:
+            with open(json_path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f'Could not read {json_path} for migration: {e}')
+            return False
+        with self._tx() as conn:
+            self._insert_all(conn, data)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (json_path,))
+        print(f'Migrated {len(data.get("users", {}))} users and '
+              f'{len(data.get("presentations", {}))} presentations from {json_path}')
+        return True
+
+    def _insert_all(self, conn, data):
+        for username, user in data.get('users', {}).items():
+            conn.execute(
+                'INSERT OR REPLACE INTO users (username, password, created_at) VALUES (?, ?, ?)',
+                (username, user.get('password'), user.get('created_at')))
+        for pres in data.get('presentations', {}).values():
+            self._insert_presentation(conn, pres, replace=True)
+
+    def _insert_presentation(self, conn, pres, replace=False):
+        conn.execute(
+            'INSERT OR REPLACE INTO presentations (id, owner, title, created_at, updated_at, version) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (pres['id'], pres['owner'], pres.get('title', 'Untitled'),
+             pres.get('created_at') or '', pres.get('updated_at') or '', deck_version(pres)))
+        for pos, slide in enumerate(pres.get('slides', [])):
+            self._insert_slide(conn, pres['id'], slide, pos, replace)
+
+    def _insert_slide(self, conn, pres_id, slide, position, replace=False):
+        # Slide ids are a table-wide key: a plain INSERT fails on an id another deck
+        # already uses instead of moving that row into this one.
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        conn.execute(
+            f'{verb} INTO slides (id, presentation_id, position, title, content, image, style) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (slide['id'], pres_id, position, slide.get('title'), slide.get('content'),
+             slide.get('image'), json.dumps(slide.get('style') or {})))
+
+    # ---- row mapping ----
+    @staticmethod
+    def _slide_from_row(row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'content': row['content'],
+            'image': row['image'],
+            'style': json.loads(row['style']) if row['style'] else {},
+        }
+
+    def _load_slides(self, conn, pres_id):
+        rows = conn.execute(
+            'SELECT * FROM slides WHERE presentation_id = ? ORDER BY position', (pres_id,)).fetchall()
+        return [self._slide_from_row(r) for r in rows]
+
+    @staticmethod
+    def _slide_ranks(conn, pres_id):
+        rows = conn.execute(
+            'SELECT id, position FROM slides WHERE presentation_id = ? ORDER BY position', (pres_id,)).fetchall()
+        return {r['id']: r['position'] for r in rows}
+
+    @staticmethod
+    def _set_ranks(conn, ranks):
+        conn.executemany('UPDATE slides SET position = ? WHERE id = ?', [(rank, sid) for sid, rank in ranks.items()])
+
+    def _pres_from_row(self, conn, row, with_slides=True):
+        pres = {
+            'id': row['id'],
+            'owner': row['owner'],
+            'title': row['title'],
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'version': row['version'],
+        }
+        if with_slides:
+            pres['slides'] = self._load_slides(conn, row['id'])
+        return pres
+
+    @staticmethod
+    def _check_row_version(conn, pres_id, expected_version):
+        """VersionConflict unless the deck is at expected_version. Call inside the write transaction."""
+        if expected_version is None:
+            return
+        row = conn.execute('SELECT version FROM presentations WHERE id = ?', (pres_id,)).fetchone()
+        if row and row['version'] != expected_version:
+            raise VersionConflict(row['version'])
+
+    def _touch(self, conn, pres_id, updated_at):
+        return conn.execute(
+            'UPDATE presentations SET updated_at = ?, version = version + 1 WHERE id = ?',
+            (updated_at, pres_id)).rowcount
+
+    # ---- users ----
+    def get_user(self, username):
+        row = self._conn().execute(
+            'SELECT password, created_at FROM users WHERE username = ?', (username,)).fetchone()
+        return dict(row) if row else None
+
+    def create_user(self, username, record):
+        try:
+            with self._tx() as conn:
+                conn.execute(
+                    'INSERT INTO users (username, password, created_at) VALUES (?, ?, ?)',
+                    (username, record['password'], record.get('created_at')))
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    # ---- presentations ----
+    def list_presentations(self, owner):
+        conn = self._conn()
+        rows = conn.execute(
+            'SELECT * FROM presentations WHERE owner = ? ORDER BY created_at', (owner,)).fetchall()
+        return [self._pres_from_row(conn, r) for r in rows]
+
+    def page_presentations(self, owner, limit=None, after=None, sort='updated_at',
+                           descending=True, full=False):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f'Cannot sort by {sort}')
+        direction = 'DESC' if descending else 'ASC'
+        sql = 'SELECT * FROM presentations WHERE owner = ?'
+        params = [owner]
+        if after is not None:
+            sql += f' AND ({sort}, id) {"<" if descending else ">"} (?, ?)'
+            params += list(after)
+        sql += f' ORDER BY {sort} {direction}, id {direction}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit + 1)
+
+        conn = self._conn()
+        rows = conn.execute(sql, params).fetchall()
+        more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if more else rows
+        if full:
+            items = [self._pres_from_row(conn, r) for r in rows]
+        else:
+            items = [self._summary_from_row(conn, r) for r in rows]
+        next_key = sort_key(items[-1], sort) if more else None
+        return items, next_key
+
+    def _summary_from_row(self, conn, row):
+        count = conn.execute(
+            'SELECT COUNT(*) FROM slides WHERE presentation_id = ?', (row['id'],)).fetchone()[0]
+        first = conn.execute(
+            'SELECT * FROM slides WHERE presentation_id = ? ORDER BY position LIMIT 1',
+            (row['id'],)).fetchone()
+        pres = self._pres_from_row(conn, row, with_slides=False)
+        return summary_from_parts(pres, count, self._slide_from_row(first) if first else None)
+
+    def get_presentation(self, pres_id, with_slides=True):
+        conn = self._conn()
+        row = conn.execute('SELECT * FROM presentations WHERE id = ?', (pres_id,)).fetchone()
+        return self._pres_from_row(conn, row, with_slides) if row else None
+
+    def create_presentation(self, pres):
+        with self._tx() as conn:
+            self._insert_presentation(conn, pres)
+
+    def update_presentation(self, pres_id, fields, expected_version=None):
+        cols = [c for c in ('title', 'updated_at') if c in fields]
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+            if cols:
+                conn.execute(
+                    f'UPDATE presentations SET {", ".join(c + " = ?" for c in cols)}, version = version + 1 '
+                    'WHERE id = ?',
+                    [fields[c] for c in cols] + [pres_id])
+        return self.get_presentation(pres_id)
+
+    def delete_presentation(self, pres_id, expected_version=None):
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+            return conn.execute('DELETE FROM presentations WHERE id = ?', (pres_id,)).rowcount > 0
+
+    # ---- slides ----
+    def get_slide(self, pres_id, slide_id):
+        row = self._conn().execute(
+            'SELECT * FROM slides WHERE id = ? AND presentation_id = ?', (slide_id, pres_id)).fetchone()
+        return self._slide_from_row(row) if row else None
+
+    def create_slide(self, pres_id, slide, updated_at, expected_version=None):
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+            last = conn.execute(
+                'SELECT MAX(position) FROM slides WHERE presentation_id = ?', (pres_id,)).fetchone()[0]
+            self._insert_slide(conn, pres_id, slide, 0 if last is None else last + 1)
+            self._touch(conn, pres_id, updated_at)
+        return slide
+
+    def update_slide(self, pres_id, slide, updated_at, expected_version=None):
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+            conn.execute(
+                'UPDATE slides SET title = ?, content = ?, image = ?, style = ? '
+                'WHERE id = ? AND presentation_id = ?',
+                (slide.get('title'), slide.get('content'), slide.get('image'),
+                 json.dumps(slide.get('style') or {}), slide['id'], pres_id))
+            self._touch(conn, pres_id, updated_at)
+        return slide
+
+    def delete_slide(self, pres_id, slide_id, updated_at, expected_version=None):
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+            conn.execute(
+                'DELETE FROM slides WHERE id = ? AND presentation_id = ?', (slide_id, pres_id))
+            self._touch(conn, pres_id, updated_at)
+
+    def reorder_slides(self, pres_id, slide_ids, updated_at, expected_version=None):
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+            ranks = self._slide_ranks(conn, pres_id)
+            order = _ordered_slides([{'id': sid} for sid in ranks], slide_ids)
+            self._set_ranks(conn, assign_ranks([s['id'] for s in order], ranks))
+            self._touch(conn, pres_id, updated_at)
+        return self.get_presentation(pres_id)
+
+    def move_slide(self, pres_id, slide_id, after_id, updated_at, expected_version=None):
+        if after_id == slide_id:
+            return False
+        with self._tx() as conn:
+            self._check_row_version(conn, pres_id, expected_version)
+
+            def rank_of(sid):
+                row = conn.execute(
+                    'SELECT position FROM slides WHERE id = ? AND presentation_id = ?', (sid, pres_id)).fetchone()
+                return row['position'] if row else None
+
+            if rank_of(slide_id) is None:
+                return False
+            lo = None if after_id is None else rank_of(after_id)
+            if after_id is not None and lo is None:
+                return False
+            if lo is None:
+                row = conn.execute(
+                    'SELECT MIN(position) FROM slides WHERE presentation_id = ? AND id != ?',
+                    (pres_id, slide_id)).fetchone()
+            else:
+                row = conn.execute(
+                    'SELECT MIN(position) FROM slides WHERE presentation_id = ? AND id != ? AND position > ?',
+                    (pres_id, slide_id, lo)).fetchone()
+            rank = rank_between(lo, row[0])
+            if rank is not None:
+                self._set_ranks(conn, {slide_id: rank})
+            else:
+                order = [sid for sid in self._slide_ranks(conn, pres_id) if sid != slide_id]
+                order.insert(0 if after_id is None else order.index(after_id) + 1, slide_id)
+                self._set_ranks(conn, {sid: float(pos) * RANK_GAP for pos, sid in enumerate(order)})
+            self._touch(conn, pres_id, updated_at)
+        return True
+
+    def apply_batch(self, pres_id, ops, updated_at, expected_version=None):
+        with self._tx() as conn:
+            row = conn.execute('SELECT * FROM presentations WHERE id = ?', (pres_id,)).fetchone()
+            if not row:
+                return None
+            before = self._pres_from_row(conn, row)
+            _check_version(before, expected_version)
+            ranks = self._slide_ranks(conn, pres_id)
+            pres = apply_batch_ops(copy.deepcopy(before), ops, updated_at)
+            conn.execute(
+                'UPDATE presentations SET title = ?, updated_at = ?, version = ? WHERE id = ?',
+                (pres['title'], updated_at, pres['version'], pres_id))
+            kept = {s['id'] for s in pres['slides']}
+            conn.executemany(
+                'DELETE FROM slides WHERE id = ? AND presentation_id = ?',
+                [(s['id'], pres_id) for s in before['slides'] if s['id'] not in kept])
+            # Only rows whose content or rank changed are written
+            old = {s['id']: s for s in before['slides']}
+            moved = assign_ranks([s['id'] for s in pres['slides']], ranks)
+            for slide in pres['slides']:
+                sid = slide['id']
+                if old.get(sid) != slide:
+                    self._insert_slide(conn, pres_id, slide, moved.get(sid, ranks.get(sid)), replace=sid in old)
+                elif sid in moved:
+                    self._set_ranks(conn, {sid: moved[sid]})
+        return before, pres
+
+    # ---- jobs ----
+    def save_job(self, job):
+        with self._tx() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO jobs (id, owner, status, created_at, data) VALUES (?, ?, ?, ?, ?)',
+                (job['id'], job['owner'], job['status'], job['created_at'], json.dumps(job)))
+
+    def get_job(self, job_id):
+        row = self._conn().execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def update_job(self, job_id, fields, statuses=None, worker=None, expired_before=None):
+        # BEGIN IMMEDIATE takes the write lock first, so the check and the write are one step
+        with self._tx() as conn:
+            row = conn.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if not row:
+                return None
+            job = json.loads(row['data'])
+            if not job_matches(job, statuses, worker, expired_before):
+                return None
+            job.update(fields)
+            conn.execute('UPDATE jobs SET status = ?, data = ? WHERE id = ?',
+                         (job['status'], json.dumps(job), job_id))
+            return job
+
+    def list_jobs(self, owner=None, statuses=None, limit=None):
+        sql, params, where = 'SELECT data FROM jobs', [], []
+        if owner is not None:
+            where.append('owner = ?')
+            params.append(owner)
+        if statuses:
+            where.append(f'status IN ({", ".join("?" for _ in statuses)})')
+            params += list(statuses)
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY created_at DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [json.loads(r['data']) for r in self._conn().execute(sql, params)]
+
+    # ---- image references ----
+    def upload_refs(self):
+        rows = self._conn().execute(
+            "SELECT image, json_extract(style, '$.backgroundImage') FROM slides "
+            "WHERE image LIKE '/uploads/%' OR style LIKE '%/uploads/%'")
+        return [url for row in rows for url in row if isinstance(url, str) and url.startswith(UPLOADS_PREFIX)]
+
+    # ---- whole dataset ----
+    def export_data(self):
+        conn = self._conn()
+        users = {
+            r['username']: {'password': r['password'], 'created_at': r['created_at']}
+            for r in conn.execute('SELECT * FROM users')
+        }
+        presentations = {
+            r['id']: self._pres_from_row(conn, r)
+            for r in conn.execute('SELECT * FROM presentations').fetchall()
+        }
+        return {'users': users, 'presentations': presentations}
+
+    def import_data(self, data):
+        with self._tx() as conn:
+            conn.execute('DELETE FROM slides')
+            conn.execute('DELETE FROM presentations')
+            conn.execute('DELETE FROM users')
+            self._insert_all(conn, data)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK around a block on an autocommit connection."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
+
+
+# ============== JOURNALED BACKEND ==============
+
+def apply_op(data, op, index=None):
+    """Apply one journal record to an in-memory {'users', 'presentations'} document.
+    `index` is an optional SlideIndex kept across calls for constant-time slide lookups."""
+    kind = op['op']
+    presentations = data['presentations']
+    if kind == 'create_user':
+        data['users'][op['username']] = op['record']
+        return
+    if kind == 'create_presentation':
+        presentations[op['presentation']['id']] = op['presentation']
+        return
+    if kind == 'save_job':
+        data.setdefault('jobs', {})[op['job']['id']] = op['job']
+        return
+    if kind == 'delete_presentation':
+        presentations.pop(op['pres_id'], None)
+        return
+
+    pres = presentations.get(op['pres_id'])
+    if not pres:
+        return
+    index = index or SlideIndex()
+    if kind == 'update_presentation':
+        pres.update(op['fields'])
+        bump_version(pres)
+        return
+    if kind == 'create_slide':
+        pres['slides'].append(op['slide'])
+    elif kind == 'update_slide':
+        pos = index.find(pres, op['slide']['id'])
+        if pos is not None:
+            pres['slides'][pos] = op['slide']
+    elif kind == 'delete_slide':
+        pos = index.find(pres, op['slide_id'])
+        if pos is not None:
+            pres['slides'].pop(pos)
+    elif kind == 'move_slide':
+        move_slide_in_list(pres, op['slide_id'], op['after'], index)
+    elif kind == 'reorder_slides':
+        pres['slides'] = _ordered_slides(pres['slides'], op['slide_ids'])
+    elif kind == 'apply_batch':
+        apply_batch_ops(pres, op['ops'], op['updated_at'])
+        return
+    else:
+        raise ValueError(f'Unknown journal op: {kind}')
+    pres['updated_at'] = op['updated_at']
+    bump_version(pres)
+
+
+class JournalStore(Store):
+    """In-memory state backed by an append-only op log plus periodic snapshots.
+
+    Each mutation appends one small JSON line to `journal.log` and applies it
+    in memory, so write cost is proportional to the edit. A background thread
+    folds the log into `snapshot.json` after `compact_ops` records or
+    `compact_seconds`; startup loads the snapshot and replays the log tail.
+
+    The journal lives in this process's memory, so it has exactly one writer:
+    opening takes an exclusive flock on `journal.lock` and fails if another
+    process (or another store in this one) already holds the directory.
+    """
+
+    def __init__(self, directory, legacy_json=None, compact_ops=500, compact_seconds=60, fsync=True):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, 'snapshot.json')
+        self.log_path = os.path.join(directory, 'journal.log')
+        self.compact_ops = compact_ops
+        self.compact_seconds = compact_seconds
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._pending = 0
+        self._last_compact = time.monotonic()
+        self._wake = threading.Event()
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._dir_lock = self._lock_directory()
+        self._data = self._recover(legacy_json)
+        self._slides = SlideIndex()
+        self._reindex()
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+
+        self._compactor = threading.Thread(target=self._compact_loop, name='journal-compactor', daemon=True)
+        self._compactor.start()
+
+    def _lock_directory(self):
+        lock_file = open(os.path.join(self.directory, 'journal.lock'), 'a')
+        if fcntl is None:
+            return lock_file
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f'Journal directory {self.directory} is in use by another process. The journal backend '
+                'supports a single worker process; run one worker or use DATA_BACKEND=sqlite.')
+        return lock_file
+
+    # ---- recovery ----
+    def _recover(self, legacy_json):
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            data = snapshot['data']
+            snapshot_seq = snapshot.get('seq', 0)
+        elif legacy_json and os.path.exists(legacy_json):
+            with open(legacy_json, 'r') as f:
+                data = json.load(f)
+            print(f'Journal initialised from {legacy_json}')
+        else:
+            data = {'users': {}, 'presentations': {}}
+        data.setdefault('users', {})
+        data.setdefault('presentations', {})
+        self._seq = snapshot_seq
+
+        if not os.path.exists(self.log_path):
+            return data
+        replayed = 0
+        good_offset = 0
+        with open(self.log_path, 'rb') as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash: drop it and everything after.
+                    print(f'Journal: discarding partial record at offset {good_offset}')
+                    break
+                good_offset += len(line)
+                if op['seq'] <= snapshot_seq:
+                    continue
+                apply_op(data, op)
+                self._seq = op['seq']
+                replayed += 1
+        with open(self.log_path, 'rb+') as f:
+            f.truncate(good_offset)
+        self._pending = replayed
+        if replayed:
+            print(f'Journal: replayed {replayed} ops after snapshot seq {snapshot_seq}')
+        return data
+
+    # ---- owner index ----
+    def _reindex(self):
+        self._by_owner = {}
+        for pres in self._data['presentations'].values():
+            self._by_owner.setdefault(pres['owner'], set()).add(pres['id'])
+
+    def _index_op(self, op):
+        if op['op'] == 'create_presentation':
+            pres = op['presentation']
+            self._by_owner.setdefault(pres['owner'], set()).add(pres['id'])
+        elif op['op'] == 'delete_presentation':
+            pres = self._data['presentations'].get(op['pres_id'])
+            if pres:
+                self._by_owner.get(pres['owner'], set()).discard(pres['id'])
+            self._slides.drop(op['pres_id'])
+
+    # ---- logging ----
+    def _record(self, op):
+        """Append op to the log, then apply it in memory. Caller holds the lock."""
+        self._seq += 1
+        op['seq'] = self._seq
+        self._log.write(json.dumps(op, separators=(',', ':')) + '\n')
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._index_op(op)
+        apply_op(self._data, op, self._slides)
+        self._pending += 1
+        if self._pending >= self.compact_ops:
+            self._wake.set()
+
+    # ---- compaction ----
+    def _compact_loop(self):
+        while not self._closed:
+            self._wake.wait(timeout=self.compact_seconds)
+            self._wake.clear()
+            if self._closed:
+                break
+            try:
+                due = time.monotonic() - self._last_compact >= self.compact_seconds
+                if self._pending >= self.compact_ops or (due and self._pending):
+                    self.compact()
+            except Exception as e:
+                print(f'Journal compaction failed: {e}')
+
+    def compact(self):
+        """Write a snapshot of the current state and truncate the log."""
+        with self._lock:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'seq': self._seq, 'data': self._data}, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            # Records up to self._seq are now in the snapshot; replay skips them
+            # even if we crash before the truncate below.
+            self._log.truncate(0)
+            self._log.seek(0)
+            self._pending = 0
+            self._last_compact = time.monotonic()
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._compactor.join(timeout=5)
+        with self._lock:
+            if self._pending:
+                self.compact()
+            self._log.close()
+            self._dir_lock.close()  # releases the flock
+
+    # ---- users ----
+    def get_user(self, username):
+        user = self._data['users'].get(username)
+        return dict(user) if user else None
+
+    def create_user(self, username, record):
+        with self._lock:
+            if username in self._data['users']:
+                return False
+            self._record({'op': 'create_user', 'username': username, 'record': record})
+            return True
+
+    # ---- presentations ----
+    def _owned(self, owner):
+        presentations = self._data['presentations']
+        return [presentations[pid] for pid in self._by_owner.get(owner, ())]
+
+    def list_presentations(self, owner):
+        with self._lock:
+            return [copy.deepcopy(p) for p in self._owned(owner)]
+
+    def page_presentations(self, owner, limit=None, after=None, sort='updated_at',
+                           descending=True, full=False):
+        with self._lock:
+            owned = self._owned(owner)
+            if not full:
+                return paginate([presentation_summary(p) for p in owned], limit, after, sort, descending)
+            page, next_key = paginate(owned, limit, after, sort, descending)
+            return [copy.deepcopy(p) for p in page], next_key
+
+    def get_presentation(self, pres_id, with_slides=True):
+        with self._lock:
+            pres = self._data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            if with_slides:
+                return copy.deepcopy(pres)
+            return {k: v for k, v in pres.items() if k != 'slides'}
+
+    def create_presentation(self, pres):
+        with self._lock:
+            self._record({'op': 'create_presentation', 'presentation': copy.deepcopy(pres)})
+
+    def update_presentation(self, pres_id, fields, expected_version=None):
+        with self._lock:
+            pres = self._data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            _check_version(pres, expected_version)
+            self._record({'op': 'update_presentation', 'pres_id': pres_id, 'fields': dict(fields)})
+            return self.get_presentation(pres_id)
+
+    def delete_presentation(self, pres_id, expected_version=None):
+        with self._lock:
+            pres = self._data['presentations'].get(pres_id)
+            if not pres:
+                return False
+            _check_version(pres, expected_version)
+            self._record({'op': 'delete_presentation', 'pres_id': pres_id})
+            return True
+
+    # ---- slides ----
+    def get_slide(self, pres_id, slide_id):
+        with self._lock:
+            pres = self._data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            pos = self._slides.find(pres, slide_id)
+            return copy.deepcopy(pres['slides'][pos]) if pos is not None else None
+
+    def _slide_op(self, op, expected_version=None):
+        with self._lock:
+            pres = self._data['presentations'].get(op['pres_id'])
+            if not pres:
+                return None
+            _check_version(pres, expected_version)
+            self._record(op)
+            return True
+
+    def create_slide(self, pres_id, slide, updated_at, expected_version=None):
+        self._slide_op({'op': 'create_slide', 'pres_id': pres_id,
+                        'slide': copy.deepcopy(slide), 'updated_at': updated_at}, expected_version)
+        return slide
+
+    def update_slide(self, pres_id, slide, updated_at, expected_version=None):
+        self._slide_op({'op': 'update_slide', 'pres_id': pres_id,
+                        'slide': copy.deepcopy(slide), 'updated_at': updated_at}, expected_version)
+        return slide
+
+    def delete_slide(self, pres_id, slide_id, updated_at, expected_version=None):
+        self._slide_op({'op': 'delete_slide', 'pres_id': pres_id,
+                        'slide_id': slide_id, 'updated_at': updated_at}, expected_version)
+
+    def reorder_slides(self, pres_id, slide_ids, updated_at, expected_version=None):
+        self._slide_op({'op': 'reorder_slides', 'pres_id': pres_id,
+                        'slide_ids': list(slide_ids), 'updated_at': updated_at}, expected_version)
+        return self.get_presentation(pres_id)
+
+    def move_slide(self, pres_id, slide_id, after_id, updated_at, expected_version=None):
+        with self._lock:
+            pres = self._data['presentations'].get(pres_id)
+            if not pres:
+                return False
+            _check_version(pres, expected_version)
+            if after_id == slide_id or self._slides.find(pres, slide_id) is None:
+                return False
+            if after_id is not None and self._slides.find(pres, after_id) is None:
+                return False
+            self._record({'op': 'move_slide', 'pres_id': pres_id, 'slide_id': slide_id,
+                          'after': after_id, 'updated_at': updated_at})
+            return True
+
+    def apply_batch(self, pres_id, ops, updated_at, expected_version=None):
+        with self._lock:
+            pres = self._data['presentations'].get(pres_id)
+            if not pres:
+                return None
+            _check_version(pres, expected_version)
+            before = copy.deepcopy(pres)
+            # Dry run on a copy so a failing op never reaches the log
+            apply_batch_ops(copy.deepcopy(pres), ops, updated_at)
+            self._record({'op': 'apply_batch', 'pres_id': pres_id,
+                          'ops': copy.deepcopy(ops), 'updated_at': updated_at})
+            return before, self.get_presentation(pres_id)
+
+    # ---- jobs ----
+    def save_job(self, job):
+        with self._lock:
+            self._record({'op': 'save_job', 'job': copy.deepcopy(job)})
+
+    def get_job(self, job_id):
+        with self._lock:
+            job = self._data.get('jobs', {}).get(job_id)
+            return copy.deepcopy(job) if job else None
+
+    def update_job(self, job_id, fields, statuses=None, worker=None, expired_before=None):
+        with self._lock:
+            job = self._data.get('jobs', {}).get(job_id)
+            if not job or not job_matches(job, statuses, worker, expired_before):
+                return None
+            job = dict(copy.deepcopy(job), **copy.deepcopy(fields))
+            self._record({'op': 'save_job', 'job': job})
+            return copy.deepcopy(job)
+
+    def list_jobs(self, owner=None, statuses=None, limit=None):
+        with self._lock:
+            jobs = filter_jobs(self._data.get('jobs', {}).values(), owner, statuses, limit)
+            return copy.deepcopy(jobs)
+
+    def upload_refs(self):
+        with self._lock:
+            return list(slide_upload_refs(
+                s for p in self._data['presentations'].values() for s in p.get('slides', [])))
+
+    # ---- whole dataset ----
+    def export_data(self):
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def import_data(self, data):
+        with self._lock:
+            self._data = copy.deepcopy(data)
+            self._reindex()
+            self.compact()
+
+
+def create_store(backend, data_file, db_file=None, journal_dir=None, **journal_options):
+    """Build the configured store. 'sqlite' (default) and 'journal' import data_file on first run."""
+    backend = (backend or 'sqlite').lower()
+    if backend == 'json':
+        return JSONStore(data_file)
+    if backend == 'sqlite':
+        return SQLiteStore(db_file, legacy_json=data_file)
+    if backend == 'journal':
+        return JournalStore(journal_dir, legacy_json=data_file, **journal_options)
+    raise ValueError(f'Unknown DATA_BACKEND: {backend}')
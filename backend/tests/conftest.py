@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import create_store  # noqa: E402
+
+BACKENDS = ('sqlite', 'json', 'journal')
+NOW = '2024-01-02T00:00:00'
+
+
+def make_deck(pres_id, owner, slide_count=3, title='Deck'):
+    """A presentation dict in the shape the routes store."""
+    return {
+        'id': pres_id,
+        'owner': owner,
+        'title': title,
+        'created_at': '2024-01-01T00:00:00',
+        'updated_at': '2024-01-01T00:00:00',
+        'version': 1,
+        'slides': [
+            {'id': f'{pres_id}-s{i}', 'title': f'Slide {i}', 'content': f'Body {i}', 'image': None,
+             'style': {'backgroundColor': '#ffffff'}}
+            for i in range(slide_count)
+        ],
+    }
+
+
+def legacy_file(tmp_path):
+    """A data.json in the pre-datastore format, and the data written to it."""
+    data = {
+        'users': {'alice': {'password': 'x', 'created_at': NOW}},
+        'presentations': {'p': make_deck('p', 'alice')},
+    }
+    path = tmp_path / 'legacy.json'
+    path.write_text(json.dumps(data))
+    return path, data
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    """Factory for stores rooted in tmp_path; journal stores are closed afterwards."""
+    opened = []
+
+    def open_(backend, root=None, legacy_json=None):
+        root = root or tmp_path
+        data_file = legacy_json or str(root / 'data.json')
+        store = create_store(backend, data_file, str(root / 'data.db'),
+                             journal_dir=str(root / 'journal'), fsync=False)
+        opened.append(store)
+        return store
+
+    yield open_
+    for store in opened:
+        if hasattr(store, 'close'):
+            store.close()
+
+
+@pytest.fixture
+def store(backend, open_store):
+    return open_store(backend)
+
+
+def app_settings(backend, tmp_path, **overrides):
+    """create_app() settings that keep every file the app writes under tmp_path."""
+    return dict({
+        'DATA_BACKEND': backend,
+        'DATA_FILE': str(tmp_path / 'data.json'),
+        'DATABASE_FILE': str(tmp_path / 'data.db'),
+        'JOURNAL_DIR': str(tmp_path / 'journal'),
+        'JOURNAL_FSYNC': False,
+        'UPLOAD_DIR': str(tmp_path / 'uploads'),
+        'EXPORT_DIR': str(tmp_path / 'exports'),
+        'CACHE_DIR': str(tmp_path / 'cache'),
+        'BLOB_INDEX_FILE': str(tmp_path / 'blobs.db'),
+        'SECRET_KEY': 'test-secret-key-long-enough-for-hs256',
+        'TESTING': True,
+    }, **overrides)
+
+
+@pytest.fixture
+def app_module(backend, tmp_path, monkeypatch):
+    """app.py with create_app() pointed at tmp_path, no LLM keys and the given datastore."""
+    for key in ('ANTHROPIC_API_KEY', 'GOOGLE_API_KEY', 'GOOGLE_KEY', 'UNSPLASH_ACCESS_KEY', 'WEB_CONCURRENCY'):
+        monkeypatch.delenv(key, raising=False)
+    import app as backend_app
+    backend_app.flask_app = backend_app.create_app(app_settings(backend, tmp_path))
+    yield backend_app
+    backend_app.shutdown_services()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.flask_app.test_client()
+
+
+@pytest.fixture
+def auth(client):
+    client.post('/signup', json={'username': 'tester', 'password': 'secret1'})
+    token = client.post('/login', json={'username': 'tester', 'password': 'secret1'}).json['token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def deck(client, auth):
+    """A three-slide presentation created through the API."""
+    resp = client.post('/presentations', json={'title': 'Deck', 'slide_count': 3}, headers=auth)
+    assert resp.status_code == 201
+    return resp.json['presentation']
+
+
+class FakeResponse:
+    """What a provider session.post() returns: an Anthropic reply, or a stream of text deltas."""
+
+    def __init__(self, text='', status_code=200, chunks=None, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self._chunks = chunks
+
+    def json(self):
+        return {'content': [{'text': self.text}]}
+
+    def iter_lines(self, decode_unicode=False):
+        for chunk in self._chunks or ():
+            yield 'data: ' + json.dumps({'type': 'content_block_delta', 'delta': {'text': chunk}})
+        yield 'data: ' + json.dumps({'type': 'message_stop'})
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+@pytest.fixture
+def fake_llm(app_module, monkeypatch):
+    """Answer Anthropic calls locally: fake_llm(reply) where reply(prompt, stream) returns
+    the reply text, a list of streamed chunks, or a FakeResponse."""
+    monkeypatch.setenv('ANTHROPIC_API_KEY', 'test-key')
+
+    def install(reply):
+        def post(url, **kwargs):
+            body = kwargs['json']
+            result = reply(body['messages'][0]['content'], body.get('stream', False))
+            if isinstance(result, FakeResponse):
+                return result
+            if isinstance(result, list):
+                return FakeResponse(chunks=result)
+            return FakeResponse(result)
+        monkeypatch.setattr(app_module.llm_providers['anthropic'].session, 'post', post)
+    return install
+
+
+def slide_number(prompt):
+    """1-based slide number a per-slide generation prompt asks for."""
+    return int(prompt.split('Create slide ')[1].split(' ')[0])
+
+
+def png_bytes(width=64, height=48, color=(200, 30, 30)):
+    from io import BytesIO
+    from PIL import Image
+    buf = BytesIO()
+    Image.new('RGB', (width, height), color).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def upload_image(client, auth, data, filename='picture.png'):
+    from io import BytesIO
+    resp = client.post('/upload-image', data={'file': (BytesIO(data), filename)}, headers=auth,
+                       content_type='multipart/form-data')
+    assert resp.status_code == 201
+    return resp.json
+
+
+def pdf_bytes(page_count, words=20):
+    """A minimal PDF whose page i reads 'Page i w0 w1 ...'."""
+    objs = ['<< /Type /Catalog /Pages 2 0 R >>', None, '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for i in range(page_count):
+        text = f'Page {i} ' + ' '.join(f'w{j}' for j in range(words))
+        stream = f'BT /F1 8 Tf 20 700 Td ({text}) Tj ET'
+        objs.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objs.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                    f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>')
+        kids.append(f'{len(objs)} 0 R')
+    objs[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {page_count} >>'
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for i, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f'{i} 0 obj\n{obj}\nendobj\n'.encode()
+    xref = len(out)
+    out += f'xref\n0 {len(objs) + 1}\n0000000000 65535 f \n'.encode()
+    out += b''.join(f'{o:010d} 00000 n \n'.encode() for o in offsets)
+    out += f'trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF'.encode()
+    return out
+
+
+def upload_document(client, auth, data, filename='notes.pdf', **fields):
+    from io import BytesIO
+    return client.post('/upload-document', data=dict(fields, file=(BytesIO(data), filename)), headers=auth,
+                       content_type='multipart/form-data')
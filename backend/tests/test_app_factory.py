@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import app_settings
+from storage import JournalStore
+
+
+def test_rejects_constants_outside_settings(app_module):
+    with pytest.raises(ValueError):
+        app_module.create_app({'MAX_JOB_WAIT': 1})
+    # The running app is left alone
+    assert not app_module.job_queue._stopped.is_set()
+
+
+def test_settings_do_not_carry_over(app_module, backend, tmp_path):
+    app_module.create_app(app_settings('json', tmp_path, EXPORT_WORKERS=1, DATA_FILE=str(tmp_path / 'other.json')))
+    assert app_module.export_executor._max_workers == 1
+    assert app_module.BULK_EXPORT_WINDOW == 2
+
+    app = app_module.create_app(app_settings(backend, tmp_path))
+    assert app_module.DATA_BACKEND == backend
+    assert app_module.EXPORT_WORKERS == app_module.DEFAULT_SETTINGS['EXPORT_WORKERS']
+    assert app_module.export_executor._max_workers == app_module.EXPORT_WORKERS
+    assert app.extensions['slideforge']['store'] is app_module.store
+
+
+def test_previous_services_are_shut_down(app_module, tmp_path):
+    old = app_module.flask_app.extensions['slideforge']
+    old_gc = app_module.blob_gc_stop
+    app_module.create_app(app_settings('journal', tmp_path))
+    assert old['job_queue']._stopped.is_set()
+    assert old_gc.is_set()
+    for name in ('llm_executor', 'export_executor', 'image_executor'):
+        with pytest.raises(RuntimeError):
+            old[name].submit(print)
+    # The new app's journal store holds the directory lock now
+    with pytest.raises(RuntimeError):
+        JournalStore(str(tmp_path / 'journal'), fsync=False)
+    app_module.create_app(app_settings('sqlite', tmp_path))
+    JournalStore(str(tmp_path / 'journal'), fsync=False).close()
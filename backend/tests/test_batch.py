@@ -0,0 +1,146 @@
+import sqlite3
+
+import pytest
+
+from conftest import NOW, make_deck
+from storage import BatchError
+
+
+def deck_url(deck):
+    return f"/presentations/{deck['id']}"
+
+
+def get_deck(client, auth, deck):
+    return client.get(deck_url(deck), headers=auth).json['presentation']
+
+
+def blank(slide_id, title=''):
+    return {'id': slide_id, 'title': title, 'content': '', 'image': None, 'style': {}}
+
+
+@pytest.fixture
+def other(client):
+    """Another user's three-slide deck, and their auth header."""
+    client.post('/signup', json={'username': 'mallory', 'password': 'secret2'})
+    token = client.post('/login', json={'username': 'mallory', 'password': 'secret2'}).json['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    resp = client.post('/presentations', json={'title': 'Theirs', 'slide_count': 3}, headers=headers)
+    return resp.json['presentation'], headers
+
+
+# ---- store ----
+
+def test_batch_is_all_or_nothing(store):
+    store.create_presentation(make_deck('p', 'alice'))
+    before = store.get_presentation('p')
+    with pytest.raises(BatchError) as info:
+        store.apply_batch('p', [
+            {'op': 'set_title', 'title': 'Changed'},
+            {'op': 'delete_slide', 'slide_id': 'missing'},
+        ], NOW)
+    assert info.value.index == 1
+    assert store.get_presentation('p') == before
+
+    old, new = store.apply_batch('p', [
+        {'op': 'create_slide', 'slide': blank('n', 'N'), 'after': 'p-s0'},
+        {'op': 'move_slide', 'slide_id': 'p-s2', 'after': None},
+        {'op': 'patch_style', 'slide_id': 'n', 'style': {'fontColor': '#000000'}},
+    ], NOW)
+    assert old == before
+    assert [s['id'] for s in new['slides']] == ['p-s2', 'p-s0', 'n', 'p-s1']
+    assert store.get_presentation('p') == new
+    assert new['version'] == before['version'] + 1
+
+
+def test_batch_rejects_an_id_already_in_the_deck(store):
+    store.create_presentation(make_deck('p', 'alice'))
+    before = store.get_presentation('p')
+    with pytest.raises(BatchError) as info:
+        store.apply_batch('p', [{'op': 'create_slide', 'slide': blank('p-s1', 'Dup')}], NOW)
+    assert info.value.index == 0
+    assert store.get_presentation('p') == before
+
+
+@pytest.mark.parametrize('write', [
+    lambda store: store.create_slide('mine', blank('theirs-s0', 'Taken'), NOW),
+    lambda store: store.apply_batch('mine', [{'op': 'create_slide', 'slide': blank('theirs-s0', 'Taken')}], NOW),
+], ids=['create_slide', 'apply_batch'])
+def test_sqlite_never_moves_a_slide_between_decks(open_store, write):
+    store = open_store('sqlite')
+    store.create_presentation(make_deck('theirs', 'bob'))
+    store.create_presentation(make_deck('mine', 'alice'))
+    theirs, mine = store.get_presentation('theirs'), store.get_presentation('mine')
+    with pytest.raises(sqlite3.IntegrityError):
+        write(store)
+    assert store.get_presentation('theirs') == theirs
+    assert store.get_presentation('mine') == mine
+
+
+# ---- API ----
+
+def test_batch_applies_ops_in_order(client, auth, deck):
+    ids = [s['id'] for s in deck['slides']]
+    resp = client.post(f'{deck_url(deck)}/batch', json={'ops': [
+        {'op': 'set_title', 'title': ' New title '},
+        {'op': 'create_slide', 'slide': {'id': 'tmp', 'title': 'Inserted'}, 'after': ids[0]},
+        {'op': 'update_slide', 'slide_id': 'tmp', 'content': 'hello'},
+        {'op': 'move_slide', 'slide_id': ids[2], 'after': None},
+        {'op': 'delete_slide', 'slide_id': ids[1]},
+    ]}, headers=auth)
+    assert resp.status_code == 200
+    assert resp.json['applied'] == 5
+    pres = resp.json['presentation']
+    assert pres['title'] == 'New title'
+    assert [s['title'] for s in pres['slides']] == ['Slide 3', 'Slide 1', 'Inserted']
+    assert pres['slides'][2]['content'] == 'hello'
+    assert resp.json['created'] == {'tmp': pres['slides'][2]['id']}
+    assert pres['slides'][2]['id'] != 'tmp'
+    assert resp.headers['ETag'] == f'"v{pres["version"]}"'
+
+
+@pytest.mark.parametrize('ops, op_index', [
+    ([{'op': 'set_title', 'title': 'Nope'}, {'op': 'delete_slide', 'slide_id': 'missing'}], 1),
+    ([{'op': 'unknown'}], 0),
+    ([{'op': 'set_title', 'title': ''}], 0),
+    ([{'op': 'move_slide', 'slide_id': 'x'}], 0),
+    ([{'op': 'create_slide', 'slide': {'id': 'a'}}, {'op': 'create_slide', 'slide': {'id': 'a'}}], 1),
+    ([], 0),
+    ('not a list', 0),
+])
+def test_bad_batch_is_rejected_whole(client, auth, deck, ops, op_index):
+    before = get_deck(client, auth, deck)
+    resp = client.post(f'{deck_url(deck)}/batch', json={'ops': ops}, headers=auth)
+    assert resp.status_code == 400
+    assert resp.json['op_index'] == op_index
+    assert get_deck(client, auth, deck) == before
+
+
+def test_created_slides_get_server_ids(client, auth, deck, other):
+    theirs, their_auth = other
+    before = get_deck(client, their_auth, theirs)
+    taken = theirs['slides'][0]['id']
+
+    resp = client.post(f'{deck_url(deck)}/slides', json={'id': taken, 'title': 'Mine'}, headers=auth)
+    assert resp.status_code == 201
+    assert resp.json['slide']['id'] != taken
+
+    resp = client.post(f'{deck_url(deck)}/batch', json={'ops': [
+        {'op': 'create_slide', 'slide': {'id': taken, 'title': 'Also mine'}},
+        {'op': 'update_slide', 'slide_id': taken, 'content': 'edited'},
+    ]}, headers=auth)
+    assert resp.status_code == 200
+    created = resp.json['presentation']['slides'][-1]
+    assert resp.json['created'] == {taken: created['id']}
+    assert created['id'] != taken and created['content'] == 'edited'
+    assert get_deck(client, their_auth, theirs) == before
+
+
+def test_reusing_an_id_in_the_same_deck_adds_a_slide(client, auth, deck):
+    existing = deck['slides'][0]
+    resp = client.post(f'{deck_url(deck)}/batch', json={'ops': [
+        {'op': 'create_slide', 'slide': {'id': existing['id'], 'title': 'Copy'}},
+    ]}, headers=auth)
+    assert resp.status_code == 200
+    slides = resp.json['presentation']['slides']
+    assert len(slides) == 4 and len({s['id'] for s in slides}) == 4
+    assert slides[0] == existing
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+import requests
+
+from bench.run import compare, percentile, run_scenario, serve, summarize
+from bench.scenarios import SCENARIOS, BenchContext
+from bench.seed import PASSWORD, seed_store
+from bench.stub_server import StubConfig, start_stub_server
+
+
+@pytest.fixture
+def stub():
+    """(config, base_url) of a stub provider server with no added latency."""
+    config = StubConfig(latency=0, jitter=0, seed=1)
+    server, base_url = start_stub_server(config)
+    yield config, base_url
+    server.shutdown()
+    server.server_close()
+
+
+def anthropic(base_url, prompt, stream=False):
+    return requests.post(f'{base_url}/v1/messages', json={'messages': [{'content': prompt}], 'stream': stream},
+                         stream=stream, timeout=5)
+
+
+# ---- stub server ----
+
+def test_stub_answers_slide_and_deck_prompts(stub):
+    config, base_url = stub
+    slide = json.loads(anthropic(base_url, 'Presentation: "Q3 plan"').json()['content'][0]['text'])
+    assert slide['title'].startswith('Q3 plan') and len(slide['bullets']) == 3
+    deck = json.loads(anthropic(base_url, 'Return a JSON array of exactly 4 objects').json()['content'][0]['text'])
+    assert len(deck) == 4
+    gemini = requests.post(f'{base_url}/v1beta2/model:generateText', json={'prompt': {'text': 'x'}}, timeout=5)
+    assert 'title' in json.loads(gemini.json()['candidates'][0]['content'])
+    photos = requests.get(f'{base_url}/search/photos', params={'query': 'cat', 'per_page': 3}, timeout=5)
+    assert len(photos.json()['results']) == 3
+    assert config.calls == {'anthropic': 2, 'gemini': 1, 'unsplash': 1}
+
+
+def test_stub_streams_server_sent_events(stub):
+    _, base_url = stub
+    resp = anthropic(base_url, 'Return a JSON array of exactly 2 objects', stream=True)
+    events = [json.loads(line[6:]) for line in resp.iter_lines(decode_unicode=True) if line.startswith('data: ')]
+    assert events[-1]['type'] == 'message_stop'
+    assert len(json.loads(''.join(e['delta']['text'] for e in events[:-1]))) == 2
+
+
+def test_stub_failures_are_retryable_statuses(stub):
+    config, base_url = stub
+    config.failure_rate = 1.0
+    assert anthropic(base_url, 'x').status_code == 529
+    assert requests.post(f'{base_url}/v1beta2/m:generateText', json={'prompt': {'text': 'x'}},
+                         timeout=5).status_code == 503
+    assert requests.get(f'{base_url}/search/photos', timeout=5).status_code == 500
+
+
+# ---- stats ----
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 50) is None
+
+
+def test_summarize():
+    stats = summarize([0.1, 0.2, 0.3, 0.4], {200: 3, 500: 1}, 1, wall=2.0)
+    assert stats['requests'] == 4 and stats['errors'] == 1
+    assert stats['statuses'] == {'200': 3, '500': 1}
+    assert stats['throughput_rps'] == 2.0
+    assert stats['p50_ms'] == 250.0 and stats['max_ms'] == 400.0
+    assert summarize([], {}, 0, wall=1.0)['p99_ms'] is None
+
+
+def test_compare_reports_changes(tmp_path, capsys):
+    def result(commit, p50, rps):
+        return {'meta': {'commit': commit, 'startup': {'total_ms': 100.0}},
+                'endpoints': {'health': {'p50_ms': p50, 'p95_ms': p50 * 2, 'throughput_rps': rps}}}
+    old, new = tmp_path / 'old.json', tmp_path / 'new.json'
+    old.write_text(json.dumps(result('aaa', 10.0, 100.0)))
+    new_result = result('bbb', 5.0, 200.0)
+    new_result['endpoints']['login'] = new_result['endpoints']['health']
+    new.write_text(json.dumps(new_result))
+    compare(str(old), str(new))
+    out = capsys.readouterr().out
+    assert 'aaa -> bbb' in out
+    assert '-50.0%' in out and '+100.0%' in out
+    assert 'login' in out and 'only in new run' in out
+
+
+# ---- seeding and scenarios ----
+
+def test_seed_is_deterministic(open_store, tmp_path):
+    def hash_password(password):
+        return 'hashed:' + password
+    seeded = []
+    for name in ('a', 'b'):
+        (tmp_path / name).mkdir()
+        store = open_store('sqlite', root=tmp_path / name)
+        seeded.append(seed_store(store, hash_password, users=2, decks=3, slides=4, seed=5))
+    assert seeded[0] == seeded[1]
+    deck = seeded[0][1]['decks'][2]
+    assert store.get_presentation(deck['id'])['owner'] == 'bench0001'
+    assert [s['id'] for s in store.get_presentation(deck['id'])['slides']] == deck['slide_ids']
+    assert store.get_user('bench0000')['password'] == 'hashed:' + PASSWORD
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+@pytest.mark.parametrize('name', ['get_presentation', 'get_presentation_not_modified', 'update_slide',
+                                  'delete_slide', 'move_slide', 'batch', 'list_presentations'])
+def test_scenarios_run_against_the_app(app_module, name):
+    accounts = seed_store(app_module.store, app_module.hash_password, users=1, decks=2, slides=3, seed=3)
+    server, base_url = serve(app_module.flask_app)
+    try:
+        http = requests.Session()
+        for account in accounts:
+            account['token'] = http.post(f'{base_url}/login', json={
+                'username': account['username'], 'password': PASSWORD}).json()['token']
+        scenario = next(s for s in SCENARIOS if s.name == name)
+        stats = run_scenario(scenario, BenchContext(base_url, accounts, seed=3), count=4, concurrency=2)
+    finally:
+        server.shutdown()
+    assert stats['requests'] == 4
+    assert stats['errors'] == 0
+    assert set(stats['statuses']) <= {'200', '201', '304'}
@@ -0,0 +1,105 @@
+import io
+import os
+
+import pytest
+
+from blobs import BlobStore
+from conftest import NOW, make_deck, png_bytes, upload_image
+
+
+@pytest.fixture
+def blobs(tmp_path):
+    store = BlobStore(str(tmp_path / 'uploads'), str(tmp_path / 'blobs.db'), gc_grace_seconds=0)
+    yield store
+    store.close()
+
+
+def path_of(blobs, url):
+    return os.path.join(blobs.root, url[len('/uploads/'):])
+
+
+def test_identical_uploads_share_one_file(blobs):
+    url, digest, deduplicated = blobs.put(io.BytesIO(b'same bytes'), 'png')
+    assert not deduplicated
+    assert blobs.put(io.BytesIO(b'same bytes'), 'png') == (url, digest, True)
+    assert blobs.put(io.BytesIO(b'other bytes'), 'png')[0] != url
+    with open(path_of(blobs, url), 'rb') as f:
+        assert f.read() == b'same bytes'
+    # Staging happens outside the served directory and leaves nothing behind
+    assert not blobs.staging_dir.startswith(blobs.root + os.sep)
+    assert os.listdir(blobs.staging_dir) == []
+    assert blobs.stats()['blobs'] == 2
+
+
+def test_gc_frees_released_blobs_only(blobs):
+    kept, kept_digest, _ = blobs.put(io.BytesIO(b'kept'), 'png')
+    dropped, dropped_digest, _ = blobs.put(io.BytesIO(b'dropped'), 'png')
+    slide = {'image': kept, 'style': {'backgroundImage': dropped}}
+    blobs.sync_slides(new_slides=[slide])
+    blobs.sync_slides([slide], [dict(slide, style={})])
+    assert blobs.collect_garbage() == len(b'dropped')
+    assert os.path.exists(path_of(blobs, kept))
+    assert not os.path.exists(path_of(blobs, dropped))
+    assert blobs.stats() == {'blobs': 1, 'bytes': len(b'kept'), 'unreferenced': 0}
+
+
+def test_gc_keeps_blobs_still_in_use_despite_drifted_counts(blobs):
+    url, digest, _ = blobs.put(io.BytesIO(b'in use'), 'png')  # never counted
+    assert blobs.collect_garbage(live={digest: 2}) == 0
+    assert os.path.exists(path_of(blobs, url))
+    assert blobs.stats()['unreferenced'] == 0
+
+
+def test_one_process_collects(tmp_path, blobs):
+    other = BlobStore(str(tmp_path / 'uploads'), str(tmp_path / 'blobs.db'))
+    try:
+        assert blobs.claim_gc()
+        assert blobs.claim_gc()
+        assert not other.claim_gc()
+        blobs.close()
+        assert other.claim_gc()
+    finally:
+        other.close()
+
+
+def test_upload_refs_reads_image_fields(store):
+    deck = make_deck('p', 'alice')
+    a, b = '/uploads/aa/bb/' + 'a' * 64 + '.png', '/uploads/cc/dd/' + 'c' * 64 + '.jpg'
+    deck['slides'][0].update(image=a, style={'backgroundImage': b})
+    deck['slides'][1].update(image='https://example.com/x.png', style={'backgroundImage': a})
+    store.create_presentation(deck)
+    assert sorted(store.upload_refs()) == [a, a, b]
+    store.delete_slide('p', 'p-s1', NOW)
+    assert sorted(store.upload_refs()) == [a, b]
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_slide_routes_keep_counts(app_module, client, auth, deck):
+    app_module.blob_store.gc_grace_seconds = 0
+    url = upload_image(client, auth, png_bytes())['url']
+    slides = f"/presentations/{deck['id']}/slides"
+    slide = client.post(slides, json={'title': 'Pic', 'image': url}, headers=auth).json['slide']
+    client.put(f"{slides}/{deck['slides'][0]['id']}", json={'style': {'backgroundImage': url}}, headers=auth)
+    app_module.collect_blobs()
+    assert client.get(url).status_code == 200
+
+    client.delete(f"{slides}/{slide['id']}", headers=auth)
+    app_module.collect_blobs()
+    assert client.get(url).status_code == 200  # still the first slide's background
+    client.put(f"{slides}/{deck['slides'][0]['id']}", json={'style': {'backgroundImage': None}}, headers=auth)
+    app_module.collect_blobs()
+    assert client.get(url).status_code == 404
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_uploads_route(app_module, client, auth):
+    url = upload_image(client, auth, png_bytes())['url']
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert 'immutable' in resp.headers['Cache-Control']
+    # Nothing under a dot directory is served, staging or otherwise
+    hidden = os.path.join(app_module.UPLOAD_DIR, '.incoming')
+    os.makedirs(hidden)
+    with open(os.path.join(hidden, 'partial'), 'wb') as f:
+        f.write(b'half an upload')
+    assert client.get('/uploads/.incoming/partial').status_code == 404
@@ -0,0 +1,53 @@
+import io
+import zipfile
+
+import pytest
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def create(client, auth, title):
+    return client.post('/presentations', json={'title': title, 'slide_count': 1}, headers=auth).json['presentation']
+
+
+def bulk(client, auth, body):
+    return client.post('/presentations/export', json=body, headers=auth)
+
+
+def entries(resp):
+    assert resp.status_code == 200
+    assert resp.mimetype == 'application/zip'
+    return zipfile.ZipFile(io.BytesIO(resp.data)).namelist()
+
+
+def test_decks_are_zipped_in_request_order(client, auth):
+    ids = [create(client, auth, title)['id'] for title in ('B', 'A', 'B', 'A/../x')]
+    assert entries(bulk(client, auth, {'ids': ids + ids[:1]})) == ['B.pptx', 'A.pptx', 'B (2).pptx', 'A_.._x.pptx']
+    assert sorted(entries(bulk(client, auth, {'all': True}))) == ['A.pptx', 'A_.._x.pptx', 'B (2).pptx', 'B.pptx']
+
+
+def test_a_failed_deck_does_not_abort_the_archive(app_module, client, auth, monkeypatch):
+    good, bad = create(client, auth, 'Good'), create(client, auth, 'Bad')
+    render = app_module.render_export_bytes
+
+    def flaky(pres_id):
+        if pres_id == bad['id']:
+            raise RuntimeError('renderer crashed')
+        return render(pres_id)
+
+    monkeypatch.setattr(app_module, 'render_export_bytes', flaky)
+    assert entries(bulk(client, auth, {'ids': [bad['id'], good['id']]})) == [f"{bad['id']}.error.txt", 'Good.pptx']
+
+
+def test_request_is_checked_before_streaming(app_module, client, auth, monkeypatch):
+    mine = create(client, auth, 'Mine')['id']
+    client.post('/signup', json={'username': 'other', 'password': 'secret1'})
+    token = client.post('/login', json={'username': 'other', 'password': 'secret1'}).json['token']
+    theirs = create(client, {'Authorization': f'Bearer {token}'}, 'Theirs')['id']
+    assert bulk(client, auth, {'ids': [mine, 'missing']}).status_code == 404
+    assert bulk(client, auth, {'ids': [mine, theirs]}).status_code == 403
+    assert bulk(client, auth, {'ids': []}).status_code == 400
+    monkeypatch.setattr(app_module, 'BULK_EXPORT_MAX', 1)
+    assert bulk(client, auth, {'all': True, 'ids': []}).status_code == 200
+    create(client, auth, 'Second')
+    assert bulk(client, auth, {'all': True}).status_code == 400
@@ -0,0 +1,95 @@
+import json
+import types
+
+import pytest
+
+import cache
+from cache import MemoryCache, DiskCache, TieredCache, make_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace the clock cache.py reads; advance it by assigning clock.now."""
+    fake = types.SimpleNamespace(now=1000.0)
+    fake.time = lambda: fake.now
+    monkeypatch.setattr(cache, 'time', fake)
+    return fake
+
+
+def test_make_key_is_order_independent_for_dicts():
+    assert make_key('a', {'x': 1, 'y': 2}) == make_key('a', {'y': 2, 'x': 1})
+    assert make_key('a', 1) != make_key('a', '1')
+
+
+def test_memory_cache_evicts_least_recently_used(clock):
+    c = MemoryCache(max_items=2)
+    c.set('a', 1)
+    c.set('b', 2)
+    c.get('a')
+    c.set('c', 3)
+    assert (c.get('a'), c.get('b'), c.get('c')) == (1, None, 3)
+
+
+def test_memory_cache_expires_entries(clock):
+    c = MemoryCache(ttl=10)
+    c.set('a', 1)
+    c.set('b', 2, ttl=100)
+    clock.now += 11
+    assert c.get('a') is None
+    assert c.get('b') == 2
+
+
+def test_disk_cache_persists_and_evicts(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    c = DiskCache(path, max_items=2, ttl=10)
+    c.set('a', {'v': 1})
+    clock.now += 1
+    c.set('b', {'v': 2})
+    clock.now += 1
+    c.get('a')  # a is now more recently used than b
+    clock.now += 1
+    c.set('c', {'v': 3})
+    reopened = DiskCache(path, max_items=2, ttl=10)
+    assert (reopened.get('a'), reopened.get('b'), reopened.get('c')) == ({'v': 1}, None, {'v': 3})
+    clock.now += 20
+    assert reopened.get('a') is None
+
+
+def test_disk_cache_byte_cap(tmp_path, clock):
+    c = DiskCache(str(tmp_path / 'cache.db'), max_bytes=3 * len(json.dumps('x' * 100)))
+    for i in range(5):
+        clock.now += 1
+        c.set(str(i), 'x' * 100)
+    assert len(c) == 3
+    assert c.get('0') is None and c.get('4') is not None
+
+
+def test_tiered_cache_promotes_and_copies(tmp_path):
+    disk = DiskCache(str(tmp_path / 'cache.db'))
+    disk.set('k', {'bullets': ['a']})
+    c = TieredCache(MemoryCache(), disk)
+    value = c.get('k')
+    value['bullets'].append('mutated by caller')
+    assert c.get('k') == {'bullets': ['a']}
+    assert c.get('missing') is None
+    stats = c.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_llm_results_are_cached_per_prompt_and_model(app_module, fake_llm, monkeypatch):
+    calls = []
+
+    def reply(prompt, stream):
+        calls.append(prompt)
+        return json.dumps({'title': f'Answer {len(calls)}', 'bullets': []})
+
+    fake_llm(reply)
+    ask = app_module.call_llm_for_structured_content
+    assert ask('Explain  caching')['title'] == 'Answer 1'
+    assert ask('Explain caching')['title'] == 'Answer 1'  # whitespace is normalized
+    assert ask('Explain caching', fresh=True)['title'] == 'Answer 2'
+    assert ask('Explain caching')['title'] == 'Answer 2'
+    monkeypatch.setenv('ANTHROPIC_MODEL', 'another-model')
+    assert ask('Explain caching')['title'] == 'Answer 3'
+    assert len(calls) == 3
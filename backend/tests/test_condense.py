@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from condense import assign_sections, chunk_text, estimate_tokens, truncate_to_tokens
+
+
+def test_chunks_pack_whole_paragraphs():
+    paragraphs = [f'Paragraph {i} ' + 'word ' * 30 for i in range(10)]
+    chunks = chunk_text('\n\n'.join(paragraphs), 100)
+    assert all(estimate_tokens(c) <= 100 for c in chunks)
+    assert [p.strip() for c in chunks for p in c.split('\n\n')] == [p.strip() for p in paragraphs]
+
+
+def test_long_paragraph_is_split_on_words():
+    chunks = chunk_text('word ' * 500, 50)
+    assert all(estimate_tokens(c) <= 50 for c in chunks)
+    assert sum(len(c.split()) for c in chunks) == 500
+
+
+def test_truncate_to_tokens():
+    assert truncate_to_tokens('short', 10) == 'short'
+    cut = truncate_to_tokens('alpha beta gamma delta epsilon', 4)
+    assert cut == 'alpha beta …'
+
+
+@pytest.mark.parametrize('sections, slides, expected', [
+    (6, 3, [[0, 1], [2, 3], [4, 5]]),
+    (5, 2, [[0, 1], [2, 3, 4]]),
+    (2, 4, [[0], [0], [1], [1]]),
+    (0, 2, [[], []]),
+])
+def test_sections_are_spread_in_order(sections, slides, expected):
+    assert assign_sections(sections, slides) == expected
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_long_input_is_condensed_before_slide_prompts(app_module, client, auth, fake_llm):
+    prompts = []
+
+    def reply(prompt, stream):
+        prompts.append(prompt)
+        if 'Source excerpt' in prompt:
+            n = prompt.split('Source excerpt ')[1].split(' ')[0]
+            return json.dumps({'title': f'Section {n}', 'bullets': [f'fact {n}']})
+        return json.dumps({'title': 'Slide', 'bullets': ['x']})
+
+    fake_llm(reply)
+    text = '\n\n'.join(f'Part {i}. ' + 'detail ' * 400 for i in range(6))
+    assert estimate_tokens(text) > app_module.SLIDE_INPUT_TOKENS
+    resp = client.post('/generate', json={'mode': 'ai', 'title': 'Long', 'text': text, 'slide_count': 3},
+                       headers=auth)
+    assert resp.status_code == 201
+    summaries = [p for p in prompts if 'Source excerpt' in p]
+    slide_prompts = [p for p in prompts if 'Create slide' in p]
+    assert len(summaries) == len(chunk_text(text, app_module.CONDENSE_CHUNK_TOKENS))
+    assert len(slide_prompts) == 3
+    for prompt in slide_prompts:
+        assert 'detail detail' not in prompt  # raw input replaced by the summaries
+        assert 'Deck outline' in prompt
+    assert 'fact 1' in next(p for p in slide_prompts if 'Create slide 1 ' in p)
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_short_input_is_sent_as_is(app_module, client, auth, fake_llm):
+    prompts = []
+    fake_llm(lambda prompt, stream: prompts.append(prompt) or json.dumps({'title': 'S', 'bullets': []}))
+    client.post('/generate', json={'mode': 'ai', 'title': 'Short', 'text': 'A short note.', 'slide_count': 2},
+                headers=auth)
+    assert len(prompts) == 2
+    assert all('A short note.' in p for p in prompts)
@@ -0,0 +1,142 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import NOW, make_deck
+from storage import VersionConflict
+
+
+def deck_url(deck):
+    return f"/presentations/{deck['id']}"
+
+
+def titles(client, auth, deck):
+    return [s['title'] for s in client.get(deck_url(deck), headers=auth).json['presentation']['slides']]
+
+
+# ---- store ----
+
+def test_stale_version_raises_and_writes_nothing(store):
+    store.create_presentation(make_deck('p', 'alice'))
+    store.update_presentation('p', {'title': 'v2'}, expected_version=1)
+    before = store.get_presentation('p')
+    assert before['version'] == 2
+
+    slide = dict(before['slides'][0], title='stale')
+    writes = [
+        lambda: store.update_presentation('p', {'title': 'stale'}, expected_version=1),
+        lambda: store.create_slide('p', {'id': 'x', 'title': '', 'content': '', 'image': None, 'style': {}},
+                                   NOW, expected_version=1),
+        lambda: store.update_slide('p', slide, NOW, expected_version=1),
+        lambda: store.delete_slide('p', 'p-s0', NOW, expected_version=1),
+        lambda: store.reorder_slides('p', ['p-s2'], NOW, expected_version=1),
+        lambda: store.move_slide('p', 'p-s2', None, NOW, expected_version=1),
+        lambda: store.apply_batch('p', [{'op': 'set_title', 'title': 'stale'}], NOW, expected_version=1),
+        lambda: store.delete_presentation('p', expected_version=1),
+    ]
+    for write in writes:
+        with pytest.raises(VersionConflict) as info:
+            write()
+        assert info.value.current == 2
+    assert store.get_presentation('p') == before
+
+
+# ---- ETag / If-Match ----
+
+def test_get_revalidates_with_etag(client, auth, deck):
+    resp = client.get(deck_url(deck), headers=auth)
+    assert resp.status_code == 200
+    etag = resp.headers['ETag']
+    assert client.get(deck_url(deck), headers={**auth, 'If-None-Match': etag}).status_code == 304
+
+
+def test_stale_if_match_is_rejected(client, auth, deck):
+    url = deck_url(deck)
+    etag = client.get(url, headers=auth).headers['ETag']
+    slide_id = deck['slides'][0]['id']
+
+    first = client.put(f'{url}/slides/{slide_id}', json={'title': 'First'}, headers={**auth, 'If-Match': etag})
+    assert first.status_code == 200
+    # A second writer holding the same ETag loses instead of overwriting
+    second = client.put(f'{url}/slides/{slide_id}', json={'title': 'Second'}, headers={**auth, 'If-Match': etag})
+    assert second.status_code == 412
+    assert second.json['version'] == 2
+    assert second.headers['ETag'] == '"v2"'
+    assert titles(client, auth, deck)[0] == 'First'
+
+
+@pytest.mark.parametrize('method, path, body', [
+    ('put', '', {'title': 'Renamed'}),
+    ('delete', '', None),
+    ('post', '/slides', {'title': 'Added'}),
+    ('put', '/slides/{slide}', {'title': 'Edited'}),
+    ('delete', '/slides/{slide}', None),
+    ('post', '/slides/reorder', {'slide_ids': []}),
+    ('post', '/slides/{slide}/move', {'after': None}),
+    ('post', '/batch', {'ops': [{'op': 'set_title', 'title': 'Renamed'}]}),
+])
+def test_every_write_checks_if_match(client, auth, deck, method, path, body):
+    url = deck_url(deck) + path.format(slide=deck['slides'][1]['id'])
+    before = client.get(deck_url(deck), headers=auth).json['presentation']
+    for stale in ('"v0"', '"not-ours"'):
+        resp = getattr(client, method)(url, json=body, headers={**auth, 'If-Match': stale})
+        assert resp.status_code == 412
+    assert client.get(deck_url(deck), headers=auth).json['presentation'] == before
+    resp = getattr(client, method)(url, json=body, headers={**auth, 'If-Match': '*'})
+    assert resp.status_code in (200, 201)
+
+
+# ---- compression ----
+
+@pytest.fixture
+def big_deck(client, auth):
+    resp = client.post('/presentations', json={'title': 'Big', 'slide_count': 12}, headers=auth)
+    return resp.json['presentation']
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_large_json_is_gzipped(client, auth, big_deck):
+    plain = client.get(deck_url(big_deck), headers=auth)
+    assert 'Content-Encoding' not in plain.headers
+    assert len(plain.data) >= 1024
+
+    resp = client.get(deck_url(big_deck), headers={**auth, 'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert len(resp.data) < len(plain.data)
+    assert json.loads(gzip.decompress(resp.data)) == plain.json
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_small_json_is_sent_as_is(client, auth, deck):
+    resp = client.get('/presentations', headers={**auth, 'Accept-Encoding': 'gzip'})
+    assert len(resp.data) < 1024
+    assert 'Content-Encoding' not in resp.headers
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_compressed_deck_keeps_a_weak_etag(client, auth, big_deck):
+    headers = {**auth, 'Accept-Encoding': 'gzip'}
+    resp = client.get(deck_url(big_deck), headers=headers)
+    assert resp.headers['ETag'] == 'W/"v1"'
+    assert client.get(deck_url(big_deck), headers={**headers, 'If-None-Match': resp.headers['ETag']}).status_code == 304
+    # If-Match compares weakly, so the weak tag still guards writes
+    rename = client.put(deck_url(big_deck), json={'title': 'Renamed'}, headers={**auth, 'If-Match': 'W/"v1"'})
+    assert rename.status_code == 200
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_threshold_follows_the_setting(app_module, client, auth, deck):
+    app_module.COMPRESS_MIN_BYTES = 10
+    resp = client.get('/presentations', headers={**auth, 'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_brotli_is_preferred_when_installed(client, auth, big_deck):
+    brotli = pytest.importorskip('brotli')
+    plain = client.get(deck_url(big_deck), headers=auth)
+    resp = client.get(deck_url(big_deck), headers={**auth, 'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(resp.data)) == plain.json
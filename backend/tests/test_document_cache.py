@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import pdf_bytes, upload_document
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def test_same_bytes_are_extracted_once(app_module, client, auth, monkeypatch):
+    data = pdf_bytes(3)
+    first = upload_document(client, auth, data).json
+    monkeypatch.setattr(app_module, 'extract_pdf_pages', None)  # a second extraction would fail
+    again = upload_document(client, auth, data, filename='renamed.pdf').json
+    assert again['cached'] and not first['cached']
+    assert (again['document_id'], again['text']) == (first['document_id'], first['text'])
+    assert again['filename'] == 'renamed.pdf'
+
+
+def test_key_covers_type_and_extractor_version(app_module):
+    data = b'%PDF-1.4 same bytes'
+    assert app_module.document_key(data, 'pdf') != app_module.document_key(data, 'txt')
+    key = app_module.document_key(data, 'pdf')
+    app_module.DOC_EXTRACT_VERSION += 1
+    try:
+        assert app_module.document_key(data, 'pdf') != key
+    finally:
+        app_module.DOC_EXTRACT_VERSION -= 1
+
+
+def test_smaller_cached_budget_is_extracted_again(client, auth):
+    data = pdf_bytes(4)
+    assert upload_document(client, auth, data, max_pages='1').json['pages'] == 1
+    full = upload_document(client, auth, data).json
+    assert (full['pages'], full['cached'], full['truncated']) == (4, False, False)
+    # A record holding the whole document serves smaller budgets too
+    part = upload_document(client, auth, data, max_pages='2').json
+    assert (part['pages'], part['cached'], part['truncated']) == (2, True, True)
+
+
+def test_generate_from_document_id(client, auth):
+    doc = upload_document(client, auth, pdf_bytes(3, words=2)).json
+    resp = client.post('/generate', json={'mode': 'user', 'title': 'From PDF', 'slide_count': 1,
+                                          'document_id': doc['document_id'], 'document_pages': [1, 2]},
+                       headers=auth)
+    assert resp.status_code == 201
+    assert resp.json['presentation']['slides'][0]['content'] == 'Page 1 w0 w1'
+    resp = client.post('/generate', json={'title': 'T', 'document_id': 'unknown'}, headers=auth)
+    assert resp.status_code == 400
@@ -0,0 +1,115 @@
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+from conftest import pdf_bytes, upload_document
+from documents import CutText, build_document, iter_document_pages, iter_pdf_pages, iter_text_pages
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """Runs tasks on threads and keeps the arguments each was submitted with."""
+
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append(args)
+        return super().submit(fn, *args)
+
+
+@pytest.fixture
+def temp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    return tmp_path
+
+
+def page_texts(pages):
+    return [text.split()[:2] for _, text in pages]
+
+
+def test_page_ranges_share_one_temp_file(temp_dir):
+    data = pdf_bytes(10)
+    with RecordingExecutor() as executor:
+        pages = list(iter_pdf_pages(data, executor=executor, pages_per_task=3, window=2))
+    assert page_texts(pages) == [['Page', str(i)] for i in range(10)]
+    assert [i for i, _ in pages] == list(range(10))
+    assert [args[1:] for args in executor.tasks] == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert len({args[0] for args in executor.tasks}) == 1
+    assert all(isinstance(args[0], str) for args in executor.tasks)
+    assert os.listdir(temp_dir) == []  # removed once the pages are read
+
+
+def test_stopping_early_cancels_and_cleans_up(temp_dir):
+    with RecordingExecutor() as executor:
+        pages = iter_pdf_pages(pdf_bytes(20), executor=executor, pages_per_task=2, window=2)
+        assert next(pages)[0] == 0
+        pages.close()
+    assert len(executor.tasks) <= 4
+    assert os.listdir(temp_dir) == []
+
+
+def test_process_pool_extraction(temp_dir):
+    data = pdf_bytes(6)
+    executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pages = list(iter_pdf_pages(data, executor=executor, pages_per_task=2))
+    finally:
+        executor.shutdown()
+    assert pages == list(iter_pdf_pages(data))
+
+
+def test_char_budget_marks_only_real_cuts():
+    exact = list(iter_text_pages('abcde', 5))
+    assert exact == [(0, 'abcde')] and not isinstance(exact[0][1], CutText)
+    assert not build_document('d', 'f', [t for _, t in exact], 1, 10, 5)['truncated']
+
+    cut = list(iter_text_pages('abcdef', 5))
+    assert cut == [(0, 'abcde')] and isinstance(cut[0][1], CutText)
+    doc = build_document('d', 'f', [t for _, t in cut], 1, 10, 5)
+    assert doc['truncated']
+    # Served again from the cache (a JSON round trip) it is still truncated
+    cached = json.loads(json.dumps(doc))
+    assert build_document('d', 'f', [t for _, t in iter_document_pages(cached, 10, 5)], 1, 10, 5)['truncated']
+
+
+def test_page_budget():
+    pages = list(iter_pdf_pages(pdf_bytes(5), max_pages=2))
+    assert len(pages) == 2
+    assert build_document('d', 'f', [t for _, t in pages], 5, 2, 10 ** 6)['truncated']
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_upload_document(client, auth):
+    resp = upload_document(client, auth, pdf_bytes(3))
+    assert resp.status_code == 200
+    assert (resp.json['pages'], resp.json['page_count'], resp.json['truncated']) == (3, 3, False)
+    assert resp.json['text'].startswith('Page 0')
+
+    text = upload_document(client, auth, b'x' * 50, filename='notes.txt', max_chars='50').json
+    assert (len(text['text']), text['truncated']) == (50, False)
+    text = upload_document(client, auth, b'x' * 51, filename='notes.txt', max_chars='50').json
+    assert (len(text['text']), text['truncated']) == (50, True)
+
+    assert upload_document(client, auth, b'%PDF-broken').status_code == 400
+    assert upload_document(client, auth, pdf_bytes(1), max_pages='0').status_code == 400
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_upload_document_stream(client, auth):
+    resp = upload_document(client, auth, pdf_bytes(4), stream='1', max_pages='3')
+    assert resp.mimetype == 'text/event-stream'
+    events = [block.split('\n')[0][len('event: '):] for block in resp.get_data(as_text=True).strip().split('\n\n')]
+    assert events == ['document', 'page', 'page', 'page', 'done']
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_pdf_pool_is_created_once_and_shut_down(app_module):
+    pool = app_module.get_pdf_executor()
+    assert pool is app_module.get_pdf_executor() is app_module.pdf_executor
+    app_module.shutdown_services()
+    assert app_module.pdf_executor is None
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def export(client, auth, deck, etag=None):
+    headers = dict(auth, **({'If-None-Match': etag} if etag else {}))
+    return client.get(f"/presentations/{deck['id']}/export", headers=headers)
+
+
+def test_unchanged_deck_is_served_from_cache(app_module, client, auth, deck):
+    first = export(client, auth, deck)
+    assert first.status_code == 200
+    assert first.data[:2] == b'PK'
+    assert export(client, auth, deck, first.headers['ETag']).status_code == 304
+    assert os.listdir(app_module.EXPORT_DIR) == [first.headers['ETag'].strip('"') + '.pptx']
+    again = export(client, auth, deck)
+    assert (again.status_code, again.headers['ETag']) == (200, first.headers['ETag'])
+    assert len(os.listdir(app_module.EXPORT_DIR)) == 1
+
+
+@pytest.mark.parametrize('change', [
+    lambda client, url, auth, deck: client.put(url, json={'title': 'Renamed'}, headers=auth),
+    lambda client, url, auth, deck: client.put(f"{url}/slides/{deck['slides'][0]['id']}",
+                                               json={'content': 'Edited'}, headers=auth),
+], ids=['rename', 'edit_slide'])
+def test_changes_invalidate_the_etag(client, auth, deck, change):
+    etag = export(client, auth, deck).headers['ETag']
+    assert change(client, f"/presentations/{deck['id']}", auth, deck).status_code == 200
+    resp = export(client, auth, deck, etag)
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != etag
+
+
+def test_renamed_deck_downloads_under_its_new_name(client, auth, deck):
+    export(client, auth, deck)
+    client.put(f"/presentations/{deck['id']}", json={'title': 'Renamed'}, headers=auth)
+    assert 'Renamed.pptx' in export(client, auth, deck).headers['Content-Disposition']
+
+
+def test_cache_is_bounded(app_module, client, auth, deck, monkeypatch):
+    monkeypatch.setattr(app_module, 'EXPORT_CACHE_MAX_BYTES', 1)
+    for title in ('One', 'Two', 'Three'):
+        client.put(f"/presentations/{deck['id']}", json={'title': title}, headers=auth)
+        assert export(client, auth, deck).status_code == 200
+    # Everything but the file just served is evicted
+    assert len(os.listdir(app_module.EXPORT_DIR)) == 1
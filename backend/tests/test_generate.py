@@ -0,0 +1,68 @@
+import json
+import time
+import threading
+
+import pytest
+
+from conftest import slide_number
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def generate(client, auth, **body):
+    body = dict({'mode': 'ai', 'title': 'Deck', 'text': 'Some notes', 'slide_count': 5}, **body)
+    resp = client.post('/generate', json=body, headers=auth)
+    assert resp.status_code == 201
+    return resp.json['presentation']
+
+
+def test_slides_are_generated_concurrently_in_deck_order(app_module, client, auth, fake_llm):
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def reply(prompt, stream):
+        n = slide_number(prompt)
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05 * (6 - n))  # later slides finish first
+        with lock:
+            active[0] -= 1
+        return 'not json' if n == 3 else json.dumps({'title': f'T{n}', 'bullets': ['a', 'b']})
+
+    fake_llm(reply)
+    pres = generate(client, auth)
+    assert [s['title'] for s in pres['slides']] == ['T1', 'T2', 'Deck - Slide 3', 'T4', 'T5']
+    assert pres['slides'][0]['content'] == '• a\n• b'
+    assert pres['slides'][2]['content'] == 'Content to be filled'
+    assert 1 < peak[0] <= app_module.PROVIDER_CONCURRENCY['anthropic']
+
+
+def test_failed_slide_calls_do_not_fail_the_deck(client, auth, fake_llm):
+    def reply(prompt, stream):
+        if slide_number(prompt) % 2:
+            raise ValueError('connection reset')
+        return json.dumps({'title': 'Fine', 'bullets': []})
+
+    fake_llm(reply)
+    pres = generate(client, auth, slide_count=4)
+    assert [s['title'] for s in pres['slides']] == ['Deck - Slide 1', 'Fine', 'Deck - Slide 3', 'Fine']
+
+
+def test_deck_strategy_streams_one_response_and_fills_gaps(client, auth, fake_llm):
+    calls = []
+
+    def reply(prompt, stream):
+        if stream:
+            calls.append('deck')
+            deck = '[{"title": "A", "bullets": ["1"]}, {"title": "B", "bullets": ["2"]}, {bad}, {"title": "D"}'
+            return [deck[i:i + 7] for i in range(0, len(deck), 7)]
+        calls.append(slide_number(prompt))
+        return json.dumps({'title': f'Filled {slide_number(prompt)}', 'bullets': ['x']})
+
+    fake_llm(reply)
+    pres = generate(client, auth, slide_count=4, strategy='deck')
+    assert [s['title'] for s in pres['slides']] == ['A', 'B', 'Filled 3', 'Filled 4']
+    # One streamed call for the deck; only the malformed and missing slides are asked again
+    assert calls[0] == 'deck'
+    assert sorted(calls[1:]) == [3, 4]
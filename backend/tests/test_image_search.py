@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from cache import SingleFlight
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def search(client, auth, q='Mountain Lake', limit=4, source='local'):
+    return client.get('/images/search', query_string={'q': q, 'limit': limit, 'source': source}, headers=auth)
+
+
+def test_single_flight_runs_once_per_key(backend):
+    flight = SingleFlight()
+    calls, started = [], threading.Event()
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'value'
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(flight.do('k', fetch)))
+    first.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.do('k', fetch))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    for t in [first] + followers:
+        t.join()
+    assert len(calls) == 1
+    assert sorted(results) == [('value', False)] + [('value', True)] * 3
+    assert flight.do('k', lambda: 'again') == ('again', False)  # nothing cached once the call finished
+
+
+def test_single_flight_shares_the_error(backend):
+    flight = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flight.do('k', lambda: (_ for _ in ()).throw(RuntimeError('down')))
+    assert flight.do('k', lambda: 1) == (1, False)
+
+
+def test_repeat_search_is_served_from_cache(app_module, client, auth):
+    first = search(client, auth)
+    assert first.headers['X-Cache'] == 'MISS'
+    again = search(client, auth, q='  mountain   LAKE ')  # same query once normalized
+    assert again.headers['X-Cache'] == 'HIT'
+    assert again.json == first.json
+    assert search(client, auth, limit=5).headers['X-Cache'] == 'MISS'
+    assert app_module.local_image_search.calls == 2
+
+
+def test_concurrent_searches_share_one_fetch(app_module, client, auth):
+    app_module.local_image_search.delay = 0.3
+    statuses = []
+
+    def run():
+        statuses.append(search(client, auth, q='harbor').headers['X-Cache'])
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert app_module.local_image_search.calls == 1
+    assert statuses.count('MISS') == 1
+    assert set(statuses) <= {'MISS', 'SHARED', 'HIT'}
+
+
+def test_unsplash_client_follows_the_access_key(app_module, monkeypatch):
+    assert app_module.get_image_search_provider('unsplash') is None
+    monkeypatch.setenv('UNSPLASH_ACCESS_KEY', 'one')
+    first = app_module.get_image_search_provider('unsplash')
+    assert first.access_key == 'one'
+    assert app_module.get_image_search_provider('unsplash') is first
+    monkeypatch.setenv('UNSPLASH_ACCESS_KEY', 'two')
+    second = app_module.get_image_search_provider('unsplash')
+    assert second is not first and second.access_key == 'two'
@@ -0,0 +1,47 @@
+import os
+import time
+
+import pytest
+
+from conftest import png_bytes, upload_image
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def wait_for(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return os.path.exists(path)
+
+
+def test_large_upload_gets_every_variant(app_module, client, auth):
+    from PIL import Image
+    uploaded = upload_image(client, auth, png_bytes(1600, 800))
+    assert sorted(uploaded['variants']) == sorted(app_module.IMAGE_VARIANT_WIDTHS)
+    for name, url in uploaded['variants'].items():
+        path = os.path.join(app_module.UPLOAD_DIR, url[len('/uploads/'):])
+        assert wait_for(path), name
+        with Image.open(path) as img:
+            assert img.size == (app_module.IMAGE_VARIANT_WIDTHS[name], app_module.IMAGE_VARIANT_WIDTHS[name] // 2)
+        resp = client.get(url)
+        assert resp.status_code == 200
+        assert 'immutable' in resp.headers['Cache-Control']
+
+
+def test_small_upload_serves_the_master(app_module, client, auth):
+    uploaded = upload_image(client, auth, png_bytes(100, 50))
+    master = client.get(uploaded['url']).data
+    resp = client.get(uploaded['variants']['thumb'])
+    assert resp.status_code == 200
+    assert resp.data == master
+    # Not immutable: a later rendition may take its place
+    assert resp.headers['Cache-Control'] == 'no-cache'
+
+
+def test_export_uses_the_export_variant(app_module, client, auth):
+    uploaded = upload_image(client, auth, png_bytes(1600, 800))
+    export_path = os.path.join(app_module.UPLOAD_DIR, uploaded['variants']['export'][len('/uploads/'):])
+    assert wait_for(export_path)
+    assert app_module.resolve_image_path(uploaded['url'], 'export') == export_path
+    assert app_module.resolve_image_path(uploaded['url']).endswith(uploaded['digest'] + '.png')
@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from conftest import NOW
+from jobs import JobQueue, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+
+
+@pytest.fixture
+def queue(store):
+    queues = []
+
+    def make(**handlers):
+        q = JobQueue(store, max_workers=1, lease_seconds=30)
+        for kind, handler in handlers.items():
+            q.register(kind, handler)
+        queues.append(q)
+        return q
+
+    yield make
+    for q in queues:
+        q.stop()
+
+
+def test_update_job_conditions(store):
+    store.save_job({'id': 'j', 'owner': 'alice', 'kind': 'export', 'status': 'queued',
+                    'worker': None, 'lease_expires': None, 'created_at': NOW})
+    assert store.update_job('j', {'status': 'running', 'worker': 'w1', 'lease_expires': 100},
+                            statuses=('queued',))['status'] == 'running'
+    # A second claim, another worker's update and an unexpired sweep all fail
+    assert store.update_job('j', {'status': 'running', 'worker': 'w2'}, statuses=('queued',)) is None
+    assert store.update_job('j', {'status': 'succeeded'}, worker='w2') is None
+    assert store.update_job('j', {'status': 'failed'}, expired_before=50) is None
+    assert store.update_job('j', {'status': 'failed'}, statuses=('running',), expired_before=150)['status'] == 'failed'
+    assert store.update_job('missing', {'status': 'failed'}) is None
+    assert [j['id'] for j in store.list_jobs(owner='alice', statuses=('failed',))] == ['j']
+
+
+def test_jobs_run_and_record_their_outcome(queue):
+    q = queue(ok=lambda ctx, params: {'echo': params}, boom=lambda ctx, params: 1 / 0)
+    ok = q.submit('alice', 'ok', {'n': 1})
+    boom = q.submit('alice', 'boom', {})
+    assert q.wait(ok['id'], 5)['result'] == {'echo': {'n': 1}}
+    failed = q.wait(boom['id'], 5)
+    assert failed['status'] == FAILED
+    assert 'division by zero' in failed['error']
+    with pytest.raises(ValueError):
+        q.submit('alice', 'unknown', {})
+
+
+def test_cancel_queued_and_running_jobs(queue):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(ctx, params):
+        started.set()
+        release.wait(5)
+        ctx.check_cancelled()
+        return {}
+
+    q = queue(slow=slow)
+    running = q.submit('alice', 'slow', {})
+    queued = q.submit('alice', 'slow', {})  # one worker: waits behind the first
+    assert started.wait(5)
+    assert q.cancel(queued['id'])['status'] == CANCELLED
+    assert q.cancel(running['id'])['cancel_requested']
+    release.set()
+    assert q.wait(running['id'], 5)['status'] == CANCELLED
+    assert q.get(queued['id'])['started_at'] is None
+
+
+def test_a_job_runs_once_across_queues(queue, store):
+    runs = []
+    lock = threading.Lock()
+
+    def count(ctx, params):
+        with lock:
+            runs.append(ctx.job_id)
+        return {}
+
+    first, second = queue(count=count), queue(count=count)
+    job = first.submit('alice', 'count', {})
+    second.recover()  # another process offered the same queued job
+    assert first.wait(job['id'], 5)['status'] == SUCCEEDED
+    second.wait(job['id'], 5)
+    assert runs == [job['id']]
+
+
+def test_recover_fails_jobs_whose_worker_died(queue, store):
+    store.save_job({'id': 'orphan', 'owner': 'alice', 'kind': 'x', 'status': RUNNING, 'worker': 'gone',
+                    'lease_expires': 0, 'created_at': NOW})
+    store.save_job({'id': 'waiting', 'owner': 'alice', 'kind': 'x', 'status': QUEUED, 'worker': None,
+                    'lease_expires': None, 'created_at': NOW, 'params': {}})
+    q = queue(x=lambda ctx, params: {'ran': True})
+    q.start()
+    assert store.get_job('orphan')['status'] == FAILED
+    assert q.wait('waiting', 5)['result'] == {'ran': True}
+
+
+def test_stopped_queue_leaves_jobs_queued(queue, store):
+    q = queue(x=lambda ctx, params: {})
+    q.stop()
+    job = q.submit('alice', 'x', {})
+    assert store.get_job(job['id'])['status'] == QUEUED
+
+
+def test_job_wait_must_be_a_number(client, auth):
+    resp = client.post('/generate/jobs', json={'mode': 'text', 'text': 'Some notes', 'title': 'T', 'slide_count': 2},
+                       headers=auth)
+    assert resp.status_code == 202
+    job_id = resp.json['job']['id']
+    for wait in ('abc', '-1', 'nan'):
+        assert client.get(f'/jobs/{job_id}?wait={wait}', headers=auth).status_code == 400
+    job = client.get(f'/jobs/{job_id}?wait=10', headers=auth).json['job']
+    assert job['status'] == 'succeeded'
+    assert 'params' not in job and 'worker' not in job
+
@@ -0,0 +1,105 @@
+import os
+import time
+import shutil
+
+import pytest
+
+from conftest import NOW, legacy_file, make_deck
+from storage import JournalStore
+
+
+def open_journal(directory, **options):
+    options.setdefault('compact_ops', 10 ** 6)
+    options.setdefault('compact_seconds', 3600)
+    return JournalStore(str(directory), fsync=False, **options)
+
+
+def crash_copy(store, tmp_path):
+    """The journal directory as a crash would leave it: snapshot plus log, no final compaction."""
+    target = tmp_path / 'crashed'
+    shutil.copytree(store.directory, target, ignore=shutil.ignore_patterns('journal.lock'))
+    return target
+
+
+def test_imports_legacy_data_json(tmp_path):
+    path, data = legacy_file(tmp_path)
+    store = JournalStore(str(tmp_path / 'journal'), legacy_json=str(path), fsync=False)
+    try:
+        assert store.get_user('alice')['password'] == 'x'
+        assert [s['id'] for s in store.get_presentation('p')['slides']] == ['p-s0', 'p-s1', 'p-s2']
+    finally:
+        store.close()
+
+
+def test_journal_replays_log(tmp_path):
+    store = open_journal(tmp_path / 'journal')
+    store.create_user('alice', {'password': 'x', 'created_at': NOW})
+    store.create_presentation(make_deck('p', 'alice'))
+    store.compact()
+    store.update_presentation('p', {'title': 'After snapshot'})
+    store.move_slide('p', 'p-s2', None, NOW)
+    store.delete_slide('p', 'p-s1', NOW)
+    expected = store.get_presentation('p')
+
+    replayed = open_journal(crash_copy(store, tmp_path))
+    try:
+        assert replayed.get_presentation('p') == expected
+        assert replayed.get_user('alice')['password'] == 'x'
+    finally:
+        replayed.close()
+        store.close()
+
+
+def test_journal_drops_torn_record(tmp_path):
+    store = open_journal(tmp_path / 'journal')
+    store.create_presentation(make_deck('p', 'alice'))
+    store.update_presentation('p', {'title': 'Kept'})
+    expected = store.get_presentation('p')
+    crashed = crash_copy(store, tmp_path)
+    store.close()
+    with open(crashed / 'journal.log', 'a') as f:
+        f.write('{"op":"update_presentation","pres_id":"p","fie')
+
+    replayed = open_journal(crashed)
+    try:
+        assert replayed.get_presentation('p') == expected
+        replayed.update_presentation('p', {'title': 'Written after recovery'})
+    finally:
+        replayed.close()
+    reopened = open_journal(crashed)
+    try:
+        assert reopened.get_presentation('p')['title'] == 'Written after recovery'
+    finally:
+        reopened.close()
+
+
+def test_compaction_folds_log_into_snapshot(tmp_path):
+    store = open_journal(tmp_path / 'journal', compact_ops=5)
+    try:
+        store.create_presentation(make_deck('p', 'alice'))
+        for i in range(5):
+            store.update_presentation('p', {'title': f'Edit {i}'})
+        deadline = time.monotonic() + 5
+        while os.path.getsize(store.log_path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert os.path.getsize(store.log_path) == 0
+        assert os.path.exists(store.snapshot_path)
+        store.update_presentation('p', {'title': 'After compaction'})
+        expected = store.get_presentation('p')
+        replayed = open_journal(crash_copy(store, tmp_path))
+        try:
+            assert replayed.get_presentation('p') == expected
+        finally:
+            replayed.close()
+    finally:
+        store.close()
+
+
+def test_journal_directory_has_one_writer(tmp_path):
+    store = open_journal(tmp_path / 'journal')
+    try:
+        with pytest.raises(RuntimeError):
+            open_journal(tmp_path / 'journal')
+    finally:
+        store.close()
+    open_journal(tmp_path / 'journal').close()
@@ -0,0 +1,98 @@
+import json
+import multiprocessing
+import os
+import stat
+import threading
+
+import pytest
+
+from conftest import NOW, make_deck
+from storage import JSONStore
+
+
+def leftovers(tmp_path):
+    return [p.name for p in tmp_path.iterdir() if p.name.endswith('.tmp')]
+
+
+def add_users(path, prefix, count):
+    store = JSONStore(path)
+    for i in range(count):
+        store.create_user(f'{prefix}{i}', {'password': 'x', 'created_at': NOW})
+
+
+def test_threads_on_separate_instances_lose_no_writes(tmp_path):
+    path = str(tmp_path / 'data.json')
+    JSONStore(path).create_presentation(make_deck('p', 'alice', slide_count=0))
+
+    def add_slides(worker):
+        store = JSONStore(path)
+        for i in range(10):
+            store.create_slide('p', {'id': f'w{worker}-{i}', 'title': '', 'content': '', 'image': None,
+                                     'style': {}}, NOW)
+    threads = [threading.Thread(target=add_slides, args=(w,)) for w in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pres = JSONStore(path).get_presentation('p')
+    assert len(pres['slides']) == 60
+    assert pres['version'] == 61
+    assert leftovers(tmp_path) == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_processes_lose_no_writes(tmp_path):
+    path = str(tmp_path / 'data.json')
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=add_users, args=(path, f'p{w}-', 15)) for w in range(4)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+    assert all(p.exitcode == 0 for p in workers)
+    with open(path) as f:
+        assert len(json.load(f)['users']) == 60
+    assert leftovers(tmp_path) == []
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / 'data.json'
+    store = JSONStore(str(path))
+    store.create_user('alice', {'password': 'x', 'created_at': NOW})
+    before = path.read_bytes()
+    with pytest.raises(TypeError):
+        store.create_user('bob', {'password': object(), 'created_at': NOW})
+    assert path.read_bytes() == before
+    assert leftovers(tmp_path) == []
+    assert store.get_user('bob') is None
+
+
+def test_replace_keeps_the_file_mode(tmp_path):
+    path = tmp_path / 'data.json'
+    store = JSONStore(str(path))
+    store.create_user('alice', {'password': 'x', 'created_at': NOW})
+    os.chmod(path, 0o600)
+    store.create_user('bob', {'password': 'x', 'created_at': NOW})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_reads_reuse_the_parsed_file_until_it_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'data.json')
+    reader, writer = JSONStore(path), JSONStore(path)
+    writer.create_user('alice', {'password': 'x', 'created_at': NOW})
+    loads = []
+    original = JSONStore._load
+    monkeypatch.setattr(JSONStore, '_load', lambda self: loads.append(1) or original(self))
+
+    assert reader.get_user('alice')['password'] == 'x'
+    assert reader.get_user('alice')['password'] == 'x'
+    assert len(loads) == 1
+    writer.create_user('bob', {'password': 'y', 'created_at': NOW})
+    assert reader.get_user('bob')['password'] == 'y'  # another instance's write is picked up
+
+
+def test_reads_hand_out_copies(tmp_path):
+    store = JSONStore(str(tmp_path / 'data.json'))
+    store.create_presentation(make_deck('p', 'alice'))
+    store.get_presentation('p')['slides'].clear()
+    assert len(store.get_presentation('p')['slides']) == 3
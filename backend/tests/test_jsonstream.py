@@ -0,0 +1,36 @@
+from jsonstream import JSONArrayStream
+
+
+def feed_in_pieces(text, size):
+    parser = JSONArrayStream()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return parser, items
+
+
+def test_elements_arrive_as_soon_as_they_close():
+    parser = JSONArrayStream()
+    assert parser.feed('```json\n[{"title": "A", "bul') == []
+    assert parser.feed('lets": ["x"]}, {"title"') == [{'title': 'A', 'bullets': ['x']}]
+    assert parser.feed(': "B"}]') == [{'title': 'B'}]
+    assert parser.done
+
+
+def test_brackets_and_quotes_inside_strings():
+    text = '{"slides": [{"a": "] } [ \\" {"}, {"b": [1, [2]]}]} trailing [9]'
+    for size in (1, 3, len(text)):
+        parser, items = feed_in_pieces(text, size)
+        assert items == [{'a': '] } [ " {'}, {'b': [1, [2]]}]
+        assert parser.done
+
+
+def test_malformed_element_keeps_its_position():
+    _, items = feed_in_pieces('[{"title": "A"}, {bad}, {"title": "C"}]', 4)
+    assert items == [{'title': 'A'}, None, {'title': 'C'}]
+
+
+def test_truncated_stream_returns_complete_elements_only():
+    parser, items = feed_in_pieces('[{"title": "A"}, {"title": "B", "bullets": ["cut o', 5)
+    assert items == [{'title': 'A'}]
+    assert not parser.done
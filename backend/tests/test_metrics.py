@@ -0,0 +1,85 @@
+import pytest
+
+from metrics import Registry, TimedProxy
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def sample(text, line_start):
+    """Value of the first exposition line starting with line_start."""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def test_text_format(backend):
+    registry = Registry()
+    hits = registry.counter('hits_total', 'Hits', ('path',))
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    registry.gauge('size_bytes', 'Size', function=lambda: 42)
+    hits.inc(path='/a')
+    hits.inc(2, path='/b "quoted"')
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+    assert registry.render().splitlines() == [
+        '# HELP hits_total Hits',
+        '# TYPE hits_total counter',
+        'hits_total{path="/a"} 1',
+        'hits_total{path="/b \\"quoted\\""} 2',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        'latency_seconds_sum 5.55',
+        'latency_seconds_count 3',
+        '# HELP size_bytes Size',
+        '# TYPE size_bytes gauge',
+        'size_bytes 42',
+    ]
+
+
+def test_labels_must_match(backend):
+    hits = Registry().counter('hits_total', 'Hits', ('path',))
+    with pytest.raises(ValueError):
+        hits.inc(route='/a')
+
+
+def test_failing_gauge_is_left_out(backend):
+    registry = Registry()
+    registry.gauge('broken', 'Broken', function=lambda: 1 / 0)
+    assert registry.render().splitlines() == ['# HELP broken Broken', '# TYPE broken gauge']
+
+
+def test_timed_proxy_observes_each_call(backend):
+    latency = Registry().histogram('op_seconds', 'Ops', ('op', 'backend'))
+    proxy = TimedProxy({'a': 1}, latency, backend='dict')
+    assert proxy.get('a') == 1
+    with pytest.raises(KeyError):
+        proxy.pop('missing')
+    assert latency.count(op='get', backend='dict') == 1
+    assert latency.count(op='pop', backend='dict') == 1
+
+
+def test_requests_are_counted_by_route(app_module, client, auth, deck):
+    labels = dict(route='/presentations/<pres_id>', method='GET', status=200)
+    before = app_module.http_request_seconds.count(**labels)
+    client.get(f"/presentations/{deck['id']}", headers=auth)
+    client.get(f"/presentations/{deck['id']}", headers=auth)
+    assert app_module.http_request_seconds.count(**labels) == before + 2
+
+    text = client.get('/metrics').get_data(as_text=True)
+    prefix = 'http_request_duration_seconds_count{route="/presentations/<pres_id>",method="GET",status="200"}'
+    assert sample(text, prefix) == before + 2
+    assert sample(text, 'datastore_operation_seconds_count{backend="sqlite",op="get_presentation"}') >= 2
+    assert sample(text, 'datastore_size_bytes') > 0
+
+
+def test_metrics_token(app_module, client):
+    app_module.METRICS_TOKEN = 'scrape-me'
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    resp = client.get('/metrics', headers={'Authorization': 'Bearer scrape-me'})
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
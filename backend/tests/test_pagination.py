@@ -0,0 +1,49 @@
+import base64
+import json
+
+import pytest
+
+from conftest import make_deck
+
+
+def test_pages_cover_ties_once(store):
+    """Decks sharing a sort value are split across pages by id, none skipped or repeated."""
+    for i in range(7):
+        store.create_presentation(dict(make_deck(f'p{i}', 'alice', slide_count=i % 3), title='Same'))
+    store.create_presentation(make_deck('other', 'bob'))
+    seen, after = [], None
+    while True:
+        page, after = store.page_presentations('alice', limit=3, after=after, sort='title', descending=True)
+        seen.extend(p['id'] for p in page)
+        if after is None:
+            break
+    assert seen == [f'p{i}' for i in reversed(range(7))]
+
+
+def test_pages_are_summaries(store):
+    store.create_presentation(make_deck('p', 'alice', slide_count=4))
+    (summary,), _ = store.page_presentations('alice')
+    assert 'slides' not in summary
+    assert summary['slide_count'] == 4
+    assert summary['preview']['title'] == 'Slide 0'
+    (full,), _ = store.page_presentations('alice', full=True)
+    assert len(full['slides']) == 4
+
+
+def test_presentation_list_pages(client, auth, deck):
+    for i in range(2):
+        client.post('/presentations', json={'title': f'More {i}'}, headers=auth)
+    first = client.get('/presentations?limit=2&sort=title&order=asc', headers=auth).json
+    second = client.get(f"/presentations?limit=2&sort=title&order=asc&cursor={first['next_cursor']}",
+                        headers=auth).json
+    assert [p['title'] for p in first['presentations'] + second['presentations']] == ['Deck', 'More 0', 'More 1']
+    assert second['next_cursor'] is None
+
+
+@pytest.mark.parametrize('query', [
+    'limit=abc', 'limit=0', 'limit=-1', 'cursor=not-base64!',
+    'cursor=' + base64.urlsafe_b64encode(json.dumps([1, 2]).encode()).decode(),
+    'sort=owner',
+])
+def test_presentation_list_rejects_bad_params(client, auth, query):
+    assert client.get(f'/presentations?{query}', headers=auth).status_code == 400
@@ -0,0 +1,71 @@
+import pstats
+
+import pytest
+
+from conftest import app_settings
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+@pytest.fixture
+def profiled(backend, tmp_path):
+    """profiled(**settings) builds the app with profiles written under tmp_path and returns its client."""
+    import app as backend_app
+
+    def make(**settings):
+        settings = app_settings(backend, tmp_path, PROFILE_DIR=str(tmp_path / 'profiles'), **settings)
+        return backend_app.create_app(settings).test_client()
+    yield make
+    backend_app.shutdown_services()
+
+
+def login(client, username):
+    client.post('/signup', json={'username': username, 'password': 'secret1'})
+    token = client.post('/login', json={'username': username, 'password': 'secret1'}).json['token']
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.mark.parametrize('mode, suffix', [('cprofile', '.pstats'), ('sample', '.collapsed')])
+def test_admin_can_profile_a_request(profiled, tmp_path, mode, suffix):
+    client = profiled(ADMIN_USERS={'root'})
+    admin = login(client, 'root')
+    resp = client.get('/presentations', headers={**admin, 'X-Profile': mode})
+    name = resp.headers['X-Profile-Artifact']
+    assert name.endswith(suffix)
+    assert (tmp_path / 'profiles' / name).exists()
+    assert name in [p['name'] for p in client.get('/admin/profiles', headers=admin).json['profiles']]
+    if mode == 'cprofile':
+        download = client.get(f'/admin/profiles/{name}', headers=admin)
+        assert download.status_code == 200
+        path = tmp_path / 'copy.pstats'
+        path.write_bytes(download.data)
+        assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_others_cannot_ask_for_a_profile(profiled):
+    client = profiled(ADMIN_USERS={'root'})
+    user = login(client, 'someone')
+    for headers in (user, {}):
+        resp = client.get('/presentations', headers={**headers, 'X-Profile': 'cprofile'})
+        assert 'X-Profile-Artifact' not in resp.headers
+    assert client.get('/admin/profiles', headers=user).status_code == 403
+
+
+def test_unknown_mode_from_an_admin_is_ignored(profiled):
+    client = profiled(ADMIN_USERS={'root'})
+    resp = client.get('/presentations', headers={**login(client, 'root'), 'X-Profile': 'bogus'})
+    assert resp.status_code == 200
+    assert 'X-Profile-Artifact' not in resp.headers
+
+
+def test_profile_requests_covers_matching_paths(profiled):
+    client = profiled(PROFILE_REQUESTS='sample', PROFILE_PATHS=('/presentations',))
+    auth = login(client, 'someone')
+    assert client.get('/presentations', headers=auth).headers['X-Profile-Artifact'].endswith('.collapsed')
+    assert 'X-Profile-Artifact' not in client.get('/metrics').headers
+
+
+def test_no_hooks_without_profiling(profiled):
+    client = profiled()
+    resp = client.get('/presentations', headers={**login(client, 'someone'), 'X-Profile': 'cprofile'})
+    assert 'X-Profile-Artifact' not in resp.headers
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+import requests
+
+from conftest import FakeResponse
+from providers import CircuitBreaker, ProviderClient, ProviderUnavailable
+
+
+class FakeSession:
+    """Replays scripted outcomes: a status code, or an exception to raise."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(status_code=outcome)
+
+
+def make_client(*outcomes, retries=2, breaker=None):
+    client = ProviderClient('test', retries=retries, backoff_base=0, backoff_max=0, breaker=breaker)
+    client._session = FakeSession(*outcomes)
+    return client
+
+
+def test_retries_retryable_statuses():
+    client = make_client(503, 429, 200)
+    assert client.post('http://llm').status_code == 200
+    status = client.status()
+    assert (status['requests'], status['retries'], status['failures']) == (3, 2, 0)
+    assert status['breaker']['state'] == CircuitBreaker.CLOSED
+
+
+def test_gives_up_after_retries():
+    client = make_client(503, 503, 503)
+    assert client.post('http://llm').status_code == 503
+    assert client.status()['failures'] == 1
+    assert client.breaker.snapshot()['consecutive_failures'] == 1
+
+
+def test_transport_errors():
+    client = make_client(requests.ConnectionError(), requests.Timeout(), 200)
+    assert client.post('http://llm').status_code == 200
+    # Errors that a retry can't fix are raised at once
+    client = make_client(requests.exceptions.InvalidURL(), 200)
+    with pytest.raises(requests.exceptions.InvalidURL):
+        client.post('http://llm')
+    assert client._session.calls == 1
+
+
+def test_breaker_opens_then_probes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    client = make_client(500, 500, 200, retries=0, breaker=breaker)
+    client.post('http://llm')
+    client.post('http://llm')
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(ProviderUnavailable):
+        client.post('http://llm')
+    assert client._session.calls == 2
+    assert client.status()['short_circuited'] == 1
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert client.post('http://llm').status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()  # failed probe: open again for another reset_timeout
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.snapshot()['times_opened'] == 2
+
+
+@pytest.mark.parametrize('backend', ['sqlite'])
+def test_providers_status(client, auth):
+    providers = client.get('/providers/status', headers=auth).json['providers']
+    assert sorted(providers) == ['anthropic', 'gemini']
+    assert providers['anthropic']['breaker']['state'] == 'closed'
+
+
+def test_unexpected_error_in_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    client = make_client(500, ValueError('bad payload'), 200, retries=0, breaker=breaker)
+    client.post('http://llm')
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        client.post('http://llm')
+    # The probe failed instead of staying in flight: after the next timeout another goes out
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    assert client.post('http://llm').status_code == 200
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from conftest import NOW, make_deck
+from storage import SlideIndex, assign_ranks, move_slide_in_list, rank_between, RANK_EPSILON
+
+
+def slide_ids(store, pres_id):
+    return [s['id'] for s in store.get_presentation(pres_id)['slides']]
+
+
+def sqlite_ranks(store, pres_id):
+    rows = store._conn().execute('SELECT id, position FROM slides WHERE presentation_id = ?', (pres_id,))
+    return {row['id']: row['position'] for row in rows}
+
+
+def ordered(order, ranks):
+    return all(ranks[a] < ranks[b] for a, b in zip(order, order[1:]))
+
+
+# ---- ranks ----
+
+@pytest.mark.parametrize('lo, hi, expected', [
+    (None, None, 0.0),
+    (None, 3.0, 2.0),
+    (3.0, None, 4.0),
+    (1.0, 2.0, 1.5),
+    (1.0, 1.0 + RANK_EPSILON, None),
+])
+def test_rank_between(lo, hi, expected):
+    assert rank_between(lo, hi) == expected
+
+
+def test_assign_ranks_changes_only_the_moved_slide():
+    ranks = {'a': 0.0, 'b': 1.0, 'c': 2.0, 'd': 3.0}
+    changed = assign_ranks(['a', 'd', 'b', 'c'], ranks)
+    assert list(changed) == ['d'] and 0.0 < changed['d'] < 1.0
+    assert assign_ranks(['a', 'b', 'c', 'd'], ranks) == {}
+
+
+def test_assign_ranks_places_new_slides_between_neighbours():
+    ranks = {'a': 0.0, 'b': 1.0}
+    order = ['n1', 'a', 'n2', 'n3', 'b', 'n4']
+    changed = assign_ranks(order, ranks)
+    assert set(changed) == {'n1', 'n2', 'n3', 'n4'}
+    assert ordered(order, dict(ranks, **changed))
+
+
+def test_assign_ranks_renumbers_when_out_of_room():
+    ranks = {'a': 0.0, 'b': RANK_EPSILON, 'c': 1.0}
+    assert assign_ranks(['a', 'n', 'b', 'c'], ranks) == {'a': 0.0, 'n': 1.0, 'b': 2.0, 'c': 3.0}
+
+
+def test_assign_ranks_keeps_any_shuffle_in_order():
+    rng = random.Random(7)
+    ids = [f's{i}' for i in range(30)]
+    ranks = {sid: float(i) for i, sid in enumerate(ids)}
+    for _ in range(50):
+        order = ids[:]
+        rng.shuffle(order)
+        ranks.update(assign_ranks(order, ranks))
+        assert ordered(order, ranks)
+        ids = order
+
+
+# ---- in-memory index ----
+
+def test_slide_index_follows_moves_and_inserts():
+    pres = make_deck('p', 'alice', slide_count=4)
+    index = SlideIndex()
+    assert index.find(pres, 'p-s2') == 2
+    assert move_slide_in_list(pres, 'p-s3', None, index)
+    assert [s['id'] for s in pres['slides']] == ['p-s3', 'p-s0', 'p-s1', 'p-s2']
+    assert [index.find(pres, s['id']) for s in pres['slides']] == [0, 1, 2, 3]
+    pres['slides'].insert(0, {'id': 'new'})  # outside the index: the next miss rebuilds it
+    assert index.find(pres, 'p-s2') == 4
+    assert index.find(pres, 'missing') is None
+    assert not move_slide_in_list(pres, 'p-s0', 'p-s0', index)
+    assert not move_slide_in_list(pres, 'p-s0', 'missing', index)
+
+
+# ---- stores ----
+
+def test_slide_edits(store):
+    store.create_presentation(make_deck('p', 'alice'))
+    store.reorder_slides('p', ['p-s2', 'p-s0'], NOW)
+    assert slide_ids(store, 'p') == ['p-s2', 'p-s0', 'p-s1']  # missing ids go last
+    assert store.move_slide('p', 'p-s1', None, NOW)
+    assert slide_ids(store, 'p') == ['p-s1', 'p-s2', 'p-s0']
+    assert not store.move_slide('p', 'p-s1', 'missing', NOW)
+    pres = store.get_presentation('p')
+    assert pres['updated_at'] == NOW
+    assert pres['version'] == 3
+
+
+def test_sqlite_move_rewrites_one_row(open_store):
+    store = open_store('sqlite')
+    store.create_presentation(make_deck('p', 'alice', slide_count=5))
+    before = sqlite_ranks(store, 'p')
+    store.move_slide('p', 'p-s4', 'p-s0', NOW)
+    after = sqlite_ranks(store, 'p')
+    assert {sid for sid in after if after[sid] != before[sid]} == {'p-s4'}
+    assert slide_ids(store, 'p') == ['p-s0', 'p-s4', 'p-s1', 'p-s2', 'p-s3']
+
+
+def test_sqlite_repeated_moves_into_one_gap_stay_ordered(open_store):
+    store = open_store('sqlite')
+    store.create_presentation(make_deck('p', 'alice', slide_count=3))
+    # Halving the same gap runs out of float precision after ~50 moves, forcing a renumber
+    for i in range(80):
+        moving = 'p-s2' if i % 2 == 0 else 'p-s1'
+        store.move_slide('p', moving, 'p-s0', NOW)
+        assert slide_ids(store, 'p')[:2] == ['p-s0', moving]
+    assert len(set(sqlite_ranks(store, 'p').values())) == 3
+
+
+# ---- API ----
+
+def test_move_and_reorder(client, auth, deck):
+    url = f"/presentations/{deck['id']}"
+    ids = [s['id'] for s in deck['slides']]
+
+    def titles():
+        return [s['title'] for s in client.get(url, headers=auth).json['presentation']['slides']]
+
+    assert client.post(f'{url}/slides/{ids[2]}/move', json={'after': ids[0]}, headers=auth).status_code == 200
+    assert titles() == ['Slide 1', 'Slide 3', 'Slide 2']
+    assert client.post(f'{url}/slides/{ids[0]}/move', json={'after': ids[0]}, headers=auth).status_code == 400
+    assert client.post(f'{url}/slides/missing/move', json={'after': None}, headers=auth).status_code == 404
+
+    resp = client.post(f'{url}/slides/reorder', json={'slide_ids': list(reversed(ids))}, headers=auth)
+    assert resp.status_code == 200
+    assert [s['id'] for s in resp.json['presentation']['slides']] == list(reversed(ids))
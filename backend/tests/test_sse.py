@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from conftest import slide_number
+
+pytestmark = pytest.mark.parametrize('backend', ['sqlite'])
+
+
+def stream(client, auth, **body):
+    body = dict({'mode': 'ai', 'title': 'Deck', 'text': 'Some notes', 'slide_count': 3}, **body)
+    resp = client.post('/generate/stream', json=body, headers=auth)
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/event-stream'
+    events = []
+    for block in resp.get_data(as_text=True).strip().split('\n\n'):
+        name, data = block.split('\n')
+        events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def test_slides_are_streamed_and_saved(client, auth, fake_llm):
+    fake_llm(lambda prompt, stream: ('broken' if slide_number(prompt) == 2
+                                     else json.dumps({'title': f'T{slide_number(prompt)}', 'bullets': ['x']})))
+    events = stream(client, auth)
+    names = [name for name, _ in events]
+    assert names == ['presentation', 'slide', 'slide', 'slide', 'done']
+    pres_id = events[0][1]['id']
+    slides = {data['position']: data['title'] for name, data in events if name == 'slide'}
+    assert slides == {0: 'T1', 1: 'Deck - Slide 2', 2: 'T3'}
+    done = events[-1][1]
+    assert (done['generated'], done['failed']) == (2, 1)
+    saved = client.get(f'/presentations/{pres_id}', headers=auth).json['presentation']
+    assert [s['title'] for s in saved['slides']] == ['T1', 'Deck - Slide 2', 'T3']
+
+
+def test_text_mode_streams_without_llm(client, auth):
+    events = stream(client, auth, mode='user', text='First point. Second point')
+    assert [data['content'] for name, data in events if name == 'slide'] == ['First point', 'Second point',
+                                                                           'Second point']
+    assert events[-1][1]['failed'] == 0
+
+
+def test_save_failure_is_an_error_event(app_module, client, auth, monkeypatch):
+    def fail(pres):
+        raise OSError('disk full')
+    monkeypatch.setattr(app_module.store, 'create_presentation', fail)
+    events = stream(client, auth, mode='user')
+    assert events == [('error', {'message': 'Generation failed', 'error': 'disk full'})]
+
+
+def test_invalid_body_is_rejected_before_streaming(client, auth):
+    assert client.post('/generate/stream', json={'title': '  '}, headers=auth).status_code == 400
@@ -0,0 +1,107 @@
+import json
+import threading
+
+from conftest import BACKENDS, NOW, legacy_file, make_deck
+from storage import SQLiteStore
+
+
+def slide_ids(store, pres_id):
+    return [s['id'] for s in store.get_presentation(pres_id)['slides']]
+
+
+def exercise(store):
+    """Run the same edits against a store and record what it answers."""
+    log = []
+    store.create_user('alice', {'password': 'x', 'created_at': NOW})
+    log.append(store.create_user('alice', {'password': 'y', 'created_at': NOW}))
+    log.append(store.get_user('alice')['password'])
+
+    for i in range(3):
+        store.create_presentation(make_deck(f'p{i}', 'alice', title=f'Deck {i}'))
+    store.create_presentation(make_deck('other', 'bob'))
+    log.append(sorted(p['id'] for p in store.list_presentations('alice')))
+
+    store.update_presentation('p0', {'title': 'Renamed', 'updated_at': NOW})
+    store.create_slide('p0', {'id': 'new', 'title': 'New', 'content': '', 'image': None, 'style': {}}, NOW)
+    store.update_slide('p0', {'id': 'p0-s1', 'title': 'Edited', 'content': 'c', 'image': None,
+                              'style': {'fontColor': '#ff0000'}}, NOW)
+    store.delete_slide('p0', 'p0-s0', NOW)
+    store.reorder_slides('p0', ['new', 'p0-s2'], NOW)
+    log.append(store.move_slide('p0', 'p0-s1', 'new', NOW))
+    log.append(store.move_slide('p0', 'missing', None, NOW))
+    log.append(store.get_slide('p0', 'p0-s1'))
+    log.append(store.get_presentation('p0'))
+
+    page, next_key = store.page_presentations('alice', limit=2, sort='title', descending=False)
+    log.append(([p['title'] for p in page], next_key))
+    page, next_key = store.page_presentations('alice', limit=2, after=next_key, sort='title', descending=False)
+    log.append(([p['title'] for p in page], next_key))
+
+    store.delete_presentation('p2')
+    log.append(store.get_presentation('p2'))
+    data = store.export_data()
+    log.append((sorted(data['users']), sorted(data['presentations'])))
+    return log
+
+
+def test_backends_answer_alike(open_store, tmp_path):
+    logs = {}
+    for backend in BACKENDS:
+        root = tmp_path / backend
+        root.mkdir()
+        logs[backend] = exercise(open_store(backend, root=root))
+    assert logs['json'] == logs['sqlite']
+    assert logs['journal'] == logs['sqlite']
+
+
+def test_sqlite_imports_legacy_data_json(open_store, tmp_path):
+    path, data = legacy_file(tmp_path)
+    store = open_store('sqlite', legacy_json=str(path))
+    assert store.get_user('alice')['password'] == 'x'
+    pres = store.get_presentation('p')
+    assert [s['id'] for s in pres['slides']] == ['p-s0', 'p-s1', 'p-s2']
+    assert pres['version'] == 1
+    assert sorted(store.export_data()['presentations']) == ['p']
+
+
+def test_sqlite_migrates_once(tmp_path):
+    path, data = legacy_file(tmp_path)
+    store = SQLiteStore(str(tmp_path / 'data.db'), legacy_json=str(path))
+    store.delete_presentation('p')
+    data['presentations']['q'] = make_deck('q', 'alice')
+    path.write_text(json.dumps(data))
+    reopened = SQLiteStore(str(tmp_path / 'data.db'), legacy_json=str(path))
+    assert reopened.get_presentation('p') is None
+    assert reopened.get_presentation('q') is None
+
+
+def test_sqlite_connections_lose_no_writes(tmp_path):
+    path = str(tmp_path / 'data.db')
+    SQLiteStore(path).create_presentation(make_deck('p', 'alice', slide_count=0))
+
+    def add_slides(worker):
+        store = SQLiteStore(path)  # one store per worker, like separate processes
+        for i in range(10):
+            store.create_slide('p', {'id': f'w{worker}-{i}', 'title': '', 'content': '', 'image': None,
+                                     'style': {}}, NOW)
+    threads = [threading.Thread(target=add_slides, args=(w,)) for w in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pres = SQLiteStore(path).get_presentation('p')
+    assert len(pres['slides']) == 60
+    assert pres['version'] == 61
+
+
+def test_sqlite_edits_touch_one_row(open_store):
+    store = open_store('sqlite')
+    store.create_presentation(make_deck('p', 'alice'))
+    store.create_presentation(make_deck('q', 'alice'))
+    conn = store._conn()
+    changes = conn.total_changes
+    store.update_slide('p', {'id': 'p-s1', 'title': 'Edited', 'content': '', 'image': None, 'style': {}}, NOW)
+    assert conn.total_changes - changes == 2  # the slide row and the deck's version
+    plan = ' '.join(row[3] for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM presentations WHERE owner = ?', ('alice',)))
+    assert 'idx_presentations_owner' in plan
@@ -1,6 +1,8 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import api from '../services/api'
+import { variantUrl } from '../services/images'
+import { BatchQueue } from '../services/batch'
 
 interface Slide {
   id: string
@@ -44,6 +46,16 @@ const Editor: React.FC = () => {
   const [message, setMessage] = useState<string>('')
   const [messageType, setMessageType] = useState<'success' | 'error' | ''>('')
   const nav = useNavigate()
+  // Edits are debounced and saved together through the batch endpoint
+  const batchRef = useRef<BatchQueue | null>(null)
+
+  useEffect(() => {
+    const queue = new BatchQueue(id!)
+    batchRef.current = queue
+    return () => {
+      queue.flush().catch((e) => console.error(e))
+    }
+  }, [id])
 
   // Fetch presentation
   useEffect(() => {
@@ -118,16 +130,19 @@ const Editor: React.FC = () => {
   }
 
   const updateSlideData = async (changes: Partial<Slide>): Promise<void> => {
+    const slideId = slide.id
+    // Update local state right away; the change is saved with the next batch
+    const updatedSlides = slides.map((s) =>
+      s.id === slideId ? { ...s, ...changes } : s
+    )
+    setPresentation((prev) => prev ? {
+      ...prev,
+      slides: prev.slides.map((s) => s.id === slideId ? { ...s, ...changes } : s)
+    } : null)
+    pushHistory({ ...presentation!, slides: updatedSlides })
     try {
       setSaving(true)
-      await api.put(`/presentations/${id}/slides/${slide.id}`, changes)
-      
-      // Update local state
-      const updatedSlides = slides.map((s) =>
-        s.id === slide.id ? { ...s, ...changes } : s
-      )
-      setPresentation((prev) => prev ? { ...prev, slides: updatedSlides } : null)
-      pushHistory({ ...presentation!, slides: updatedSlides })
+      await batchRef.current!.push({ op: 'update_slide', slide_id: slideId, ...changes })
       showMessage('Slide saved', 'success')
     } catch (e: any) {
       showMessage('Failed to save slide', 'error')
@@ -140,7 +155,7 @@ const Editor: React.FC = () => {
   const updatePresentationTitle = async (newTitle: string) => {
     try {
       setSaving(true)
-      await api.put(`/presentations/${id}`, { title: newTitle })
+      await batchRef.current!.push({ op: 'set_title', title: newTitle })
       setPresentation((prev) => prev ? { ...prev, title: newTitle } : null)
       pushHistory({ ...presentation!, title: newTitle })
       showMessage('Presentation title updated', 'success')
@@ -155,6 +170,7 @@ const Editor: React.FC = () => {
   const handleAddSlide = async () => {
     try {
       setSaving(true)
+      await batchRef.current!.flush()
       const res = await api.post(`/presentations/${id}/slides`, {
         title: 'New Slide',
         content: '',
@@ -193,7 +209,7 @@ const Editor: React.FC = () => {
     
     try {
       setSaving(true)
-      await api.delete(`/presentations/${id}/slides/${slideId}`)
+      await batchRef.current!.push({ op: 'delete_slide', slide_id: slideId })
       
       const updatedSlides = slides.filter((s) => s.id !== slideId)
       setPresentation((prev) => prev ? { ...prev, slides: updatedSlides } : null)
@@ -222,20 +238,18 @@ const Editor: React.FC = () => {
     
     try {
       setSaving(true)
-      const slideIds = slides.map((s, i) => {
-        if (i === selectedIndex) return slides[newIndex].id
-        if (i === newIndex) return slides[selectedIndex].id
-        return s.id
-      })
-      
-      await api.post(`/presentations/${id}/slides/reorder`, { slide_ids: slideIds })
-      
       // Reorder locally
       const updatedSlides = [...slides]
       const temp = updatedSlides[selectedIndex]
       updatedSlides[selectedIndex] = updatedSlides[newIndex]
       updatedSlides[newIndex] = temp
       
+      await batchRef.current!.push({
+        op: 'move_slide',
+        slide_id: temp.id,
+        after: newIndex === 0 ? null : updatedSlides[newIndex - 1].id
+      })
+      
       setPresentation((prev) => prev ? { ...prev, slides: updatedSlides } : null)
       setSelectedIndex(newIndex)
       pushHistory()
@@ -251,6 +265,7 @@ const Editor: React.FC = () => {
   const handleExport = async () => {
     try {
       setSaving(true)
+      await batchRef.current!.flush()
       const res = await api.get(`/presentations/${id}/export`, {
         responseType: 'blob'
       })
@@ -274,8 +289,10 @@ const Editor: React.FC = () => {
   }
 
   const handleSaveNow = async () => {
-    // Save full current slide
-    await updateSlideData({ title: slide.title, content: slide.content, style: slide.style })
+    // Save full current slide without waiting for the debounce
+    const saved = updateSlideData({ title: slide.title, content: slide.content, style: slide.style })
+    batchRef.current!.flush().catch(() => {})
+    await saved
   }
 
   const handleImageUpload = async (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -437,7 +454,7 @@ const Editor: React.FC = () => {
             style={{
               backgroundColor: slide.style.backgroundColor,
               backgroundImage: slide.style.backgroundImage
-                ? `url('${slide.style.backgroundImage}')`
+                ? `url('${variantUrl(slide.style.backgroundImage, 'editor')}')`
                 : undefined,
               backgroundSize: 'cover',
               backgroundPosition: 'center'
@@ -493,7 +510,7 @@ const Editor: React.FC = () => {
               {slide.content}
             </div>
             {slide.image && (
-              <img src={slide.image} alt="slide" className="slide-image" />
+              <img src={variantUrl(slide.image, 'editor')} alt="slide" className="slide-image" />
             )}
           </div>
         </section>
@@ -936,6 +953,7 @@ const Editor: React.FC = () => {
                 }
                 try {
                   setSaving(true)
+                  await batchRef.current!.flush()
                   const res = await api.post(`/presentations/${id}/slides/${slide.id}/ai-generate`, { prompt })
                   const updated = res.data.slide
                   setPresentation((prev) => prev ? { ...prev, slides: prev.slides.map((s) => s.id === updated.id ? updated : s) } : null)
@@ -30,7 +30,7 @@ export default function Gallery(){
           {presentations.map(p=> (
             <div className="card" key={p.id}>
               <h3>{p.title}</h3>
-              <p>{p.slides?.length} slides</p>
+              <p>{p.slide_count} slides</p>
               <button className="btn" onClick={()=>nav(`/editor/${p.id}`)}>Open</button>
             </div>
           ))}
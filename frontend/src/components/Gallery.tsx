@@ -5,23 +5,30 @@ import api from '../services/api'
 interface Presentation {
   id: string
   title: string
-  slides: Array<any>
+  slide_count: number
   created_at?: string
   updated_at?: string
 }
 
+const PAGE_SIZE = 24
+
 const Gallery: React.FC = () => {
   const [presentations, setPresentations] = React.useState<Presentation[]>([])
   const [loading, setLoading] = React.useState<boolean>(true)
+  const [nextCursor, setNextCursor] = React.useState<string | null>(null)
   const [message, setMessage] = React.useState<string>('')
   const [messageType, setMessageType] = React.useState<'success' | 'error' | ''>('')
   const nav = useNavigate()
 
-  const fetchPresentations = async () => {
+  const fetchPresentations = async (cursor?: string) => {
     try {
-      setLoading(true)
-      const res = await api.get('/presentations')
-      setPresentations(res.data.presentations || [])
+      if (!cursor) setLoading(true)
+      const res = await api.get('/presentations', {
+        params: { limit: PAGE_SIZE, cursor }
+      })
+      const page: Presentation[] = res.data.presentations || []
+      setPresentations((prev) => (cursor ? [...prev, ...page] : page))
+      setNextCursor(res.data.next_cursor || null)
     } catch (e: any) {
       showMessage('Failed to load presentations', 'error')
       console.error(e)
@@ -96,7 +103,7 @@ const Gallery: React.FC = () => {
           {presentations.map((p) => (
             <div className="card" key={p.id}>
               <h3>{p.title}</h3>
-              <p>{p.slides?.length || 0} slides</p>
+              <p>{p.slide_count || 0} slides</p>
               {p.updated_at && (
                 <p style={{ fontSize: 12, color: 'var(--text-muted)' }}>
                   Updated: {formatDate(p.updated_at)}
@@ -127,6 +134,14 @@ const Gallery: React.FC = () => {
           ))}
         </div>
       )}
+
+      {!loading && nextCursor && (
+        <div style={{ textAlign: 'center', marginTop: 16 }}>
+          <button className="btn" onClick={() => fetchPresentations(nextCursor)}>
+            Load more
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -0,0 +1,51 @@
+import api from './api'
+
+export interface BatchOp {
+  op: 'set_title' | 'create_slide' | 'update_slide' | 'patch_style' | 'move_slide' | 'delete_slide'
+  [key: string]: any
+}
+
+// Collects presentation edits and sends them as one POST /presentations/<id>/batch
+// once no new edit has arrived for `delay` ms. The server applies each batch
+// all-or-nothing; batches go out one at a time, in order.
+export class BatchQueue {
+  private ops: BatchOp[] = []
+  private waiters: { resolve: () => void; reject: (e: any) => void }[] = []
+  private timer: ReturnType<typeof setTimeout> | null = null
+  private inflight: Promise<void> = Promise.resolve()
+
+  constructor(private presentationId: string, private delay: number = 400) {}
+
+  // Resolves once the batch containing this op has been saved
+  push(op: BatchOp): Promise<void> {
+    this.ops.push(op)
+    if (this.timer) clearTimeout(this.timer)
+    this.timer = setTimeout(() => { this.flush().catch(() => {}) }, this.delay)
+    return new Promise((resolve, reject) => this.waiters.push({ resolve, reject }))
+  }
+
+  // Send whatever is queued now; resolves when everything queued so far is saved
+  flush(): Promise<void> {
+    if (this.timer) {
+      clearTimeout(this.timer)
+      this.timer = null
+    }
+    const ops = this.ops
+    const waiters = this.waiters
+    this.ops = []
+    this.waiters = []
+    if (ops.length) {
+      this.inflight = this.inflight
+        .catch(() => {})
+        .then(() => api.post(`/presentations/${this.presentationId}/batch`, { ops }))
+        .then(
+          () => waiters.forEach((w) => w.resolve()),
+          (e) => {
+            waiters.forEach((w) => w.reject(e))
+            throw e
+          }
+        )
+    }
+    return this.inflight
+  }
+}
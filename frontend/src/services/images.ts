@@ -0,0 +1,11 @@
+// Content-addressed uploads (/uploads/aa/bb/<sha256>.<ext>) have resized
+// renditions at /uploads/aa/bb/<sha256>.<variant>.<ext>; the backend serves the
+// original until the rendition has been built. Other URLs are returned as-is.
+const BLOB_URL_RE = /^(.*\/uploads\/[0-9a-f]{2}\/[0-9a-f]{2}\/[0-9a-f]{64})\.([a-z0-9]+)$/
+
+export type ImageVariant = 'thumb' | 'editor' | 'export'
+
+export function variantUrl(url: string, variant: ImageVariant): string {
+  const m = BLOB_URL_RE.exec(url)
+  return m ? `${m[1]}.${variant}.${m[2]}` : url
+}